@@ -0,0 +1,50 @@
+"""add denormalized counters to playlists
+
+Revision ID: 5b1e7c2d9a40
+Revises: 0887be634b09
+Create Date: 2025-07-02 10:14:22.381904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c2d9a40'
+down_revision = '0887be634b09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('playlists', sa.Column('song_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('playlists', sa.Column('total_duration', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('playlists', sa.Column('total_play_count', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_playlists_owner_id', 'playlists', ['owner_id'])
+
+    # Backfill counters from current membership (rows of deleted songs are not counted)
+    op.execute("""
+        UPDATE playlists SET
+            song_count = (
+                SELECT count(ps.id) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            ),
+            total_duration = (
+                SELECT coalesce(sum(s.duration), 0) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            ),
+            total_play_count = (
+                SELECT coalesce(sum(s.play_count), 0) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            )
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playlists_owner_id', table_name='playlists')
+    op.drop_column('playlists', 'total_play_count')
+    op.drop_column('playlists', 'total_duration')
+    op.drop_column('playlists', 'song_count')
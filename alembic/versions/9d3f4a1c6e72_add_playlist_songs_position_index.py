@@ -0,0 +1,28 @@
+"""add (playlist_id, position) index to playlist_songs
+
+Revision ID: 9d3f4a1c6e72
+Revises: 5b1e7c2d9a40
+Create Date: 2025-07-03 09:41:05.127733
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f4a1c6e72'
+down_revision = '5b1e7c2d9a40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_playlist_songs_playlist_id_position',
+        'playlist_songs',
+        ['playlist_id', 'position']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playlist_songs_playlist_id_position', table_name='playlist_songs')
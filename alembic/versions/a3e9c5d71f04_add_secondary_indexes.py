@@ -0,0 +1,151 @@
+"""add secondary indexes and unique playlist membership
+
+Revision ID: a3e9c5d71f04
+Revises: f8d4b2c6a1e9
+Create Date: 2025-08-04 10:26:51.183240
+
+Indexes for the lookups that still scanned: songs by genre, playlist
+entries and listening sessions by song, sessions by playlist (playlist and
+song deletes) and likes by song. Playlist membership becomes unique on
+(playlist_id, song_id); duplicates left by earlier races are removed first,
+keeping each song's earliest entry.
+
+PostgreSQL: indexes are built with CREATE INDEX CONCURRENTLY, so reads and
+writes carry on during the migration. The unique constraint is attached to
+its prebuilt index, and on the partitioned listening_sessions each partition
+is indexed concurrently and attached to an index created ON ONLY the parent.
+A failed concurrent build leaves an invalid index behind; it is dropped and
+rebuilt when the migration is run again.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e9c5d71f04'
+down_revision = 'f8d4b2c6a1e9'
+branch_labels = None
+depends_on = None
+
+LOCK_TIMEOUT = '10s'
+
+# (table, name, columns)
+INDEXES = [
+    ('songs', 'ix_songs_uploaded_by_genre', ['uploaded_by', 'genre', 'created_at', 'id']),
+    ('songs', 'ix_songs_genre', ['genre']),
+    ('playlist_songs', 'ix_playlist_songs_song_id', ['song_id']),
+    ('liked_songs', 'ix_liked_songs_song_id', ['song_id']),
+]
+SESSION_INDEXES = [
+    ('ix_listening_sessions_song_id', ['song_id']),
+    ('ix_listening_sessions_playlist_id', ['playlist_id']),
+]
+UNIQUE_MEMBERSHIP = 'uq_playlist_songs_playlist_song'
+
+
+def is_partitioned(bind, table):
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {'table': table}).first() is not None
+
+
+def leaves(bind, table):
+    return bind.execute(sa.text(
+        "SELECT relid::regclass::text FROM pg_partition_tree(CAST(:table AS regclass)) WHERE isleaf"
+    ), {'table': table}).scalars().all()
+
+
+def remove_duplicate_entries(bind):
+    """Keep the earliest entry of each song in a playlist, then recount the playlists that changed"""
+    playlist_ids = bind.execute(sa.text(
+        "SELECT DISTINCT playlist_id FROM playlist_songs "
+        "GROUP BY playlist_id, song_id HAVING count(*) > 1"
+    )).scalars().all()
+    if not playlist_ids:
+        return
+
+    bind.execute(sa.text("""
+        DELETE FROM playlist_songs WHERE EXISTS (
+            SELECT 1 FROM playlist_songs earlier
+            WHERE earlier.playlist_id = playlist_songs.playlist_id
+              AND earlier.song_id = playlist_songs.song_id
+              AND (earlier.position < playlist_songs.position
+                   OR (earlier.position = playlist_songs.position AND earlier.id < playlist_songs.id))
+        )
+    """))
+    bind.execute(sa.text("""
+        UPDATE playlists SET
+            song_count = (
+                SELECT count(ps.id) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            ),
+            total_duration = (
+                SELECT coalesce(sum(s.duration), 0) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            ),
+            total_play_count = (
+                SELECT coalesce(sum(s.play_count), 0) FROM playlist_songs ps
+                JOIN songs s ON s.id = ps.song_id
+                WHERE ps.playlist_id = playlists.id
+            )
+        WHERE id IN :playlist_ids
+    """).bindparams(sa.bindparam('playlist_ids', expanding=True)), {'playlist_ids': playlist_ids})
+
+
+def create_concurrently(name, table, columns, unique=False):
+    op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    op.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {table} ({', '.join(columns)})")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    remove_duplicate_entries(bind)
+
+    if bind.dialect.name != 'postgresql':
+        for table, name, columns in INDEXES:
+            op.create_index(name, table, columns)
+        for name, columns in SESSION_INDEXES:
+            op.create_index(name, 'listening_sessions', columns)
+        # SQLite can't add a constraint to an existing table; a unique index enforces the same
+        op.create_index(UNIQUE_MEMBERSHIP, 'playlist_songs', ['playlist_id', 'song_id'], unique=True)
+        return
+
+    partitioned = is_partitioned(bind, 'listening_sessions')
+    with op.get_context().autocommit_block():
+        for table, name, columns in INDEXES:
+            create_concurrently(name, table, columns)
+        create_concurrently(UNIQUE_MEMBERSHIP, 'playlist_songs', ['playlist_id', 'song_id'], unique=True)
+
+        for name, columns in SESSION_INDEXES:
+            if not partitioned:
+                create_concurrently(name, 'listening_sessions', columns)
+                continue
+            # Invalid until every partition's index is attached; partitions created
+            # later get theirs automatically
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY listening_sessions ({', '.join(columns)})")
+            for leaf in leaves(bind, 'listening_sessions'):
+                leaf_index = f"{leaf}_{'_'.join(columns)}_idx"
+                create_concurrently(leaf_index, leaf, columns)
+                op.execute(f'ALTER INDEX {name} ATTACH PARTITION {leaf_index}')
+
+    # Only a catalog change: the index already proves uniqueness
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(
+        f'ALTER TABLE playlist_songs ADD CONSTRAINT {UNIQUE_MEMBERSHIP} '
+        f'UNIQUE USING INDEX {UNIQUE_MEMBERSHIP}'
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint(UNIQUE_MEMBERSHIP, 'playlist_songs', type_='unique')
+    else:
+        op.drop_index(UNIQUE_MEMBERSHIP, table_name='playlist_songs')
+    # Dropping the parent index also drops the attached partition indexes
+    for name, _ in reversed(SESSION_INDEXES):
+        op.drop_index(name, table_name='listening_sessions')
+    for table, name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,98 @@
+"""partition listening_sessions by month on started_at
+
+Revision ID: a8e5c3f19d62
+Revises: f1c3b8d07e25
+Create Date: 2025-07-11 13:26:51.718304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8e5c3f19d62'
+down_revision = 'f1c3b8d07e25'
+branch_labels = None
+depends_on = None
+
+STATS_INDEX = 'ix_listening_sessions_user_playlist_song_started'
+COLUMNS = 'id, user_id, song_id, playlist_id, duration_seconds, started_at, ended_at'
+
+
+def _add_months(day: date, months: int) -> date:
+    index = day.year * 12 + (day.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    # Partitioning is PostgreSQL-only; other databases keep the plain table
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('ALTER TABLE listening_sessions RENAME TO listening_sessions_legacy')
+    op.execute(f'ALTER INDEX IF EXISTS {STATS_INDEX} RENAME TO {STATS_INDEX}_legacy')
+    op.execute('ALTER TABLE listening_sessions_legacy RENAME CONSTRAINT listening_sessions_pkey TO listening_sessions_legacy_pkey')
+
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE listening_sessions (
+            id VARCHAR NOT NULL,
+            user_id VARCHAR NOT NULL REFERENCES users (id),
+            song_id VARCHAR NOT NULL REFERENCES songs (id),
+            playlist_id VARCHAR REFERENCES playlists (id),
+            duration_seconds FLOAT NOT NULL,
+            started_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            ended_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT listening_sessions_pkey PRIMARY KEY (id, started_at)
+        ) PARTITION BY RANGE (started_at)
+    """)
+    op.execute(f'CREATE INDEX {STATS_INDEX} ON listening_sessions (user_id, playlist_id, song_id, started_at)')
+
+    # One partition per month from the oldest session to three months ahead
+    oldest = bind.execute(sa.text(
+        'SELECT min(coalesce(started_at, ended_at)) FROM listening_sessions_legacy'
+    )).scalar()
+    today = date.today().replace(day=1)
+    month = oldest.date().replace(day=1) if oldest else today
+    last = _add_months(today, 3)
+    while month <= last:
+        end = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE listening_sessions_p{month:%Y%m} PARTITION OF listening_sessions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        month = end
+    op.execute('CREATE TABLE listening_sessions_default PARTITION OF listening_sessions DEFAULT')
+
+    op.execute(f"""
+        INSERT INTO listening_sessions ({COLUMNS})
+        SELECT id, user_id, song_id, playlist_id, duration_seconds,
+               coalesce(started_at, ended_at, now()), ended_at
+        FROM listening_sessions_legacy
+    """)
+    op.execute('DROP TABLE listening_sessions_legacy')
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('ALTER TABLE listening_sessions RENAME TO listening_sessions_partitioned')
+    op.execute(f'ALTER INDEX IF EXISTS {STATS_INDEX} RENAME TO {STATS_INDEX}_partitioned')
+    op.execute('ALTER TABLE listening_sessions_partitioned RENAME CONSTRAINT listening_sessions_pkey TO listening_sessions_partitioned_pkey')
+    op.create_table(
+        'listening_sessions',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('user_id', sa.String(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('song_id', sa.String(), sa.ForeignKey('songs.id'), nullable=False),
+        sa.Column('playlist_id', sa.String(), sa.ForeignKey('playlists.id')),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('ended_at', sa.DateTime())
+    )
+    op.create_index(STATS_INDEX, 'listening_sessions', ['user_id', 'playlist_id', 'song_id', 'started_at'])
+    op.execute(f'INSERT INTO listening_sessions ({COLUMNS}) SELECT {COLUMNS} FROM listening_sessions_partitioned')
+    op.execute('DROP TABLE listening_sessions_partitioned CASCADE')
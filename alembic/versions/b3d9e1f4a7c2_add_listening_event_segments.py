@@ -0,0 +1,29 @@
+"""add listening event segments ledger
+
+Revision ID: b3d9e1f4a7c2
+Revises: a8e5c3f19d62
+Create Date: 2025-07-16 11:05:39.274518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d9e1f4a7c2'
+down_revision = 'a8e5c3f19d62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'listening_event_segments',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('event_count', sa.Integer(), nullable=False),
+        sa.Column('loaded_at', sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('listening_event_segments')
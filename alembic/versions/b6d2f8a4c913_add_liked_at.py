@@ -0,0 +1,39 @@
+"""add liked_at to liked songs
+
+Revision ID: b6d2f8a4c913
+Revises: a3e9c5d71f04
+Create Date: 2025-08-06 14:02:17.694381
+
+Existing likes get the migration time (their real order is unknown) and
+sort among themselves by song id.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a4c913'
+down_revision = 'a3e9c5d71f04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # now() is evaluated once, so existing rows take it without a table rewrite
+        op.add_column('liked_songs', sa.Column('liked_at', sa.DateTime(), nullable=False, server_default=sa.func.now()))
+        with op.get_context().autocommit_block():
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_liked_songs_user_liked_at')
+            op.execute('CREATE INDEX CONCURRENTLY ix_liked_songs_user_liked_at ON liked_songs (user_id, liked_at, song_id)')
+        return
+
+    # SQLite can't add a column with a non-constant default, or make it NOT NULL later
+    # without rebuilding the table; new rows get liked_at from the application
+    op.add_column('liked_songs', sa.Column('liked_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE liked_songs SET liked_at = CURRENT_TIMESTAMP WHERE liked_at IS NULL")
+    op.create_index('ix_liked_songs_user_liked_at', 'liked_songs', ['user_id', 'liked_at', 'song_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_liked_songs_user_liked_at', table_name='liked_songs')
+    op.drop_column('liked_songs', 'liked_at')
@@ -0,0 +1,47 @@
+"""respace playlist song positions for gap-based ordering
+
+Revision ID: c4a8e2f61b93
+Revises: 9d3f4a1c6e72
+Create Date: 2025-07-04 15:22:48.905316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e2f61b93'
+down_revision = '9d3f4a1c6e72'
+branch_labels = None
+depends_on = None
+
+# Must match app.services.playlist_service.POSITION_GAP
+POSITION_GAP = 1024
+
+
+def upgrade() -> None:
+    # Renumber every playlist 0, 1024, 2048, ... keeping the current order and
+    # resolving collisions left behind by inserts at an explicit position
+    op.execute(f"""
+        UPDATE playlist_songs SET position = ranked.rank * {POSITION_GAP}
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY playlist_id ORDER BY position, added_at, id
+            ) - 1 AS rank
+            FROM playlist_songs
+        ) AS ranked
+        WHERE playlist_songs.id = ranked.id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE playlist_songs SET position = ranked.rank
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY playlist_id ORDER BY position, id
+            ) - 1 AS rank
+            FROM playlist_songs
+        ) AS ranked
+        WHERE playlist_songs.id = ranked.id
+    """)
@@ -0,0 +1,73 @@
+"""add full-text search for songs
+
+Revision ID: c6f2a9d4e831
+Revises: b3d9e1f4a7c2
+Create Date: 2025-07-18 09:52:04.617233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2a9d4e831'
+down_revision = 'b3d9e1f4a7c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Generated column: maintained by PostgreSQL on every insert and update
+        op.execute("""
+            ALTER TABLE songs ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(artist, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(album, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_songs_search_vector ON songs USING gin (search_vector)")
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE songs_fts USING fts5(
+                title, artist, album, content='songs', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER songs_fts_insert AFTER INSERT ON songs BEGIN
+                INSERT INTO songs_fts(rowid, title, artist, album) VALUES (new.rowid, new.title, new.artist, new.album);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER songs_fts_delete AFTER DELETE ON songs BEGIN
+                INSERT INTO songs_fts(songs_fts, rowid, title, artist, album)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER songs_fts_update AFTER UPDATE OF title, artist, album ON songs BEGIN
+                INSERT INTO songs_fts(songs_fts, rowid, title, artist, album)
+                VALUES ('delete', old.rowid, old.title, old.artist, old.album);
+                INSERT INTO songs_fts(rowid, title, artist, album) VALUES (new.rowid, new.title, new.artist, new.album);
+            END
+        """)
+        # Index existing songs
+        op.execute("INSERT INTO songs_fts(songs_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.drop_index('ix_songs_search_vector', table_name='songs')
+        op.drop_column('songs', 'search_vector')
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS songs_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS songs_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS songs_fts_insert")
+        op.execute("DROP TABLE IF EXISTS songs_fts")
@@ -0,0 +1,25 @@
+"""add library_version to users
+
+Revision ID: c9a4e1b7d352
+Revises: b6d2f8a4c913
+Create Date: 2025-08-08 16:41:05.318270
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9a4e1b7d352'
+down_revision = 'b6d2f8a4c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # A constant default: no table rewrite on PostgreSQL
+    op.add_column('users', sa.Column('library_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'library_version')
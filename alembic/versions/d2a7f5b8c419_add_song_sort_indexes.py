@@ -0,0 +1,43 @@
+"""add song sort indexes for keyset pagination
+
+Revision ID: d2a7f5b8c419
+Revises: c6f2a9d4e831
+Create Date: 2025-07-21 15:38:12.950463
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f5b8c419'
+down_revision = 'c6f2a9d4e831'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keyset pagination compares sort keys, so they must never be NULL
+    op.execute("UPDATE songs SET play_count = 0 WHERE play_count IS NULL")
+    op.execute("UPDATE songs SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    # SQLite would have to rebuild the table (dropping the songs_fts triggers and
+    # renumbering rowids); the backfill above is enough there
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('songs', 'play_count', existing_type=sa.Integer(), nullable=False, server_default='0')
+        op.alter_column('songs', 'created_at', existing_type=sa.DateTime(), nullable=False)
+
+    op.create_index('ix_songs_uploaded_by_created_at', 'songs', ['uploaded_by', 'created_at', 'id'])
+    op.create_index('ix_songs_uploaded_by_title', 'songs', ['uploaded_by', 'title', 'id'])
+    op.create_index('ix_songs_uploaded_by_artist', 'songs', ['uploaded_by', 'artist', 'id'])
+    op.create_index('ix_songs_uploaded_by_play_count', 'songs', ['uploaded_by', 'play_count', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_songs_uploaded_by_play_count', table_name='songs')
+    op.drop_index('ix_songs_uploaded_by_artist', table_name='songs')
+    op.drop_index('ix_songs_uploaded_by_title', table_name='songs')
+    op.drop_index('ix_songs_uploaded_by_created_at', table_name='songs')
+
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column('songs', 'created_at', existing_type=sa.DateTime(), nullable=True)
+        op.alter_column('songs', 'play_count', existing_type=sa.Integer(), nullable=True, server_default=None)
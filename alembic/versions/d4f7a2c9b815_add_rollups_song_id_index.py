@@ -0,0 +1,32 @@
+"""add song_id index to listening daily rollups
+
+Revision ID: d4f7a2c9b815
+Revises: c9a4e1b7d352
+Create Date: 2025-08-11 09:41:26.508127
+
+Deleting a song deletes its rollups, which otherwise scans the table (the
+primary key leads with user_id). Built concurrently on PostgreSQL.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f7a2c9b815'
+down_revision = 'c9a4e1b7d352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_listening_daily_rollups_song_id', 'listening_daily_rollups', ['song_id'])
+        return
+
+    with op.get_context().autocommit_block():
+        # A failed concurrent build leaves an invalid index behind
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_listening_daily_rollups_song_id')
+        op.execute('CREATE INDEX CONCURRENTLY ix_listening_daily_rollups_song_id ON listening_daily_rollups (song_id)')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listening_daily_rollups_song_id', table_name='listening_daily_rollups')
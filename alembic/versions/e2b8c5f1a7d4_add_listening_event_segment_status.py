@@ -0,0 +1,28 @@
+"""add status and error to listening event segments
+
+Revision ID: e2b8c5f1a7d4
+Revises: d4f7a2c9b815
+Create Date: 2025-08-12 10:17:52.649301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b8c5f1a7d4'
+down_revision = 'd4f7a2c9b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every segment recorded so far was loaded
+    op.add_column('listening_event_segments',
+                  sa.Column('status', sa.String(), nullable=False, server_default='loaded'))
+    op.add_column('listening_event_segments', sa.Column('error', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('listening_event_segments', 'error')
+    op.drop_column('listening_event_segments', 'status')
@@ -0,0 +1,161 @@
+"""add normalized artists and albums
+
+Revision ID: e5c1b7a3d926
+Revises: d2a7f5b8c419
+Create Date: 2025-07-24 10:21:47.118392
+
+"""
+import uuid
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c1b7a3d926'
+down_revision = 'd2a7f5b8c419'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+songs = sa.table(
+    'songs',
+    sa.column('id', sa.String), sa.column('uploaded_by', sa.String),
+    sa.column('artist', sa.String), sa.column('album', sa.String),
+    sa.column('year', sa.Integer), sa.column('album_art_path', sa.String),
+    sa.column('artist_id', sa.String), sa.column('album_id', sa.String)
+)
+artists = sa.table(
+    'artists',
+    sa.column('id', sa.String), sa.column('owner_id', sa.String),
+    sa.column('name', sa.String), sa.column('name_key', sa.String)
+)
+albums = sa.table(
+    'albums',
+    sa.column('id', sa.String), sa.column('owner_id', sa.String), sa.column('artist_id', sa.String),
+    sa.column('name', sa.String), sa.column('name_key', sa.String),
+    sa.column('year', sa.Integer), sa.column('album_art_path', sa.String)
+)
+
+
+def name_key(name):
+    # Must match app.services.library_service.name_key
+    return " ".join(name.casefold().split())
+
+
+def upgrade() -> None:
+    op.create_table(
+        'artists',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('owner_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('name_key', sa.String(), nullable=False),
+        sa.Column('song_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('album_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_duration', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('owner_id', 'name_key', name='uq_artists_owner_name_key')
+    )
+    op.create_table(
+        'albums',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('owner_id', sa.String(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('artist_id', sa.String(), sa.ForeignKey('artists.id'), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('name_key', sa.String(), nullable=False),
+        sa.Column('album_art_path', sa.String(), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('song_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_duration', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.UniqueConstraint('owner_id', 'artist_id', 'name_key', name='uq_albums_owner_artist_name_key')
+    )
+    op.create_index('ix_albums_artist_id', 'albums', ['artist_id'])
+
+    op.add_column('songs', sa.Column('artist_id', sa.String(), nullable=True))
+    op.add_column('songs', sa.Column('album_id', sa.String(), nullable=True))
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key('fk_songs_artist_id', 'songs', 'artists', ['artist_id'], ['id'])
+        op.create_foreign_key('fk_songs_album_id', 'songs', 'albums', ['album_id'], ['id'])
+
+    # Link existing songs in batches, walking the primary key
+    bind = op.get_bind()
+    artist_ids = {}
+    album_ids = {}
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.select(songs.c.id, songs.c.uploaded_by, songs.c.artist, songs.c.album,
+                      songs.c.year, songs.c.album_art_path)
+            .where(songs.c.id > last_id)
+            .order_by(songs.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        new_artists, new_albums, links = [], [], []
+        for row in rows:
+            artist_key = (row.uploaded_by, name_key(row.artist or ''))
+            if artist_key not in artist_ids:
+                artist_ids[artist_key] = str(uuid.uuid4())
+                new_artists.append({
+                    'id': artist_ids[artist_key], 'owner_id': row.uploaded_by,
+                    'name': (row.artist or '').strip(), 'name_key': artist_key[1]
+                })
+            artist_id = artist_ids[artist_key]
+
+            album_id = None
+            if row.album and row.album.strip():
+                album_key = (row.uploaded_by, artist_id, name_key(row.album))
+                if album_key not in album_ids:
+                    album_ids[album_key] = str(uuid.uuid4())
+                    new_albums.append({
+                        'id': album_ids[album_key], 'owner_id': row.uploaded_by, 'artist_id': artist_id,
+                        'name': row.album.strip(), 'name_key': album_key[2],
+                        'year': row.year, 'album_art_path': row.album_art_path
+                    })
+                album_id = album_ids[album_key]
+
+            links.append({'song_id': row.id, 'new_artist_id': artist_id, 'new_album_id': album_id})
+
+        if new_artists:
+            bind.execute(artists.insert(), new_artists)
+        if new_albums:
+            bind.execute(albums.insert(), new_albums)
+        bind.execute(
+            songs.update()
+            .where(songs.c.id == sa.bindparam('song_id'))
+            .values(artist_id=sa.bindparam('new_artist_id'), album_id=sa.bindparam('new_album_id')),
+            links
+        )
+
+    # Counters, computed once all songs are linked
+    op.execute("""
+        UPDATE albums SET
+            song_count = (SELECT count(s.id) FROM songs s WHERE s.album_id = albums.id),
+            total_duration = (SELECT coalesce(sum(s.duration), 0) FROM songs s WHERE s.album_id = albums.id)
+    """)
+    op.execute("""
+        UPDATE artists SET
+            song_count = (SELECT count(s.id) FROM songs s WHERE s.artist_id = artists.id),
+            total_duration = (SELECT coalesce(sum(s.duration), 0) FROM songs s WHERE s.artist_id = artists.id),
+            album_count = (SELECT count(a.id) FROM albums a WHERE a.artist_id = artists.id AND a.song_count > 0)
+    """)
+
+    op.create_index('ix_songs_album_id', 'songs', ['album_id'])
+    op.create_index('ix_songs_artist_album_title', 'songs', ['artist_id', 'album_id', 'title'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_songs_artist_album_title', table_name='songs')
+    op.drop_index('ix_songs_album_id', table_name='songs')
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint('fk_songs_album_id', 'songs', type_='foreignkey')
+        op.drop_constraint('fk_songs_artist_id', 'songs', type_='foreignkey')
+    op.drop_column('songs', 'album_id')
+    op.drop_column('songs', 'artist_id')
+    op.drop_index('ix_albums_artist_id', table_name='albums')
+    op.drop_table('albums')
+    op.drop_table('artists')
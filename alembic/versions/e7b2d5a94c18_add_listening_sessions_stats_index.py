@@ -0,0 +1,28 @@
+"""add stats index to listening_sessions
+
+Revision ID: e7b2d5a94c18
+Revises: c4a8e2f61b93
+Create Date: 2025-07-07 11:08:36.554120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2d5a94c18'
+down_revision = 'c4a8e2f61b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_listening_sessions_user_playlist_song_started',
+        'listening_sessions',
+        ['user_id', 'playlist_id', 'song_id', 'started_at']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_listening_sessions_user_playlist_song_started', table_name='listening_sessions')
@@ -0,0 +1,46 @@
+"""add listening daily rollups table
+
+Revision ID: f1c3b8d07e25
+Revises: e7b2d5a94c18
+Create Date: 2025-07-09 16:47:13.402871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c3b8d07e25'
+down_revision = 'e7b2d5a94c18'
+branch_labels = None
+depends_on = None
+
+# Must match app.models.song.NO_PLAYLIST
+NO_PLAYLIST = '00000000-0000-0000-0000-000000000000'
+
+
+def upgrade() -> None:
+    op.create_table(
+        'listening_daily_rollups',
+        sa.Column('user_id', sa.String(), primary_key=True),
+        sa.Column('playlist_id', sa.String(), primary_key=True),
+        sa.Column('song_id', sa.String(), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('total_seconds', sa.Float(), nullable=False),
+        sa.Column('session_count', sa.Integer(), nullable=False)
+    )
+
+    # Backfill from existing completed sessions
+    op.execute(f"""
+        INSERT INTO listening_daily_rollups
+            (user_id, playlist_id, song_id, day, total_seconds, session_count)
+        SELECT user_id, coalesce(playlist_id, '{NO_PLAYLIST}'), song_id, date(started_at),
+               sum(duration_seconds), count(id)
+        FROM listening_sessions
+        WHERE duration_seconds > 0
+        GROUP BY user_id, coalesce(playlist_id, '{NO_PLAYLIST}'), song_id, date(started_at)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('listening_daily_rollups')
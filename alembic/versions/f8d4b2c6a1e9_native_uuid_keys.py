@@ -0,0 +1,328 @@
+"""store uuid keys natively
+
+Revision ID: f8d4b2c6a1e9
+Revises: e5c1b7a3d926
+Create Date: 2025-07-29 09:12:33.407215
+
+PostgreSQL (13+): every id column moves from varchar to uuid while the app
+keeps running. Each table gets a uuid shadow column per id column, kept in
+step with new writes by a trigger and backfilled in autocommitted batches.
+NOT NULL checks, indexes and unique indexes are built on the shadow columns
+without blocking writes (CHECK ... NOT VALID + VALIDATE, CREATE INDEX
+CONCURRENTLY). A single short transaction then swaps the columns in and
+reattaches constraints to the prebuilt indexes, and foreign keys come back
+NOT VALID and are validated afterwards.
+
+SQLite: columns can hold any type, so the values are rewritten in place as
+16-byte blobs, in batches.
+"""
+import uuid
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8d4b2c6a1e9'
+down_revision = 'e5c1b7a3d926'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+SHADOW_SUFFIX = '__uuid'
+LOCK_TIMEOUT = '10s'
+
+# Id columns per table, referenced tables first
+UUID_COLUMNS = {
+    'users': ['id'],
+    'artists': ['id', 'owner_id'],
+    'albums': ['id', 'owner_id', 'artist_id'],
+    'songs': ['id', 'uploaded_by', 'artist_id', 'album_id'],
+    'playlists': ['id', 'owner_id'],
+    'playlist_songs': ['id', 'playlist_id', 'song_id'],
+    'liked_songs': ['user_id', 'song_id'],
+    'listening_sessions': ['id', 'user_id', 'song_id', 'playlist_id'],
+    'listening_daily_rollups': ['user_id', 'playlist_id', 'song_id'],
+}
+
+
+def shadow(column):
+    return f'{column}{SHADOW_SUFFIX}'
+
+
+def shadow_list(table, columns):
+    return ', '.join(shadow(c) if c in UUID_COLUMNS[table] else c for c in columns)
+
+
+def is_partitioned(bind, table):
+    return bind.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+    ), {'table': table}).first() is not None
+
+
+def leaves(bind, table):
+    """The table itself, or its leaf partitions when it is partitioned"""
+    return bind.execute(sa.text(
+        "SELECT relid::regclass::text FROM pg_partition_tree(CAST(:table AS regclass)) WHERE isleaf"
+    ), {'table': table}).scalars().all()
+
+
+def foreign_keys(inspector):
+    """Foreign keys from any converted column, as (table, reflected foreign key)"""
+    keys = []
+    for table, columns in UUID_COLUMNS.items():
+        for key in inspector.get_foreign_keys(table):
+            if set(key['constrained_columns']) <= set(columns):
+                keys.append((table, key))
+    return keys
+
+
+def foreign_key_sql(key, columns=None):
+    columns = columns or key['constrained_columns']
+    sql = (f"FOREIGN KEY ({', '.join(columns)}) "
+           f"REFERENCES {key['referred_table']} ({', '.join(key['referred_columns'])})")
+    if key.get('options', {}).get('ondelete'):
+        sql += f" ON DELETE {key['options']['ondelete']}"
+    return sql
+
+
+def index_specs(inspector, table):
+    """(kind, name, columns) of the primary key, unique constraints and indexes over id columns"""
+    columns = set(UUID_COLUMNS[table])
+    pk = inspector.get_pk_constraint(table)
+    uniques = inspector.get_unique_constraints(table)
+    specs = [('primary', pk['name'], pk['constrained_columns'])]
+    specs += [('unique', u['name'], u['column_names']) for u in uniques if columns & set(u['column_names'])]
+
+    constraint_names = {name for _, name, _ in specs} | {u['name'] for u in uniques}
+    for index in inspector.get_indexes(table):
+        if index['name'] in constraint_names or index.get('duplicates_constraint'):
+            continue
+        if index['name'].endswith(SHADOW_SUFFIX) or None in index['column_names']:
+            continue
+        if columns & set(index['column_names']):
+            specs.append(('unique index' if index['unique'] else 'index', index['name'], index['column_names']))
+    return specs
+
+
+def shadow_index_name(table, partitioned, leaf, position, name):
+    # Partition indexes only need to be unique per schema until they are attached
+    return f'{leaf}_{position}{SHADOW_SUFFIX}' if partitioned else f'{name}{SHADOW_SUFFIX}'
+
+
+def backfill(bind, table, pk):
+    """Fill a table's shadow columns in batches walking the primary key, one commit per batch"""
+    columns = UUID_COLUMNS[table]
+    assignments = ', '.join(f'{shadow(c)} = {c}::uuid' for c in columns)
+    pending = ' OR '.join(f'{shadow(c)} IS DISTINCT FROM {c}::uuid' for c in columns)
+    key = ', '.join(pk)
+    params = ', '.join(f':k{i}' for i in range(len(pk)))
+
+    last = None
+    while True:
+        lower = f'({key}) > ({params})' if last else 'TRUE'
+        bounds = dict(zip([f'k{i}' for i in range(len(pk))], last or ()))
+        upper = bind.execute(sa.text(
+            f'SELECT {key} FROM {table} WHERE {lower} ORDER BY {key} LIMIT 1 OFFSET {BATCH_SIZE - 1}'
+        ), bounds).first()
+
+        where = lower
+        if upper is not None:
+            where += f" AND ({key}) <= ({', '.join(f':u{i}' for i in range(len(pk)))})"
+            bounds.update({f'u{i}': value for i, value in enumerate(upper)})
+        bind.execute(sa.text(f'UPDATE {table} SET {assignments} WHERE {where} AND ({pending})'), bounds)
+
+        if upper is None:
+            return
+        last = tuple(upper)
+
+
+def upgrade_postgresql(bind):
+    inspector = sa.inspect(bind)
+    partitioned = {table: is_partitioned(bind, table) for table in UUID_COLUMNS}
+    pks = {table: inspector.get_pk_constraint(table)['constrained_columns'] for table in UUID_COLUMNS}
+    specs = {table: index_specs(inspector, table) for table in UUID_COLUMNS}
+    keys = foreign_keys(inspector)
+    required = {
+        table: [c['name'] for c in inspector.get_columns(table)
+                if c['name'] in UUID_COLUMNS[table] and not c['nullable']]
+        for table in UUID_COLUMNS
+    }
+
+    # 1. Shadow columns, kept in step with every write from now on
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    for table, columns in UUID_COLUMNS.items():
+        op.execute(f"ALTER TABLE {table} " + ', '.join(
+            f'ADD COLUMN IF NOT EXISTS {shadow(c)} uuid' for c in columns
+        ))
+        op.execute(
+            f"CREATE OR REPLACE FUNCTION {table}_sync_uuid() RETURNS trigger LANGUAGE plpgsql AS $$\n"
+            "BEGIN\n"
+            + ''.join(f"    NEW.{shadow(c)} := NEW.{c}::uuid;\n" for c in columns) +
+            "    RETURN NEW;\n"
+            "END $$"
+        )
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_sync_uuid ON {table}')
+        op.execute(
+            f'CREATE TRIGGER {table}_sync_uuid BEFORE INSERT OR UPDATE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {table}_sync_uuid()'
+        )
+
+    with op.get_context().autocommit_block():
+        # 2. Backfill existing rows
+        for table in UUID_COLUMNS:
+            backfill(bind, table, pks[table])
+
+        # 3. NOT NULL proofs and indexes on the shadow columns, without blocking writes
+        for table in UUID_COLUMNS:
+            for leaf in leaves(bind, table):
+                for column in required[table]:
+                    check = f'{shadow(column)}_not_null'
+                    op.execute(f'ALTER TABLE {leaf} DROP CONSTRAINT IF EXISTS {check}')
+                    op.execute(f'ALTER TABLE {leaf} ADD CONSTRAINT {check} CHECK ({shadow(column)} IS NOT NULL) NOT VALID')
+                    op.execute(f'ALTER TABLE {leaf} VALIDATE CONSTRAINT {check}')
+                for position, (kind, name, columns) in enumerate(specs[table]):
+                    index = shadow_index_name(table, partitioned[table], leaf, position, name)
+                    unique = 'UNIQUE ' if kind != 'index' else ''
+                    op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {index}')
+                    op.execute(f'CREATE {unique}INDEX CONCURRENTLY {index} ON {leaf} ({shadow_list(table, columns)})')
+
+    # 4. Swap the columns in: catalog changes only, under one short lock
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f"LOCK TABLE {', '.join(UUID_COLUMNS)} IN ACCESS EXCLUSIVE MODE")
+    for table, key in keys:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {key['name']}")
+
+    for table, columns in UUID_COLUMNS.items():
+        op.execute(f'DROP TRIGGER {table}_sync_uuid ON {table}')
+        op.execute(f'DROP FUNCTION {table}_sync_uuid()')
+        for column in required[table]:
+            # Proven by the validated checks, so no table scan
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN {shadow(column)} SET NOT NULL')
+        for kind, name, _ in specs[table]:
+            if kind in ('primary', 'unique'):
+                op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+        for column in columns:
+            op.execute(f'ALTER TABLE {table} DROP COLUMN {column}')  # Takes its old indexes along
+            op.execute(f'ALTER TABLE {table} RENAME COLUMN {shadow(column)} TO {column}')
+
+        table_leaves = leaves(bind, table)
+        for position, (kind, name, index_columns) in enumerate(specs[table]):
+            column_list = ', '.join(index_columns)
+            if not partitioned[table]:
+                index = shadow_index_name(table, False, table, position, name)
+                if kind == 'primary':
+                    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY USING INDEX {index}')
+                elif kind == 'unique':
+                    op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {index}')
+                else:
+                    op.execute(f'ALTER INDEX {index} RENAME TO {name}')
+                continue
+
+            # A partitioned table's constraints and indexes attach the matching
+            # partition indexes instead of building new ones; constraint indexes
+            # only attach to partition indexes that back a constraint themselves
+            if kind in ('primary', 'unique'):
+                for leaf in table_leaves:
+                    index = shadow_index_name(table, True, leaf, position, name)
+                    op.execute(f'ALTER TABLE {leaf} ADD CONSTRAINT {index} UNIQUE USING INDEX {index}')
+            if kind == 'primary':
+                op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY ({column_list})')
+            elif kind == 'unique':
+                op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({column_list})')
+            else:
+                unique = 'UNIQUE ' if kind == 'unique index' else ''
+                op.execute(f'CREATE {unique}INDEX {name} ON {table} ({column_list})')
+
+        for leaf in table_leaves:
+            for column in required[table]:
+                op.execute(f'ALTER TABLE {leaf} DROP CONSTRAINT {shadow(column)}_not_null')
+
+    for table, key in keys:
+        if not partitioned[table]:
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {key['name']} {foreign_key_sql(key)} NOT VALID")
+
+    # 5. Validate foreign keys while writes continue
+    with op.get_context().autocommit_block():
+        for table, key in keys:
+            if not partitioned[table]:
+                op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {key['name']}")
+                continue
+            # NOT VALID is not available on partitioned tables: validate per
+            # partition, then the parent's key adopts the partitions' keys
+            for leaf in leaves(bind, table):
+                name = f"{key['name']}{SHADOW_SUFFIX}"
+                op.execute(f'ALTER TABLE {leaf} DROP CONSTRAINT IF EXISTS {name}')
+                op.execute(f'ALTER TABLE {leaf} ADD CONSTRAINT {name} {foreign_key_sql(key)} NOT VALID')
+                op.execute(f'ALTER TABLE {leaf} VALIDATE CONSTRAINT {name}')
+            op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {key['name']} {foreign_key_sql(key)}")
+            # Partition keys the parent's key did not adopt are duplicates now
+            op.execute(
+                "DO $$ DECLARE r record; BEGIN "
+                "FOR r IN SELECT conrelid::regclass AS rel, conname FROM pg_constraint "
+                f"WHERE conname = '{key['name']}{SHADOW_SUFFIX}' AND contype = 'f' AND conparentid = 0 LOOP "
+                "EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.rel, r.conname); "
+                "END LOOP; END $$"
+            )
+
+        for table in UUID_COLUMNS:
+            op.execute(f'ANALYZE {table}')
+
+
+def convert_in_place(bind, convert):
+    """Rewrite id values one batch of rows at a time, walking the rowid"""
+    for table, columns in UUID_COLUMNS.items():
+        rows_table = sa.table(table, sa.column('rowid'), *[sa.column(c) for c in columns])
+        update = rows_table.update().where(rows_table.c.rowid == sa.bindparam('row')).values(
+            {c: sa.bindparam(f'new_{c}') for c in columns}
+        )
+        last = 0
+        while True:
+            rows = bind.execute(
+                sa.select(rows_table).where(rows_table.c.rowid > last).order_by(rows_table.c.rowid).limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            last = rows[-1].rowid
+
+            changes = []
+            for row in rows:
+                values = {f'new_{c}': convert(getattr(row, c)) for c in columns}
+                if any(values[f'new_{c}'] != getattr(row, c) for c in columns):
+                    changes.append({'row': row.rowid, **values})
+            if changes:
+                bind.execute(update, changes)
+
+
+def to_bytes(value):
+    return uuid.UUID(value).bytes if isinstance(value, str) else value
+
+
+def to_text(value):
+    return str(uuid.UUID(bytes=value)) if isinstance(value, bytes) else value
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        upgrade_postgresql(bind)
+    else:
+        convert_in_place(bind, to_bytes)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        convert_in_place(bind, to_text)
+        return
+
+    # Rewrites the tables under lock; downgrades are not expected to run online
+    keys = foreign_keys(sa.inspect(bind))
+    for table, key in keys:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {key['name']}")
+    for table, columns in UUID_COLUMNS.items():
+        op.execute(f"ALTER TABLE {table} " + ', '.join(
+            f'ALTER COLUMN {c} TYPE varchar USING {c}::text' for c in columns
+        ))
+    for table, key in keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {key['name']} {foreign_key_sql(key)}")
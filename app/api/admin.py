@@ -5,12 +5,19 @@ import os
 import shutil
 from typing import List, Dict, Any
 from pathlib import Path
+from datetime import date, timedelta
 
-from app.database import get_db
+from app.database import get_db, replica_router
 from app.models.user import User
 from app.models.song import Song
 from app.services.auth_service import get_current_admin_user
+from app.services.playlist_service import PlaylistService
+from app.services.listening_service import ListeningService
+from app.services.invalidation_bus import invalidation_bus, SongDeleted
+from app.services.library_service import LibraryService
+from app.services.library_version_service import LibraryVersionService
 from app.schemas.admin import CleanupRequest, CleanupResponse
+from app.utils.db_pool import pool_metrics
 
 router = APIRouter(tags=["admin"])
 
@@ -90,21 +97,26 @@ async def run_cleanup(
 
 
 def find_duplicate_songs(db: Session) -> List[Dict[str, Any]]:
-    """Find songs with identical title, artist, and album."""
+    """
+    Find songs with identical title, artist, and album within a library.
+    Artists and albums are compared by their normalized entities, so the
+    grouping is served by the (artist_id, album_id, title) index.
+    """
     duplicates = db.query(
+        Song.artist_id,
+        Song.album_id,
         Song.title,
-        Song.artist,
-        Song.album,
+        func.min(Song.artist).label('artist'),
         func.count(Song.id).label('count')
     ).filter(
         and_(
             Song.title.isnot(None),
-            Song.artist.isnot(None)
+            Song.artist_id.isnot(None)
         )
     ).group_by(
-        Song.title,
-        Song.artist,
-        Song.album
+        Song.artist_id,
+        Song.album_id,
+        Song.title
     ).having(
         func.count(Song.id) > 1
     ).all()
@@ -114,15 +126,15 @@ def find_duplicate_songs(db: Session) -> List[Dict[str, Any]]:
 
 def remove_duplicate_songs(db: Session, duplicates: List[Dict[str, Any]]) -> int:
     """Remove duplicate songs, keeping the oldest one."""
-    total_removed = 0
+    removed_songs = []
     
     for dup in duplicates:
         # Get all songs with this title, artist, and album
         songs = db.query(Song).filter(
             and_(
-                Song.title == dup.title,
-                Song.artist == dup.artist,
-                Song.album == dup.album
+                Song.artist_id == dup.artist_id,
+                Song.album_id == dup.album_id if dup.album_id else Song.album_id.is_(None),
+                Song.title == dup.title
             )
         ).order_by(Song.created_at).all()
         
@@ -142,11 +154,16 @@ def remove_duplicate_songs(db: Session, duplicates: List[Dict[str, Any]]) -> int
                     pass  # File might already be gone
             
             # Remove from database
+            LibraryVersionService.bump_song_audience(db, [song.id])
+            PlaylistService.apply_song_deleted(db, song)
+            LibraryService.unlink_song(db, song)
+            ListeningService.delete_song_history(db, [song.id])
             db.delete(song)
-            total_removed += 1
+            removed_songs.append(song)
     
     db.commit()
-    return total_removed
+    invalidation_bus.publish(*(SongDeleted.of(song) for song in removed_songs))
+    return len(removed_songs)
 
 
 def find_orphaned_files(db: Session) -> tuple[List[str], List[str]]:
@@ -211,6 +228,54 @@ def remove_orphaned_files(orphaned_audio: List[str], orphaned_artwork: List[str]
     return audio_removed, artwork_removed, total_space_saved
 
 
+@router.post("/listening-rollups/compact/")
+async def compact_listening_rollups(
+    days: int = 7,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Rebuild daily listening rollups from raw listening sessions.
+    
+    Rollups are normally maintained incrementally as sessions complete; this
+    repairs any drift for the last `days` days (including today). Incremental
+    rollup writes wait until the rebuild commits, so none are lost or counted twice.
+    """
+    since = date.today() - timedelta(days=max(days - 1, 0))
+    
+    try:
+        # Users whose rollups are rebuilt, before and after, so their cached stats are dropped
+        affected_users = ListeningService.rollup_users(db, since)
+        rows = ListeningService.compact(db, since)
+        affected_users |= ListeningService.rollup_users(db, since)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Rollup compaction failed with error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Rollup compaction failed: {str(e)}"
+        )
+    
+    ListeningService.stats_changed(*affected_users)
+    print(f"Compacted listening rollups since {since}: {rows} rows")
+    return {"since": since, "rollup_rows": rows}
+
+
+@router.get("/db-pool/metrics/")
+async def get_db_pool_metrics(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Connection pool state and counters for this worker process.
+    
+    Rising checkout waits or timeouts with in_use pinned at pool_size plus
+    max_overflow mean the pool is too small for the load (or connections are
+    held too long); steady overflow_connections_opened means pool_size is.
+    """
+    return {**pool_metrics(), "replica_routing": replica_router.status()}
+
+
 @router.get("/test-filesystem/")
 async def test_filesystem_permissions(
     current_user: User = Depends(get_current_admin_user)
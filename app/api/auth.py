@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
-from ..database import get_db
+from ..database import get_async_db, replica_router
 from ..models.user import User
 from ..schemas.user import UserCreate, UserResponse, UserLogin, Token
-from ..services.auth_service import get_current_user
+from ..services.auth_service import get_current_user_async
 from ..utils.security import verify_password, get_password_hash, create_access_token
 
 router = APIRouter()
 security = HTTPBearer()
 
 @router.post("/register/", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Register a new user account.
     
@@ -36,22 +38,22 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     - Account creation timestamp
     """
     # Check if user exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = (await db.execute(select(User).where(User.username == user.username))).scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=400,
             detail="Username already taken"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user (bcrypt is CPU-bound, keep it off the event loop)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -60,13 +62,15 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    # The new token's first reads must see the account even if the replica lags
+    replica_router.mark_write(db_user.username)
     
     return db_user
 
 @router.post("/login/", response_model=Token)
-async def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """
     Authenticate user and get access token.
     
@@ -96,9 +100,9 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
     - Include token in Authorization header: `Bearer <token>`
     - Token required for all protected endpoints
     """
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = (await db.execute(select(User).where(User.email == user.email))).scalar_one_or_none()
     
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+    if not db_user or not await run_in_threadpool(verify_password, user.password, db_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -113,7 +117,7 @@ async def login(user: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me/", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_async)):
     """
     Get current user profile information.
     
@@ -1,18 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, or_, and_, insert
+from typing import List, Optional
+from datetime import date
+from ..config import settings
 from ..database import get_db
 from ..models.playlist import Playlist, PlaylistSong
-from ..models.song import Song, ListeningSession
+from ..models.song import Song, ListeningSession, ListeningDailyRollup
 from ..models.user import User
 from ..services.auth_service import get_current_user, get_current_admin_user
-from ..schemas.playlist import PlaylistCreate, PlaylistResponse, PlaylistUpdate, PlaylistSongAdd, PlaylistResponseWithOwner
+from ..services.playlist_service import PlaylistService, POSITION_GAP
+from ..services.library_version_service import LibraryVersionService, library_etag, library_scope
+from ..services.cache_service import cached
+from ..services.invalidation_bus import invalidation_bus, PlaylistChanged
+from ..services.listening_service import ListeningService
+from ..schemas.playlist import PlaylistCreate, PlaylistResponse, PlaylistUpdate, PlaylistSongAdd, PlaylistResponseWithOwner, PlaylistSummary, PlaylistSongsPage, PlaylistSongMove, PlaylistSongsBatch, PlaylistClone, PlaylistMerge
 from ..schemas.user import UserResponse
 from ..schemas.song import SongResponse
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.sql import is_uuid
 
 router = APIRouter()
 
+# Fields that can be requested from the paginated tracks endpoint
+PLAYLIST_TRACK_FIELDS = {
+    name: getattr(Song, name) for name in SongResponse.model_fields
+}
+PLAYLIST_TRACK_FIELDS["position"] = PlaylistSong.position
+PLAYLIST_TRACK_FIELDS["added_at"] = PlaylistSong.added_at
+
 @router.post("/", response_model=PlaylistResponse)
 async def create_playlist(
     playlist: PlaylistCreate,
@@ -45,12 +61,15 @@ async def create_playlist(
     )
     
     db.add(db_playlist)
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
     db.refresh(db_playlist)
+    invalidation_bus.publish(PlaylistChanged(playlist_id=db_playlist.id, owner_id=current_user.id))
     
     return db_playlist
 
-@router.get("/", response_model=List[PlaylistResponse])
+@router.get("/", response_model=List[PlaylistResponse], dependencies=[Depends(library_etag)])
+@cached("playlists:list", scope=library_scope)
 async def get_playlists(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -64,6 +83,9 @@ async def get_playlists(
     - **Complete Data**: Includes playlist details and song count
     - **Popularity Sorting**: Playlists sorted by total play count of all songs (descending)
     - **Alphabetical Fallback**: If play counts are equal, sort alphabetically by name
+    - **Conditional GET**: `If-None-Match` with the returned `ETag` answers `304 Not Modified`
+      until the user's library changes (not for admins)
+    - **Cached**: Built once per library version and shared by all workers with `CACHE_BACKEND=redis`
     
     **Examples:**
     - Get all playlists: `GET /api/playlists/`
@@ -133,7 +155,56 @@ async def get_playlists(
     
     return result
 
-@router.get("/{playlist_id}/", response_model=PlaylistResponse)
+@router.get("/summaries/", response_model=List[PlaylistSummary], dependencies=[Depends(library_etag)])
+@cached("playlists:summaries", scope=library_scope)
+async def get_playlist_summaries(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get lightweight playlist summaries for sidebars and pickers.
+    
+    **Features:**
+    - **Small Payloads**: Only name, cover and aggregate counters - no song metadata
+    - **Single Query**: Served from counters stored on the playlist row
+    - **Same Visibility**: Admins see all playlists, regular users only their own
+    - **Popularity Sorting**: Sorted by total play count (descending), then by name
+    - **Cached**: Built once per library version, like the full listing
+    
+    **Examples:**
+    - Get summaries: `GET /api/playlists/summaries/`
+    
+    **Response:**
+    ```json
+    [
+        {
+            "id": "playlist-uuid",
+            "name": "My Favorite Rock Songs",
+            "cover_image": null,
+            "song_count": 12,
+            "total_duration": 2745.5,
+            "total_play_count": 87
+        }
+    ]
+    ```
+    """
+    query = db.query(
+        Playlist.id,
+        Playlist.name,
+        Playlist.cover_image,
+        Playlist.song_count,
+        Playlist.total_duration,
+        Playlist.total_play_count
+    )
+    
+    # Admin users can see all playlists, regular users only their own
+    if current_user.role != "admin":
+        query = query.filter(Playlist.owner_id == current_user.id)
+    
+    rows = query.order_by(Playlist.total_play_count.desc(), func.lower(Playlist.name)).all()
+    return [PlaylistSummary.model_validate(row) for row in rows]
+
+@router.get("/{playlist_id}/", response_model=PlaylistResponse, dependencies=[Depends(library_etag)])
 async def get_playlist(
     playlist_id: str,
     current_user: User = Depends(get_current_user),
@@ -180,6 +251,93 @@ async def get_playlist(
     
     return PlaylistResponse(**pl_data)
 
+@router.get("/{playlist_id}/songs/", response_model=PlaylistSongsPage, dependencies=[Depends(library_etag)])
+async def get_playlist_songs(
+    playlist_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a playlist's tracks one page at a time.
+    
+    **Features:**
+    - **Keyset Pagination**: Pages are fetched with `cursor` instead of offsets, so
+      every page costs the same regardless of how deep into the playlist it is
+    - **Field Selection**: Use `fields` to return only the columns the UI needs
+      (e.g. for virtual scrolling). `id` and `position` are always included
+    - **User Ownership**: Only the playlist owner can read its tracks
+    
+    **Examples:**
+    - First page: `GET /api/playlists/{playlist_id}/songs/?limit=200`
+    - Next page: `GET /api/playlists/{playlist_id}/songs/?cursor=<next_cursor>`
+    - Compact rows: `GET /api/playlists/{playlist_id}/songs/?fields=title,artist,duration`
+    
+    **Response:**
+    ```json
+    {
+        "items": [
+            {"id": "song-uuid", "position": 0, "title": "Song Title", "artist": "Artist Name", "duration": 215.3}
+        ],
+        "next_cursor": "WzAsImlkIl0"
+    }
+    ```
+    `next_cursor` is `null` on the last page.
+    """
+    playlist = db.query(Playlist.id).filter(
+        Playlist.id == playlist_id,
+        Playlist.owner_id == current_user.id
+    ).first()
+    
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    # Resolve the requested columns
+    if fields:
+        requested = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in PLAYLIST_TRACK_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+    else:
+        requested = list(PLAYLIST_TRACK_FIELDS)
+    selected = ["id", "position"] + [name for name in requested if name not in ("id", "position")]
+    
+    query = db.query(
+        *[PLAYLIST_TRACK_FIELDS[name].label(name) for name in selected],
+        PlaylistSong.id.label("entry_id")
+    ).join(
+        Song, Song.id == PlaylistSong.song_id
+    ).filter(
+        PlaylistSong.playlist_id == playlist_id
+    )
+    
+    # Continue after the last (position, entry id) of the previous page
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        after_position, after_entry_id = after
+        if not isinstance(after_position, int) or isinstance(after_position, bool) or not is_uuid(after_entry_id):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(
+            PlaylistSong.position > after_position,
+            and_(PlaylistSong.position == after_position, PlaylistSong.id > after_entry_id)
+        ))
+    
+    rows = query.order_by(PlaylistSong.position, PlaylistSong.id).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.position, last.entry_id])
+    
+    items = [{name: getattr(row, name) for name in selected} for row in rows]
+    return PlaylistSongsPage(items=items, next_cursor=next_cursor)
+
 @router.put("/{playlist_id}/", response_model=PlaylistResponse)
 async def update_playlist(
     playlist_id: str,
@@ -199,8 +357,10 @@ async def update_playlist(
     for field, value in update_data.items():
         setattr(playlist, field, value)
     
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
     db.refresh(playlist)
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
     
     return playlist
 
@@ -219,7 +379,9 @@ async def delete_playlist(
         raise HTTPException(status_code=404, detail="Playlist not found")
     
     db.delete(playlist)
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
     
     return {"message": "Playlist deleted successfully"}
 
@@ -227,9 +389,24 @@ async def delete_playlist(
 async def add_song_to_playlist(
     playlist_id: str,
     song_data: PlaylistSongAdd,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Add a song to a playlist.
+    
+    **Features:**
+    - **Append or Insert**: Appends by default; set `position` to insert at a 0-based index
+    - **Single-Row Insert**: Inserting in the middle never renumbers the other songs
+    - **Duplicate Prevention**: A song can only appear once per playlist
+    
+    **Examples:**
+    ```json
+    {"song_id": "song-uuid"}
+    {"song_id": "song-uuid", "position": 0}
+    ```
+    """
     # Verify playlist ownership
     playlist = db.query(Playlist).filter(
         Playlist.id == playlist_id,
@@ -260,14 +437,16 @@ async def add_song_to_playlist(
     if existing:
         raise HTTPException(status_code=400, detail="Song already in playlist")
     
-    # Get next position
+    # Pick a sparse ordering key: append, or slot in between the neighbours at the index
     if song_data.position is None:
-        max_position = db.query(PlaylistSong).filter(
-            PlaylistSong.playlist_id == playlist_id
-        ).count()
-        position = max_position
+        position = PlaylistService.next_position(db, playlist_id)
     else:
-        position = song_data.position
+        position, crowded = PlaylistService.resolve_position(
+            db, playlist_id,
+            lambda: PlaylistService.neighbours_at_index(db, playlist_id, song_data.position)
+        )
+        if crowded:
+            background_tasks.add_task(PlaylistService.rebalance_in_background, playlist_id)
     
     # Add song to playlist
     playlist_song = PlaylistSong(
@@ -277,7 +456,10 @@ async def add_song_to_playlist(
     )
     
     db.add(playlist_song)
+    PlaylistService.apply_song_added(db, playlist_id, song)
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
     
     return {"message": "Song added to playlist successfully"}
 
@@ -306,11 +488,297 @@ async def remove_song_from_playlist(
     if not playlist_song:
         raise HTTPException(status_code=404, detail="Song not found in playlist")
     
+    PlaylistService.apply_song_removed(db, playlist_id, playlist_song.song)
     db.delete(playlist_song)
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
     
     return {"message": "Song removed from playlist successfully"}
 
+@router.post("/{playlist_id}/songs/batch/")
+async def add_songs_to_playlist(
+    playlist_id: str,
+    batch: PlaylistSongsBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Add many songs to a playlist in one request.
+    
+    **Features:**
+    - **Bulk Insert**: Songs are appended in the order given, in a single transaction
+    - **All-or-Nothing Validation**: Fails without changes if any song is missing or not accessible
+    - **Duplicate Skipping**: Songs already in the playlist (or repeated in the request) are skipped
+    - **Role-based Access**: Admins can add any song, regular users only their own
+    
+    **Request Body:**
+    ```json
+    {"song_ids": ["song-id-1", "song-id-2", "song-id-3"]}
+    ```
+    
+    **Response:**
+    ```json
+    {"message": "Songs added to playlist successfully", "added": 2, "skipped": 1}
+    ```
+    """
+    # Verify playlist ownership
+    playlist = db.query(Playlist.id).filter(
+        Playlist.id == playlist_id,
+        Playlist.owner_id == current_user.id
+    ).first()
+    
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    # De-duplicate the request while keeping its order
+    song_ids = list(dict.fromkeys(batch.song_ids))
+    
+    # Verify access to every song in one query
+    song_query = db.query(Song.id, Song.duration, Song.play_count).filter(
+        Song.id.in_([song_id for song_id in song_ids if is_uuid(song_id)])
+    )
+    if current_user.role != "admin":
+        song_query = song_query.filter(Song.uploaded_by == current_user.id)
+    songs = {row.id: row for row in song_query.all()}
+    
+    missing = [song_id for song_id in song_ids if song_id not in songs]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Songs not found: {', '.join(missing)}")
+    
+    # Skip songs that are already in the playlist
+    existing = {
+        row.song_id for row in db.query(PlaylistSong.song_id).filter(
+            PlaylistSong.playlist_id == playlist_id,
+            PlaylistSong.song_id.in_(song_ids)
+        ).all()
+    }
+    new_ids = [song_id for song_id in song_ids if song_id not in existing]
+    
+    if new_ids:
+        start = PlaylistService.next_position(db, playlist_id)
+        db.execute(insert(PlaylistSong), [
+            {
+                "playlist_id": playlist_id,
+                "song_id": song_id,
+                "position": start + offset * POSITION_GAP
+            }
+            for offset, song_id in enumerate(new_ids)
+        ])
+        PlaylistService.adjust_counters(
+            db, playlist_id,
+            songs=len(new_ids),
+            duration=sum(songs[song_id].duration or 0 for song_id in new_ids),
+            play_count=sum(songs[song_id].play_count or 0 for song_id in new_ids)
+        )
+        LibraryVersionService.bump(db, current_user.id)
+        db.commit()
+        invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
+    
+    return {
+        "message": "Songs added to playlist successfully",
+        "added": len(new_ids),
+        "skipped": len(batch.song_ids) - len(new_ids)
+    }
+
+@router.post("/{playlist_id}/songs/batch-remove/")
+async def remove_songs_from_playlist(
+    playlist_id: str,
+    batch: PlaylistSongsBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Remove many songs from a playlist in one request.
+    
+    **Features:**
+    - **Bulk Delete**: All matching songs are removed with a single statement
+    - **Safe Operation**: Ids that are not in the playlist are ignored
+    - **User Ownership**: Only playlist owner can remove songs
+    
+    **Request Body:**
+    ```json
+    {"song_ids": ["song-id-1", "song-id-2"]}
+    ```
+    
+    **Response:**
+    ```json
+    {"message": "Songs removed from playlist successfully", "removed": 2}
+    ```
+    """
+    # Verify playlist ownership
+    playlist = db.query(Playlist.id).filter(
+        Playlist.id == playlist_id,
+        Playlist.owner_id == current_user.id
+    ).first()
+    
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    song_ids = [song_id for song_id in set(batch.song_ids) if is_uuid(song_id)]
+    
+    # Totals of the songs being removed, for the playlist counters
+    totals = db.query(
+        func.count(Song.id).label("songs"),
+        func.coalesce(func.sum(Song.duration), 0.0).label("duration"),
+        func.coalesce(func.sum(Song.play_count), 0).label("play_count")
+    ).join(
+        PlaylistSong, PlaylistSong.song_id == Song.id
+    ).filter(
+        PlaylistSong.playlist_id == playlist_id,
+        PlaylistSong.song_id.in_(song_ids)
+    ).one()
+    
+    removed = db.query(PlaylistSong).filter(
+        PlaylistSong.playlist_id == playlist_id,
+        PlaylistSong.song_id.in_(song_ids)
+    ).delete(synchronize_session=False)
+    
+    if removed:
+        PlaylistService.adjust_counters(
+            db, playlist_id,
+            songs=-totals.songs,
+            duration=-totals.duration,
+            play_count=-totals.play_count
+        )
+        LibraryVersionService.bump(db, current_user.id)
+        db.commit()
+        invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
+    
+    return {"message": "Songs removed from playlist successfully", "removed": removed}
+
+@router.post("/{playlist_id}/clone/", response_model=PlaylistSummary)
+async def clone_playlist(
+    playlist_id: str,
+    clone: PlaylistClone,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Duplicate a playlist, including its songs and their order.
+    
+    **Features:**
+    - **Server-side Copy**: Songs are copied inside the database with one statement,
+      so cloning takes the same time regardless of playlist size
+    - **Custom Name**: Optionally name the copy; defaults to "<name> (Copy)"
+    - **User Ownership**: Only the playlist owner can clone it
+    
+    **Request Body:**
+    ```json
+    {"name": "Road Trip (Short Version)"}
+    ```
+    
+    **Response:**
+    - Summary of the new playlist (id, name, cover and counters)
+    """
+    source = db.query(Playlist).filter(
+        Playlist.id == playlist_id,
+        Playlist.owner_id == current_user.id
+    ).first()
+    
+    if not source:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    db_playlist = Playlist(
+        name=clone.name or f"{source.name} (Copy)",
+        description=source.description,
+        cover_image=source.cover_image,
+        owner_id=current_user.id,
+        song_count=source.song_count,
+        total_duration=source.total_duration,
+        total_play_count=source.total_play_count
+    )
+    db.add(db_playlist)
+    db.flush()
+    
+    PlaylistService.copy_songs(db, source.id, db_playlist.id)
+    LibraryVersionService.bump(db, current_user.id)
+    db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=db_playlist.id, owner_id=current_user.id))
+    
+    return PlaylistSummary.model_validate(db_playlist)
+
+@router.post("/{playlist_id}/merge/")
+async def merge_playlists(
+    playlist_id: str,
+    merge: PlaylistMerge,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Merge other playlists into this one.
+    
+    **Features:**
+    - **Server-side Merge**: Each source is appended with one set-based statement
+    - **De-duplication**: Songs already in the target (or in an earlier source) are skipped
+    - **Order Preserved**: Source songs keep their relative order after the target's songs
+    - **Optional Cleanup**: Set `delete_sources` to remove the merged playlists
+    - **User Ownership**: All playlists must belong to the current user
+    
+    **Request Body:**
+    ```json
+    {"source_playlist_ids": ["playlist-uuid-1", "playlist-uuid-2"], "delete_sources": false}
+    ```
+    
+    **Response:**
+    ```json
+    {"message": "Playlists merged successfully", "added": 42, "playlist": {"id": "playlist-uuid", "song_count": 120}}
+    ```
+    """
+    source_ids = list(dict.fromkeys(merge.source_playlist_ids))
+    if playlist_id in source_ids:
+        raise HTTPException(status_code=400, detail="Cannot merge a playlist into itself")
+    
+    # Verify ownership of the target and every source in one query
+    owned = {
+        row.id for row in db.query(Playlist.id).filter(
+            Playlist.id.in_([candidate for candidate in [playlist_id] + source_ids if is_uuid(candidate)]),
+            Playlist.owner_id == current_user.id
+        ).all()
+    }
+    
+    if playlist_id not in owned:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    missing = [source_id for source_id in source_ids if source_id not in owned]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Playlists not found: {', '.join(missing)}")
+    
+    added = 0
+    for source_id in source_ids:
+        added += PlaylistService.merge_songs(db, source_id, playlist_id)
+    PlaylistService.refresh_counters(db, [playlist_id])
+    
+    if merge.delete_sources:
+        db.query(ListeningSession).filter(
+            ListeningSession.playlist_id.in_(source_ids)
+        ).update({ListeningSession.playlist_id: None}, synchronize_session=False)
+        db.query(PlaylistSong).filter(
+            PlaylistSong.playlist_id.in_(source_ids)
+        ).delete(synchronize_session=False)
+        db.query(Playlist).filter(
+            Playlist.id.in_(source_ids)
+        ).delete(synchronize_session=False)
+    
+    LibraryVersionService.bump(db, current_user.id)
+    db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
+    
+    summary = db.query(
+        Playlist.id,
+        Playlist.name,
+        Playlist.cover_image,
+        Playlist.song_count,
+        Playlist.total_duration,
+        Playlist.total_play_count
+    ).filter(Playlist.id == playlist_id).one()
+    
+    return {
+        "message": "Playlists merged successfully",
+        "added": added,
+        "playlist": PlaylistSummary.model_validate(summary)
+    }
+
 @router.get("/admin/all", response_model=List[PlaylistResponseWithOwner])
 async def get_all_playlists_admin(
     current_user: User = Depends(get_current_admin_user),
@@ -385,6 +853,9 @@ async def reorder_playlist_songs(
     ["song-id-1", "song-id-2", "song-id-3"]
     ```
     
+    For a single drag-and-drop prefer `PUT /{playlist_id}/songs/{song_id}/move/`,
+    which only rewrites the moved song.
+    
     **Response:**
     - Success message with updated playlist
     """
@@ -413,18 +884,99 @@ async def reorder_playlist_songs(
                 detail=f"Song {song_id} not found in playlist"
             )
     
-    # Update positions based on the new order
+    # Update positions based on the new order, spaced for later single-row moves
     for new_position, song_id in enumerate(song_order):
         playlist_song = song_map[song_id]
-        playlist_song.position = new_position
+        playlist_song.position = new_position * POSITION_GAP
     
+    LibraryVersionService.bump(db, current_user.id)
     db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
     
     return {"message": "Playlist songs reordered successfully"}
 
+@router.put("/{playlist_id}/songs/{song_id}/move/")
+async def move_playlist_song(
+    playlist_id: str,
+    song_id: str,
+    move: PlaylistSongMove,
+    background_tasks: BackgroundTasks,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Move one song to sit immediately before or after another song.
+    
+    **Features:**
+    - **Single-Row Update**: Only the moved song's position is rewritten
+    - **Automatic Rebalancing**: Positions are respaced in the background when they get crowded
+    - **User Ownership**: Only playlist owner can reorder songs
+    
+    **Request Body:**
+    ```json
+    {"before": "song-id-3"}
+    {"after": "song-id-1"}
+    ```
+    """
+    if (move.before is None) == (move.after is None):
+        raise HTTPException(status_code=400, detail="Specify exactly one of 'before' or 'after'")
+    
+    anchor_song_id = move.before or move.after
+    if anchor_song_id == song_id:
+        raise HTTPException(status_code=400, detail="Cannot move a song relative to itself")
+    
+    # Verify playlist ownership
+    playlist = db.query(Playlist.id).filter(
+        Playlist.id == playlist_id,
+        Playlist.owner_id == current_user.id
+    ).first()
+    
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    
+    entries = {
+        ps.song_id: ps for ps in db.query(PlaylistSong).filter(
+            PlaylistSong.playlist_id == playlist_id,
+            PlaylistSong.song_id.in_([song_id, anchor_song_id])
+        ).all()
+    }
+    
+    if song_id not in entries:
+        raise HTTPException(status_code=404, detail="Song not found in playlist")
+    if anchor_song_id not in entries:
+        raise HTTPException(status_code=400, detail=f"Song {anchor_song_id} not found in playlist")
+    
+    moving = entries[song_id]
+    anchor = entries[anchor_song_id]
+    place = "before" if move.before else "after"
+    
+    position, crowded = PlaylistService.resolve_position(
+        db, playlist_id,
+        lambda: PlaylistService.neighbours_of(db, anchor, place, exclude_id=moving.id)
+    )
+    moving.position = position
+    LibraryVersionService.bump(db, current_user.id)
+    db.commit()
+    invalidation_bus.publish(PlaylistChanged(playlist_id=playlist_id, owner_id=current_user.id))
+    
+    if crowded:
+        background_tasks.add_task(PlaylistService.rebalance_in_background, playlist_id)
+    
+    return {"message": "Playlist song moved successfully", "position": position}
+
 @router.get("/{playlist_id}/listening-stats/")
+@cached(
+    "playlists:listening-stats",
+    ttl=settings.cache_stats_ttl_seconds,
+    scope=library_scope,
+    tags=lambda current_user, **_: [ListeningService.cache_tag(current_user.id)]
+)
 async def get_playlist_listening_stats(
     playlist_id: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -434,8 +986,17 @@ async def get_playlist_listening_stats(
     **Features:**
     - **Total Listening Time**: Total minutes listened to this playlist
     - **Song Play Counts**: Individual song play counts
+    - **Date Range**: Use `start` (inclusive) and `end` (exclusive) dates to limit the days counted
+    - **Pagination**: Use `skip` and `limit` to page through `song_stats` (in playlist order)
+    - **Flat Latency**: Served from daily rollups, so cost does not grow with listening history
+    - **Cached**: For `CACHE_STATS_TTL_SECONDS`, or until the user's listening or library changes
     - **User Ownership**: Only playlist owner can view stats
     
+    **Examples:**
+    - All time: `GET /api/playlists/{playlist_id}/listening-stats/`
+    - This month: `GET /api/playlists/{playlist_id}/listening-stats/?start=2024-01-01`
+    - First 50 songs: `GET /api/playlists/{playlist_id}/listening-stats/?limit=50`
+    
     **Response:**
     ```json
     {
@@ -454,7 +1015,7 @@ async def get_playlist_listening_stats(
     ```
     """
     # Verify playlist ownership
-    playlist = db.query(Playlist).filter(
+    playlist = db.query(Playlist.id).filter(
         Playlist.id == playlist_id,
         Playlist.owner_id == current_user.id
     ).first()
@@ -462,36 +1023,55 @@ async def get_playlist_listening_stats(
     if not playlist:
         raise HTTPException(status_code=404, detail="Playlist not found")
     
+    rollup_filters = [
+        ListeningDailyRollup.user_id == current_user.id,
+        ListeningDailyRollup.playlist_id == playlist_id,
+        *ListeningService.day_range_filters(start, end)
+    ]
+    
     # Get total listening time for this playlist
-    total_listening_seconds = db.query(func.sum(ListeningSession.duration_seconds)).filter(
-        ListeningSession.playlist_id == playlist_id,
-        ListeningSession.user_id == current_user.id
-    ).scalar() or 0.0
-    
-    # Get individual song statistics
-    song_stats = []
-    for ps in playlist.playlist_songs:
-        if ps.song:
-            # Get play count for this song
-            play_count = ps.song.play_count or 0
-            
-            # Get listening time for this song in this playlist
-            song_listening_seconds = db.query(func.sum(ListeningSession.duration_seconds)).filter(
-                ListeningSession.playlist_id == playlist_id,
-                ListeningSession.song_id == ps.song.id,
-                ListeningSession.user_id == current_user.id
-            ).scalar() or 0.0
-            
-            song_stats.append({
-                "song_id": ps.song.id,
-                "title": ps.song.title,
-                "artist": ps.song.artist,
-                "play_count": play_count,
-                "listening_minutes": round(song_listening_seconds / 60, 2)
-            })
+    total_listening_seconds = db.query(
+        func.sum(ListeningDailyRollup.total_seconds)
+    ).filter(*rollup_filters).scalar() or 0.0
+    
+    # Get listening time for every song in the playlist with one grouped query
+    listening_seconds = func.coalesce(func.sum(ListeningDailyRollup.total_seconds), 0.0)
+    song_query = db.query(
+        Song.id,
+        Song.title,
+        Song.artist,
+        Song.play_count,
+        listening_seconds.label("listening_seconds")
+    ).select_from(
+        PlaylistSong
+    ).join(
+        Song, Song.id == PlaylistSong.song_id
+    ).outerjoin(
+        ListeningDailyRollup, and_(ListeningDailyRollup.song_id == Song.id, *rollup_filters)
+    ).filter(
+        PlaylistSong.playlist_id == playlist_id
+    ).group_by(
+        PlaylistSong.id, PlaylistSong.position, Song.id, Song.title, Song.artist, Song.play_count
+    ).order_by(
+        PlaylistSong.position, PlaylistSong.id
+    ).offset(skip)
+    
+    if limit is not None:
+        song_query = song_query.limit(limit)
+    
+    song_stats = [
+        {
+            "song_id": row.id,
+            "title": row.title,
+            "artist": row.artist,
+            "play_count": row.play_count or 0,
+            "listening_minutes": round(row.listening_seconds / 60, 2)
+        }
+        for row in song_query.all()
+    ]
     
     return {
         "total_listening_minutes": round(total_listening_seconds / 60, 2),
         "total_listening_seconds": total_listening_seconds,
         "song_stats": song_stats
-    }
\ No newline at end of file
+    }
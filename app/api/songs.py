@@ -1,34 +1,80 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
 from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from typing import List, Optional
+from sqlalchemy import or_, and_, func, insert
+from typing import List, Optional, Literal
 import os
 import shutil
-from datetime import datetime
+import uuid
+from datetime import datetime, timedelta, timezone
+from collections import Counter, defaultdict
 from ..database import get_db
-from ..models.song import Song, ListeningSession
+from ..models.song import Song, ListeningSession, liked_songs_table
 from ..models.user import User
+from ..models.playlist import Playlist
+from ..models.artist import Artist, Album
 from ..services.auth_service import get_current_user, get_current_admin_user
 from ..services.file_service import FileService
 from ..services.metadata_service import MetadataService
+from ..services.playlist_service import PlaylistService
+from ..services.listening_service import ListeningService
+from ..services.search_service import SearchService
+from ..services.listening_retention_service import ListeningRetentionService
+from ..services.autocomplete_service import autocomplete_service
+from ..services.browse_service import browse_service
+from ..services.invalidation_bus import invalidation_bus, SongSaved, SongDeleted
+from ..services.library_service import LibraryService
+from ..services.like_service import LikeService
+from ..services.library_version_service import LibraryVersionService, library_etag
+from ..services.play_count_buffer import play_count_buffer
+from ..services.listening_event_log import listening_event_log
 from ..config import settings
-from ..schemas.song import SongResponse, SongUpload
-from pydantic import BaseModel
+from ..schemas.song import SongResponse, SongUpload, SongUpdate, SongsPage, ListeningEventBatch, LikedSongResponse, LikedSongsPage, LikedSongsBatch
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils.sql import is_uuid
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
 class ListeningSessionCompleteRequest(BaseModel):
-    duration_seconds: float
+    duration_seconds: float = Field(..., ge=0)
 
 # Upload routes moved to end of file to fix route order conflicts
 
-@router.get("/", response_model=List[SongResponse])
+# Library sort orders: (sort column, newest/most-played first). Each has a
+# composite index with uploaded_by, and ties are broken by song id.
+SONG_SORTS = {
+    "created_at": (Song.created_at, True),
+    "title": (Song.title, False),
+    "artist": (Song.artist, False),
+    "play_count": (Song.play_count, True),
+}
+SongSort = Literal["created_at", "title", "artist", "play_count"]
+# JSON type of each sort key in a cursor, besides created_at (an ISO timestamp)
+SONG_SORT_VALUE_TYPES = {"title": str, "artist": str, "play_count": int}
+
+def library_query(db: Session, current_user: User, genre: Optional[str] = None):
+    """Songs visible to the user: admins see all songs, regular users only their own"""
+    if current_user.role == "admin":
+        query = db.query(Song)
+    else:
+        query = db.query(Song).filter(Song.uploaded_by == current_user.id)
+    if genre:
+        query = query.filter(Song.genre == genre)
+    return query
+
+def sort_order(sort: str) -> list:
+    column, descending = SONG_SORTS[sort]
+    return [column.desc(), Song.id.desc()] if descending else [column, Song.id]
+
+@router.get("/", response_model=List[SongResponse], dependencies=[Depends(library_etag)])
 async def get_songs(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     genre: Optional[str] = None,
+    sort: SongSort = "created_at",
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -37,11 +83,19 @@ async def get_songs(
     
     **Features:**
     - **Pagination**: Use `skip` and `limit` for large collections
-    - **Search**: Filter by title, artist, or album (case-insensitive)
+    - **Search**: Full-text search over title, artist and album; words match as
+      prefixes and results are ranked by relevance (title matches first)
     - **Genre Filter**: Filter by specific genre
+    - **Sorting**: `sort` is one of `created_at` (newest first, default), `title`, `artist`
+      or `play_count` (most played first); search results are ordered by relevance instead
     - **Role-based Access**: 
       - Regular users see only their own songs
       - Admin users see all songs in the library
+    - **Conditional GET**: Send the returned `ETag` back as `If-None-Match` to get
+      `304 Not Modified` while the library is unchanged (not for admins)
+    
+    For scrolling through large libraries use `GET /api/songs/page/`, which pages with
+    cursors instead of offsets.
     
     **Examples:**
     - Get all songs: `GET /api/songs/`
@@ -50,25 +104,75 @@ async def get_songs(
     - Pagination: `GET /api/songs/?skip=10&limit=5`
     - Combined filters: `GET /api/songs/?search=beatles&genre=Rock&skip=0&limit=20`
     """
-    # Admin users can see all songs, regular users only their own
-    if current_user.role == "admin":
-        query = db.query(Song)
-    else:
-        query = db.query(Song).filter(Song.uploaded_by == current_user.id)
+    query = library_query(db, current_user, genre)
     
     if search:
-        query = query.filter(
-            Song.title.ilike(f"%{search}%") |
-            Song.artist.ilike(f"%{search}%") |
-            Song.album.ilike(f"%{search}%")
-        )
-    
-    if genre:
-        query = query.filter(Song.genre == genre)
+        query = SearchService.apply(db, query, search)
+    else:
+        query = query.order_by(*sort_order(sort))
     
     songs = query.offset(skip).limit(limit).all()
     return songs
 
+@router.get("/page/", response_model=SongsPage, dependencies=[Depends(library_etag)])
+async def get_songs_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    sort: SongSort = "created_at",
+    genre: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through the library with cursors.
+    
+    **Features:**
+    - **Keyset Pagination**: Each page continues after the last song of the previous one,
+      so deep pages cost the same as the first and results never shift between pages
+    - **Sorting**: `created_at` (newest first, default), `title`, `artist` or `play_count` (most played first)
+    - **Genre Filter**: Filter by specific genre
+    - **Role-based Access**: Regular users page through their own songs, admins through all songs
+    
+    **Examples:**
+    - First page: `GET /api/songs/page/?sort=title&limit=50`
+    - Next page: `GET /api/songs/page/?sort=title&limit=50&cursor=<next_cursor>`
+    
+    **Response:**
+    ```json
+    {"items": [...], "next_cursor": "WyJ0aXRsZSIsIkFiYmV5IFJvYWQiLCJzb25nLXV1aWQiXQ"}
+    ```
+    """
+    column, descending = SONG_SORTS[sort]
+    query = library_query(db, current_user, genre)
+    
+    # Continue after the last (sort key, song id) of the previous page
+    after = decode_cursor(cursor, 3)
+    if after is not None:
+        cursor_sort, after_value, after_id = after
+        if cursor_sort != sort or not is_uuid(after_id):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if sort == "created_at":
+            try:
+                after_value = datetime.fromisoformat(after_value)
+            except (TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        elif not isinstance(after_value, SONG_SORT_VALUE_TYPES[sort]) or isinstance(after_value, bool):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if descending:
+            query = query.filter(or_(column < after_value, and_(column == after_value, Song.id < after_id)))
+        else:
+            query = query.filter(or_(column > after_value, and_(column == after_value, Song.id > after_id)))
+    
+    songs = query.order_by(*sort_order(sort)).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(songs) > limit:
+        songs = songs[:limit]
+        last = songs[-1]
+        next_cursor = encode_cursor([sort, getattr(last, sort), last.id])
+    
+    return SongsPage(items=songs, next_cursor=next_cursor)
+
 @router.post("/upload/", response_model=SongResponse)
 async def upload_song(
     file: UploadFile = File(...),
@@ -186,8 +290,11 @@ async def upload_song(
         print("Saving to database...")
         db_song = Song(**song_data)
         db.add(db_song)
+        LibraryService.link_song(db, db_song)
+        LibraryVersionService.bump(db, db_song.uploaded_by)
         db.commit()
         db.refresh(db_song)
+        invalidation_bus.publish(SongSaved.of(db_song))
         print(f"Song saved to database with ID: {db_song.id}")
         
         return db_song
@@ -272,8 +379,11 @@ async def upload_song_for_user(
         # Save to database
         db_song = Song(**song_data)
         db.add(db_song)
+        LibraryService.link_song(db, db_song)
+        LibraryVersionService.bump(db, db_song.uploaded_by)
         db.commit()
         db.refresh(db_song)
+        invalidation_bus.publish(SongSaved.of(db_song))
         
         return db_song
         
@@ -286,7 +396,244 @@ async def upload_song_for_user(
                 pass
         raise HTTPException(status_code=500, detail=f"Failed to process file: {str(e)}")
 
-@router.get("/liked/", response_model=List[SongResponse])
+@router.post("/listen-events/")
+async def ingest_listening_events(
+    batch: ListeningEventBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Record a batch of completed plays in one request.
+    
+    Replaces the start/complete/play round trips per track: clients can buffer
+    finished plays and flush them periodically (e.g. every 30 seconds or on page hide).
+    
+    **Features:**
+    - **Bulk Insert**: All listening sessions are written with one statement
+    - **Aggregated Play Counts**: Plays are queued per song in the play-count buffer
+    - **Single Transaction**: Sessions and listening stats commit together
+      (appended to the listening event log instead when it is enabled)
+    - **Role-based Access**: Events for songs the user cannot access are rejected;
+      unknown playlist ids are recorded without a playlist
+    - **Time Window**: A batch with a play starting more than a few minutes in the future,
+      or before the retention window (already archived), is refused with 400
+    
+    **Request Body:**
+    ```json
+    {
+        "events": [
+            {"song_id": "song-uuid", "playlist_id": "playlist-uuid", "started_at": "2024-01-01T12:00:00Z", "duration_seconds": 182.4}
+        ]
+    }
+    ```
+    
+    **Response:**
+    ```json
+    {"message": "Listening events recorded", "accepted": 1, "rejected": []}
+    ```
+    """
+    # Store naive UTC timestamps like the rest of the schema
+    started = [
+        event.started_at.astimezone(timezone.utc).replace(tzinfo=None) if event.started_at.tzinfo else event.started_at
+        for event in batch.events
+    ]
+    # Future plays would land in no partition, and plays before the retention cutoff
+    # in rollup days that are archived and never rebuilt
+    latest = datetime.utcnow() + timedelta(seconds=settings.listening_event_max_skew_seconds)
+    earliest = datetime.combine(ListeningRetentionService.retention_cutoff(), datetime.min.time())
+    if any(started_at > latest or started_at < earliest for started_at in started):
+        raise HTTPException(
+            status_code=400,
+            detail=f"started_at must be between {earliest.isoformat()} and the current time"
+        )
+    
+    # Malformed ids can't match a song or playlist; leave them out of the lookups
+    song_ids = {event.song_id for event in batch.events if is_uuid(event.song_id)}
+    playlist_ids = {event.playlist_id for event in batch.events if event.playlist_id and is_uuid(event.playlist_id)}
+    
+    # Verify song access for the whole batch in one query
+    song_query = db.query(Song.id).filter(Song.id.in_(song_ids))
+    if current_user.role != "admin":
+        song_query = song_query.filter(Song.uploaded_by == current_user.id)
+    accessible_songs = {row.id for row in song_query.all()}
+    
+    owned_playlists = set()
+    if playlist_ids:
+        owned_playlists = {
+            row.id for row in db.query(Playlist.id).filter(
+                Playlist.id.in_(playlist_ids),
+                Playlist.owner_id == current_user.id
+            ).all()
+        }
+    
+    sessions = []
+    play_counts = Counter()
+    rollups = defaultdict(lambda: (0.0, 0))
+    rejected = []
+    
+    for event, started_at in zip(batch.events, started):
+        if event.song_id not in accessible_songs:
+            rejected.append(event.song_id)
+            continue
+        
+        playlist_id = event.playlist_id if event.playlist_id in owned_playlists else None
+        
+        sessions.append({
+            "id": str(uuid.uuid4()),
+            "user_id": current_user.id,
+            "song_id": event.song_id,
+            "playlist_id": playlist_id,
+            "duration_seconds": event.duration_seconds,
+            "started_at": started_at,
+            "ended_at": started_at + timedelta(seconds=event.duration_seconds)
+        })
+        play_counts[event.song_id] += 1
+        
+        key = ListeningService.rollup_key(current_user.id, event.song_id, playlist_id, started_at)
+        seconds, count = rollups[key]
+        rollups[key] = (seconds + event.duration_seconds, count + ListeningService.session_delta(0.0, event.duration_seconds))
+    
+    if sessions and settings.listening_event_log_enabled:
+        # Loaded into listening_sessions and the rollups in the background
+        for session in sessions:
+            listening_event_log.append({"type": "session", **session})
+    elif sessions:
+        db.execute(insert(ListeningSession), sessions)
+        ListeningService.record_many(db, dict(rollups))
+        db.commit()
+        ListeningService.stats_changed(current_user.id)
+    play_count_buffer.add(play_counts)
+    
+    return {
+        "message": "Listening events recorded",
+        "accepted": len(sessions),
+        "rejected": rejected
+    }
+
+@router.get("/autocomplete/")
+async def autocomplete_songs(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Typeahead suggestions for the search box.
+    
+    **Features:**
+    - **In-Memory Index**: Served from a prefix index of your library; no database query per keystroke
+    - **Word Prefixes**: Matches the start of any word in titles, artists and albums (accent- and case-insensitive)
+    - **Ranking**: Values starting with the prefix first, then those covering the most songs
+    - **Role-based Access**: Regular users get suggestions from their own songs, admins from all songs
+    
+    **Examples:**
+    - Suggestions: `GET /api/songs/autocomplete/?q=beat`
+    
+    **Response:**
+    ```json
+    {
+        "query": "beat",
+        "suggestions": [
+            {"type": "artist", "value": "The Beatles", "song_count": 12},
+            {"type": "title", "value": "Beat It", "song_count": 1, "song_id": "song-uuid"}
+        ]
+    }
+    ```
+    """
+    return {"query": q, "suggestions": autocomplete_service.suggest(db, current_user, q, limit)}
+
+@router.get("/browse/{facet}/")
+async def browse_library(
+    facet: Literal["artists", "albums", "genres"],
+    artist: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Browse the library by artist, album or genre.
+    
+    **Features:**
+    - **Facets**: `artists`, `albums` or `genres`, each with song counts, total duration
+      and a representative artwork path
+    - **Album Filter**: For `albums`, pass `artist` to list one artist's albums
+    - **Cached**: Computed with one grouped query and cached until songs are uploaded,
+      edited or deleted
+    - **Role-based Access**: Regular users browse their own songs, admins all songs
+    
+    **Examples:**
+    - Artists: `GET /api/songs/browse/artists/`
+    - Albums by an artist: `GET /api/songs/browse/albums/?artist=The%20Beatles`
+    - Genres: `GET /api/songs/browse/genres/`
+    
+    **Response:**
+    ```json
+    {
+        "facet": "artists",
+        "items": [
+            {"name": "The Beatles", "song_count": 12, "album_count": 2, "total_duration": 2580.4, "artwork": "uploads/artwork/..."}
+        ]
+    }
+    ```
+    """
+    # The cache may be a Redis round trip, and a miss runs the grouped query
+    items = await run_in_threadpool(browse_service.facet, db, current_user, facet)
+    if facet == "albums" and artist:
+        items = [item for item in items if item["artist"] == artist]
+    return {"facet": facet, "items": items}
+
+@router.get("/browse/artists/{artist_id}/")
+async def get_artist_page(
+    artist_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    An artist with their albums and songs.
+    
+    **Features:**
+    - **Indexed Lookups**: Reads the artist's precomputed counters and its albums and
+      songs by artist id, without grouping the library
+    - **Role-based Access**: Regular users can only open artists in their own library,
+      admin users any artist
+    
+    **Examples:**
+    - Artist page: `GET /api/songs/browse/artists/artist-uuid`
+    """
+    query = db.query(Artist).filter(Artist.id == artist_id)
+    if current_user.role != "admin":
+        query = query.filter(Artist.owner_id == current_user.id)
+    artist = query.first()
+    
+    if not artist:
+        raise HTTPException(status_code=404, detail="Artist not found")
+    
+    albums = db.query(Album).filter(
+        Album.artist_id == artist.id,
+        Album.song_count > 0
+    ).order_by(Album.year, func.lower(Album.name)).all()
+    songs = db.query(Song).filter(Song.artist_id == artist.id).order_by(Song.album_id, Song.title).all()
+    
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "song_count": artist.song_count,
+        "album_count": artist.album_count,
+        "total_duration": artist.total_duration,
+        "albums": [
+            {
+                "id": album.id,
+                "name": album.name,
+                "year": album.year,
+                "song_count": album.song_count,
+                "total_duration": album.total_duration,
+                "artwork": album.album_art_path,
+            }
+            for album in albums
+        ],
+        "songs": [SongResponse.model_validate(song) for song in songs]
+    }
+
+@router.get("/liked/", response_model=List[SongResponse], dependencies=[Depends(library_etag)])
 async def get_liked_songs(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -299,6 +646,9 @@ async def get_liked_songs(
     - **Full Metadata**: Returns complete song information for each liked song
     - **Ordered**: Songs are returned in the order they were liked (most recent first)
     
+    Large collections should use `GET /api/songs/liked/page/`, and
+    `GET /api/songs/liked/check/` to find which songs on screen are liked.
+    
     **Examples:**
     - Get liked songs: `GET /api/songs/liked`
     
@@ -307,11 +657,147 @@ async def get_liked_songs(
     - Album art paths for streaming
     - Upload and like timestamps
     """
-    # Refresh the user object to get the latest liked_songs relationship
-    db.refresh(current_user)
+    return db.query(Song).join(liked_songs_table, liked_songs_table.c.song_id == Song.id).filter(
+        liked_songs_table.c.user_id == current_user.id
+    ).order_by(liked_songs_table.c.liked_at.desc(), liked_songs_table.c.song_id.desc()).all()
+
+@router.get("/liked/page/", response_model=LikedSongsPage, dependencies=[Depends(library_etag)])
+async def get_liked_songs_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Page through liked songs, most recently liked first.
+    
+    **Features:**
+    - **Keyset Pagination**: Each page continues after the last like of the previous one
+    - **Like Timestamps**: Each song includes `liked_at`
+    
+    **Examples:**
+    - First page: `GET /api/songs/liked/page/?limit=50`
+    - Next page: `GET /api/songs/liked/page/?limit=50&cursor=<next_cursor>`
+    """
+    liked = liked_songs_table.c
+    query = db.query(Song, liked.liked_at).join(liked_songs_table, liked.song_id == Song.id).filter(
+        liked.user_id == current_user.id
+    )
+    
+    # Continue after the last (liked_at, song id) of the previous page
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        after_liked_at, after_id = after
+        try:
+            after_liked_at = datetime.fromisoformat(after_liked_at)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if not is_uuid(after_id):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(or_(
+            liked.liked_at < after_liked_at,
+            and_(liked.liked_at == after_liked_at, liked.song_id < after_id)
+        ))
+    
+    rows = query.order_by(liked.liked_at.desc(), liked.song_id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_song, last_liked_at = rows[-1]
+        next_cursor = encode_cursor([last_liked_at, last_song.id])
+    
+    items = [
+        LikedSongResponse(**SongResponse.model_validate(song).model_dump(), liked_at=liked_at)
+        for song, liked_at in rows
+    ]
+    return LikedSongsPage(items=items, next_cursor=next_cursor)
+
+@router.get("/liked/check/", dependencies=[Depends(library_etag)])
+async def check_liked_songs(
+    song_ids: List[str] = Query(..., min_length=1, max_length=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Find which of the given songs the current user has liked, e.g. for the page on screen.
+    
+    **Examples:**
+    - `GET /api/songs/liked/check/?song_ids=song-id-1&song_ids=song-id-2`
+    
+    **Response:**
+    ```json
+    {"liked": ["song-id-2"]}
+    ```
+    """
+    liked_ids = LikeService.liked_ids(db, current_user.id, [song_id for song_id in song_ids if is_uuid(song_id)])
+    return {"liked": [song_id for song_id in dict.fromkeys(song_ids) if song_id in liked_ids]}
+
+@router.post("/liked/batch/")
+async def like_songs(
+    batch: LikedSongsBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Like many songs in one request.
+    
+    **Features:**
+    - **Single Statement**: Likes are inserted together; songs already liked are skipped
+    - **Role-based Access**: Songs the user cannot access are rejected, the rest are liked
+    
+    **Request Body:**
+    ```json
+    {"song_ids": ["song-id-1", "song-id-2"]}
+    ```
+    
+    **Response:**
+    ```json
+    {"message": "Songs liked successfully", "liked": 1, "already_liked": 1, "rejected": []}
+    ```
+    """
+    song_ids = list(dict.fromkeys(batch.song_ids))
+    
+    # Verify access to every song in one query
+    song_query = db.query(Song.id).filter(Song.id.in_([song_id for song_id in song_ids if is_uuid(song_id)]))
+    if current_user.role != "admin":
+        song_query = song_query.filter(Song.uploaded_by == current_user.id)
+    accessible = {row.id for row in song_query.all()}
+    
+    allowed = [song_id for song_id in song_ids if song_id in accessible]
+    liked = LikeService.like_many(db, current_user.id, allowed)
+    db.commit()
+    
+    return {
+        "message": "Songs liked successfully",
+        "liked": liked,
+        "already_liked": len(allowed) - liked,
+        "rejected": [song_id for song_id in song_ids if song_id not in accessible]
+    }
+
+@router.post("/liked/batch-remove/")
+async def unlike_songs(
+    batch: LikedSongsBatch,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Unlike many songs in one request. Songs that were not liked are ignored.
+    
+    **Request Body:**
+    ```json
+    {"song_ids": ["song-id-1", "song-id-2"]}
+    ```
     
-    # Return liked songs in reverse order (most recently liked first)
-    return list(reversed(current_user.liked_songs))
+    **Response:**
+    ```json
+    {"message": "Songs unliked successfully", "unliked": 2}
+    ```
+    """
+    unliked = LikeService.unlike_many(db, current_user.id, [song_id for song_id in batch.song_ids if is_uuid(song_id)])
+    db.commit()
+    
+    return {"message": "Songs unliked successfully", "unliked": unliked}
 
 @router.get("/{song_id}/", response_model=SongResponse)
 async def get_song(
@@ -352,6 +838,54 @@ async def get_song(
     
     return song
 
+@router.put("/{song_id}/", response_model=SongResponse)
+async def update_song(
+    song_id: str,
+    song_update: SongUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Edit a song's metadata.
+    
+    **Features:**
+    - **Partial Updates**: Only the fields sent are changed (title, artist, album, genre, year)
+    - **Role-based Access**: 
+      - Regular users can only edit their own songs
+      - Admin users can edit any song
+    
+    **Examples:**
+    - Fix an album name: `PUT /api/songs/ee0caa92-d04d-4442-9f0f-8698bab28258`
+    - Body: `{"album": "Abbey Road (Remastered)"}`
+    """
+    # Admin users can edit any song, regular users only their own
+    if current_user.role == "admin":
+        song = db.query(Song).filter(Song.id == song_id).first()
+    else:
+        song = db.query(Song).filter(
+            Song.id == song_id,
+            Song.uploaded_by == current_user.id
+        ).first()
+    
+    if not song:
+        raise HTTPException(status_code=404, detail="Song not found")
+    
+    previous = (song.artist, song.album)
+    for field, value in song_update.model_dump(exclude_unset=True).items():
+        if field in ("title", "artist") and value is None:
+            continue  # Required fields cannot be cleared
+        setattr(song, field, value)
+    
+    if (song.artist, song.album) != previous:
+        LibraryService.relink_song(db, song)
+    LibraryVersionService.bump_song_audience(db, [song.id])
+    
+    db.commit()
+    db.refresh(song)
+    invalidation_bus.publish(SongSaved.of(song))
+    
+    return song
+
 @router.delete("/{song_id}/")
 async def delete_song(
     song_id: str,
@@ -375,6 +909,7 @@ async def delete_song(
     - Album artwork (if exists)
     - Database record
     - All playlist associations
+    - Listening history of the song
     """
     # Admin users can delete any song, regular users only their own
     if current_user.role == "admin":
@@ -397,8 +932,13 @@ async def delete_song(
         os.remove(song.album_art_path)
     
     # Delete from database
+    LibraryVersionService.bump_song_audience(db, [song.id])
+    PlaylistService.apply_song_deleted(db, song)
+    LibraryService.unlink_song(db, song)
+    ListeningService.delete_song_history(db, [song.id])
     db.delete(song)
     db.commit()
+    invalidation_bus.publish(SongDeleted.of(song))
     
     return {"message": "Song deleted successfully"}
 
@@ -431,12 +971,9 @@ async def like_song(
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
-    # Check if already liked
-    if song in current_user.liked_songs:
+    # Insert unless already liked, without loading the liked collection
+    if not LikeService.like_many(db, current_user.id, [song.id]):
         return {"message": "Song already liked"}
-    
-    # Add to liked songs
-    current_user.liked_songs.append(song)
     db.commit()
     
     return {"message": "Song liked successfully"}
@@ -470,12 +1007,8 @@ async def unlike_song(
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
-    # Check if already unliked
-    if song not in current_user.liked_songs:
+    if not LikeService.unlike_many(db, current_user.id, [song.id]):
         return {"message": "Song not in liked songs"}
-    
-    # Remove from liked songs
-    current_user.liked_songs.remove(song)
     db.commit()
     
     return {"message": "Song unliked successfully"}
@@ -492,7 +1025,8 @@ async def increment_play_count(
     **Features:**
     - **User Ownership**: Users can only increment play count for songs they have access to
     - **Admin Access**: Admin users can increment play count for any song
-    - **Automatic Increment**: Play count is incremented by 1 each time this endpoint is called
+    - **Buffered Increment**: Plays are coalesced and written to the database periodically
+    - **Repeat Protection**: Repeat plays by the same user within a short window count once
     
     **Examples:**
     - Increment play count: `POST /api/songs/ee0caa92-d04d-4442-9f0f-8698bab28258/play`
@@ -509,11 +1043,13 @@ async def increment_play_count(
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
-    # Increment play count
-    song.play_count = (song.play_count or 0) + 1
-    db.commit()
+    # Buffered: written to the database by the next periodic flush
+    counted = play_count_buffer.record_play(current_user.id, song.id)
     
-    return {"message": "Play count incremented", "play_count": song.play_count}
+    return {
+        "message": "Play count incremented" if counted else "Repeat play ignored",
+        "play_count": (song.play_count or 0) + play_count_buffer.pending(song.id)
+    }
 
 @router.post("/{song_id}/listen/")
 async def track_listening_session(
@@ -546,6 +1082,21 @@ async def track_listening_session(
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
     
+    if settings.listening_event_log_enabled:
+        # Append locally; the session reaches the database with the next loaded segment
+        session_id = str(uuid.uuid4())
+        now = datetime.utcnow()
+        listening_event_log.append({
+            "type": "start",
+            "id": session_id,
+            "user_id": current_user.id,
+            "song_id": song_id,
+            "playlist_id": playlist_id,
+            "started_at": now,
+            "ended_at": now
+        })
+        return {"message": "Listening session started", "session_id": session_id}
+    
     # Track listening session
     listening_session = ListeningSession(
         song_id=song_id,
@@ -580,6 +1131,27 @@ async def complete_listening_session(
     - Complete session: `PUT /api/songs/ee0caa92-d04d-4442-9f0f-8698bab28258/listen/session-uuid`
     - Body: `{"duration_seconds": 180.5}`
     """
+    if settings.listening_event_log_enabled:
+        if not (is_uuid(session_id) and is_uuid(song_id)):
+            raise HTTPException(status_code=404, detail="Listening session not found")
+        # Same access rule as starting a session: admins any song, regular users only their own
+        song_query = db.query(Song.id).filter(Song.id == song_id)
+        if current_user.role != "admin":
+            song_query = song_query.filter(Song.uploaded_by == current_user.id)
+        if song_query.first() is None:
+            raise HTTPException(status_code=404, detail="Song not found")
+        # The session may not be loaded yet; the loader matches it by id, user and song
+        # and counts the play once it does
+        listening_event_log.append({
+            "type": "complete",
+            "id": session_id,
+            "user_id": current_user.id,
+            "song_id": song_id,
+            "duration_seconds": data.duration_seconds,
+            "ended_at": datetime.utcnow()
+        })
+        return {"message": "Listening session completed", "duration_seconds": data.duration_seconds}
+    
     # Find the listening session
     session = db.query(ListeningSession).filter(
         ListeningSession.id == session_id,
@@ -591,14 +1163,21 @@ async def complete_listening_session(
         raise HTTPException(status_code=404, detail="Listening session not found")
     
     # Update session with duration and end time
+    previous_seconds = session.duration_seconds or 0.0
     session.duration_seconds = data.duration_seconds
     session.ended_at = datetime.utcnow()
     
-    # Also increment play count for the song
-    song = db.query(Song).filter(Song.id == song_id).first()
-    if song:
-        song.play_count = (song.play_count or 0) + 1
+    # Fold the listening time into the daily rollup (counting the session only once)
+    ListeningService.record(
+        db, current_user.id, song_id, session.playlist_id, session.started_at,
+        seconds=data.duration_seconds - previous_seconds,
+        sessions=ListeningService.session_delta(previous_seconds, data.duration_seconds)
+    )
     
     db.commit()
+    ListeningService.stats_changed(current_user.id)
+    
+    # Also count a play for the song (buffered, de-duplicated per user)
+    play_count_buffer.record_play(current_user.id, song_id)
     
     return {"message": "Listening session completed", "duration_seconds": data.duration_seconds}
\ No newline at end of file
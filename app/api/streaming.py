@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 import os
 import mimetypes
-from sqlalchemy.orm import Session
-from ..services.auth_service import get_current_user
-from ..database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..services.auth_service import get_current_user_async
+from ..database import get_async_db
 from ..models.user import User
 from ..models.song import Song
 
@@ -30,8 +31,8 @@ def parse_range_header(range_header: str, file_size: int):
 async def stream_song(
     song_id: str,
     request: Request,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Stream an audio file for playback.
@@ -62,13 +63,10 @@ async def stream_song(
     - `Content-Length`: File size in bytes
     """
     # Admin users can stream any song, regular users only their own
-    if current_user.role == "admin":
-        song = db.query(Song).filter(Song.id == song_id).first()
-    else:
-        song = db.query(Song).filter(
-            Song.id == song_id,
-            Song.uploaded_by == current_user.id
-        ).first()
+    query = select(Song).where(Song.id == song_id)
+    if current_user.role != "admin":
+        query = query.where(Song.uploaded_by == current_user.id)
+    song = (await db.execute(query)).scalar_one_or_none()
     
     if not song:
         raise HTTPException(status_code=404, detail="Song not found")
@@ -130,8 +128,8 @@ async def stream_song(
 @router.get("/album-art/{song_id}/")
 async def get_album_art(
     song_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Get album artwork for a song.
@@ -156,13 +154,10 @@ async def get_album_art(
     - Body: Raw image data
     """
     # Admin users can access any album art, regular users only their own
-    if current_user.role == "admin":
-        song = db.query(Song).filter(Song.id == song_id).first()
-    else:
-        song = db.query(Song).filter(
-            Song.id == song_id,
-            Song.uploaded_by == current_user.id
-        ).first()
+    query = select(Song).where(Song.id == song_id)
+    if current_user.role != "admin":
+        query = query.where(Song.uploaded_by == current_user.id)
+    song = (await db.execute(query)).scalar_one_or_none()
     
     if not song or not song.album_art_path:
         raise HTTPException(status_code=404, detail="Album art not found")
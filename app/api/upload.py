@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse
 from app.database import get_db
 from app.models.user import User
 from app.services.auth_service import get_current_user
+from app.services.invalidation_bus import invalidation_bus, UserUpdated
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -63,6 +64,7 @@ async def upload_profile_image(
         # Update user's avatar in database
         current_user.avatar = f"/uploads/profile/{unique_filename}"
         db.commit()
+        invalidation_bus.publish(UserUpdated(user_id=current_user.id))
         
         return JSONResponse({
             "success": True,
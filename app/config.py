@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -29,6 +29,21 @@ class Settings(BaseSettings):
         
         return self.database_url
     
+    # Optional read replica: GET requests read from it, writes go to DATABASE_URL
+    database_replica_url: Optional[str] = None
+    database_replica_sticky_seconds: float = 5.0  # After a write, the user reads from the primary this long
+    database_replica_max_lag_seconds: float = 10.0  # Read from the primary while the replica is further behind
+    database_replica_lag_check_seconds: float = 5.0
+    replica_sticky_backend: str = "memory"  # 'memory' (per process) or 'redis' (shared, uses REDIS_URL)
+    
+    # Database connection pool (per process; the async engine gets its own pool of the same size)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10  # Extra connections opened under load, closed when returned
+    db_pool_timeout: float = 30.0  # Seconds to wait for a free connection before failing
+    db_pool_recycle: int = 300  # Replace connections older than this many seconds
+    db_pool_pre_ping: str = "idle"  # 'always', 'idle' (only after db_pool_ping_idle_seconds unused) or 'never'
+    db_pool_ping_idle_seconds: float = 30.0
+    
     # JWT
     secret_key: str = os.getenv("SECRET_KEY", "change-this-in-production")
     algorithm: str = "HS256"
@@ -43,6 +58,47 @@ class Settings(BaseSettings):
     host: str = "0.0.0.0"
     port: int = 8000
     
+    # Listening history retention
+    listening_retention_months: int = 12  # Raw listening sessions kept in the database
+    listening_archive_dir: str = "./archive/listening_sessions"
+    listening_archive_format: str = "ndjson"  # 'ndjson' (gzip) or 'parquet' (requires pyarrow)
+    listening_event_max_skew_seconds: float = 300.0  # Reported plays may start this far in the future (client clocks)
+    
+    # Play counts (write-behind buffer)
+    play_count_backend: str = "memory"  # 'memory' (per process) or 'redis' (shared, uses REDIS_URL)
+    play_count_flush_seconds: float = 5.0  # How often buffered plays are written to the database
+    play_count_dedupe_seconds: float = 30.0  # Repeat plays of a song by the same user within this window count once
+    
+    # Listening event log (append locally, load into the database in the background)
+    listening_event_log_enabled: bool = False
+    listening_event_log_dir: str = "./var/listening_events"
+    listening_event_log_fsync_ms: int = 50  # Group-commit interval for appended events
+    listening_event_log_segment_bytes: int = 8_000_000  # Seal segments at this size...
+    listening_event_log_segment_seconds: float = 10.0  # ...or after being open this long
+    listening_event_log_load_seconds: float = 5.0  # How often sealed segments are loaded
+    listening_event_log_max_load_failures: int = 5  # Failed loads before a segment is quarantined
+    
+    # Typeahead autocomplete (in-memory prefix indexes per library)
+    autocomplete_max_libraries: int = 200  # Least recently used libraries beyond this are evicted
+    autocomplete_ttl_seconds: int = 300  # Rebuild indexes this often to pick up other workers' changes
+    
+    # Browse facets (artists, albums, genres) cached per library
+    browse_cache_ttl_seconds: int = 300
+    
+    # Cache for computed results (playlist listings, stats, browse facets)
+    cache_backend: str = "memory"  # 'memory' (per process LRU) or 'redis' (shared, uses REDIS_URL)
+    cache_max_entries: int = 5000  # Memory backend: least recently used entries beyond this are evicted
+    cache_default_ttl_seconds: int = 300
+    cache_stats_ttl_seconds: int = 60  # Listening statistics
+    cache_max_ttl_seconds: int = 3600  # Upper bound for every entry's TTL
+    cache_lock_seconds: float = 5.0  # On a miss, other requests wait this long for the first to compute the value
+    cache_redis_max_connections: int = 20  # Connection pool size per process
+    cache_key_prefix: str = "cache"
+    
+    # Cross-worker invalidation of local caches (autocomplete indexes, in-memory cache entries)
+    invalidation_bus_backend: str = "memory"  # 'memory' (this process only), 'redis' (pub/sub on REDIS_URL) or 'postgres' (LISTEN/NOTIFY)
+    invalidation_bus_channel: str = "streamflow_invalidation"
+    
     # Optional: Redis
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
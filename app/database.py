@@ -1,22 +1,102 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from .config import settings
+from .utils.db_pool import pool_options, instrument
+from .utils.db_routing import ReplicaRouter, SAFE_METHODS, writer_key
 
 # Use the SSL-configured database URL
+database_url = settings.database_url_with_ssl
 engine = create_engine(
-    settings.database_url_with_ssl,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    echo=False           # Set to True for SQL debugging
+    database_url,
+    echo=False,  # Set to True for SQL debugging
+    **pool_options(database_url)  # Size, overflow, timeout, recycle and pre-ping from settings
 )
+instrument("sync", engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional read replica for GET requests (see ReplicaRouter)
+replica_url = settings.database_replica_url
+if replica_url and replica_url.startswith("postgres://"):
+    replica_url = replica_url.replace("postgres://", "postgresql://", 1)
+replica_engine = None
+if replica_url:
+    replica_engine = create_engine(replica_url, echo=False, **pool_options(replica_url))
+    instrument("replica", replica_engine)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+replica_router = ReplicaRouter(replica_engine)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def use_replica(request: Request) -> bool:
+    if not replica_router.use_replica(request):
+        return False
+    if replica_router.lag_is_stale():
+        replica_router.refresh_lag()
+    return replica_router.replica_healthy()
+
+def get_db(request: Request):
+    """Session on the replica for reads when one is configured and current, else the primary"""
+    db = ReplicaSessionLocal() if use_replica(request) else SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        if request.method not in SAFE_METHODS:
+            replica_router.mark_write(writer_key(request))
+
+# Async engine for handlers that must not block the event loop.
+# Same database, asyncio drivers: asyncpg for PostgreSQL, aiosqlite for SQLite.
+def async_database_url(url: str):
+    url = make_url(url)
+    query = dict(url.query)
+    sslmode = query.pop("sslmode", None)
+    if url.get_backend_name() == "postgresql":
+        if sslmode:
+            query["ssl"] = sslmode  # asyncpg's spelling of sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite", query=query)
+    return url
+
+_async_engines = {}
+
+def _get_async_engine(name: str, url: str):
+    """Created on first use so the sync-only scripts don't need the async drivers"""
+    if name not in _async_engines:
+        _async_engines[name] = create_async_engine(
+            async_database_url(url),
+            echo=False,
+            **pool_options(url, asyncio=True)
+        )
+        instrument(name, _async_engines[name].sync_engine)
+    return _async_engines[name]
+
+def get_async_engine():
+    return _get_async_engine("async", database_url)
+
+def get_async_replica_engine():
+    return _get_async_engine("async-replica", replica_url)
+
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db(request: Request):
+    """get_db for async handlers; the lag check (when due) runs off the event loop"""
+    replica = replica_router.use_replica(request)
+    if replica and replica_router.lag_is_stale():
+        await run_in_threadpool(replica_router.refresh_lag)
+    engine = get_async_replica_engine() if replica and replica_router.replica_healthy() else get_async_engine()
+    try:
+        async with AsyncSessionLocal(bind=engine) as db:
+            yield db
+    finally:
+        if request.method not in SAFE_METHODS:
+            replica_router.mark_write(writer_key(request))
+
+async def dispose_async_engine():
+    for engine in _async_engines.values():
+        await engine.dispose()
@@ -7,9 +7,15 @@ import os
 import time
 import subprocess
 from pathlib import Path
-from .database import engine, Base
+from sqlalchemy.exc import StatementError
+from .database import engine, Base, SessionLocal, dispose_async_engine
 from .api import auth, songs, playlists, streaming, admin, upload
 from .config import settings
+from .services.listening_retention_service import ListeningRetentionService
+from .services.play_count_buffer import play_count_buffer
+from .services.listening_event_log import listening_event_log
+from .services.invalidation_bus import invalidation_bus
+from .utils.sql import InvalidIdentifier
 
 # Ensure uploads directory exists with error handling
 def create_directory_safely(path: Path, name: str):
@@ -73,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # Library GETs support If-None-Match revalidation
 )
 
 # Static files
@@ -102,25 +109,7 @@ async def startup_event():
             print(f"🔄 Attempting to connect to database (attempt {attempt + 1}/{max_retries})...")
             Base.metadata.create_all(bind=engine)
             print("✅ Database tables created successfully")
-            
-            # Run production setup if in Railway environment
-            if os.getenv("RAILWAY_ENVIRONMENT") or os.getenv("DATABASE_URL"):
-                print("🚀 Running production setup...")
-                try:
-                    result = subprocess.run(["python", "scripts/deployment/setup_production.py"],
-                                          capture_output=True, text=True, timeout=60)
-                    if result.returncode == 0:
-                        print("✅ Production setup completed successfully")
-                    else:
-                        print(f"⚠️ Production setup failed with return code {result.returncode}")
-                        print(f"📄 STDOUT: {result.stdout}")
-                        print(f"❌ STDERR: {result.stderr}")
-                except subprocess.TimeoutExpired:
-                    print("⚠️ Production setup timed out after 60 seconds")
-                except Exception as e:
-                    print(f"⚠️ Production setup failed with exception: {e}")
-            
-            return
+            break
         except Exception as e:
             print(f"❌ Failed to create database tables (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
@@ -130,6 +119,57 @@ async def startup_event():
             else:
                 print("❌ All database connection attempts failed. Application will start without database tables.")
                 print("💡 Make sure your DATABASE_URL environment variable is set correctly in Railway.")
+                return
+    
+    # Make sure upcoming listening_sessions partitions exist (PostgreSQL only). A failure
+    # here is retried by the archive script and must not keep the services below from starting.
+    db = SessionLocal()
+    try:
+        created = ListeningRetentionService.ensure_partitions(db)
+        db.commit()
+        if created:
+            print(f"✅ Created listening session partitions: {', '.join(created)}")
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️ Listening session partition maintenance failed: {e}")
+    finally:
+        db.close()
+    
+    # Evict locally cached entries when other workers publish changes
+    invalidation_bus.start()
+    
+    # Start writing buffered play counts to the database
+    play_count_buffer.start()
+    
+    # Load listening events appended locally into the database in the background
+    if settings.listening_event_log_enabled:
+        listening_event_log.start()
+    
+    # Run production setup if in Railway environment
+    if os.getenv("RAILWAY_ENVIRONMENT") or os.getenv("DATABASE_URL"):
+        print("🚀 Running production setup...")
+        try:
+            result = subprocess.run(["python", "scripts/deployment/setup_production.py"],
+                                  capture_output=True, text=True, timeout=60)
+            if result.returncode == 0:
+                print("✅ Production setup completed successfully")
+            else:
+                print(f"⚠️ Production setup failed with return code {result.returncode}")
+                print(f"📄 STDOUT: {result.stdout}")
+                print(f"❌ STDERR: {result.stderr}")
+        except subprocess.TimeoutExpired:
+            print("⚠️ Production setup timed out after 60 seconds")
+        except Exception as e:
+            print(f"⚠️ Production setup failed with exception: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush buffered play counts and listening events and close database connections"""
+    await play_count_buffer.stop()
+    invalidation_bus.stop()
+    if settings.listening_event_log_enabled:
+        await listening_event_log.stop()
+    await dispose_async_engine()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -160,6 +200,13 @@ async def not_found_handler(request: Request, exc: HTTPException):
         # Fallback to JSON response
         return {"error": "Not Found", "message": "The requested resource was not found"}
 
+@app.exception_handler(StatementError)
+async def invalid_identifier_handler(request: Request, exc: StatementError):
+    """A malformed id in a path, query or body can't match any row: answer 404"""
+    if isinstance(exc.orig, InvalidIdentifier):
+        return await not_found_handler(request, exc)
+    raise exc
+
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc: HTTPException):
     """Handle 500 errors with custom page"""
@@ -1,5 +1,6 @@
 from .user import User
 from .song import Song
 from .playlist import Playlist, PlaylistSong
+from .artist import Artist, Album
 
-__all__ = ["User", "Song", "Playlist", "PlaylistSong"]
\ No newline at end of file
+__all__ = ["User", "Song", "Playlist", "PlaylistSong", "Artist", "Album"]
\ No newline at end of file
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, UniqueConstraint
+from sqlalchemy.orm import relationship
+from ..database import Base
+from ..utils.sql import GUID
+import datetime
+import uuid
+
+class Artist(Base):
+    """An artist in one user's library, keyed by its normalized name"""
+    __tablename__ = "artists"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "name_key", name="uq_artists_owner_name_key"),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    owner_id = Column(GUID, ForeignKey("users.id"))
+    name = Column(String, nullable=False)  # Display name, as first uploaded
+    name_key = Column(String, nullable=False)  # Case-folded, whitespace-collapsed name
+    # Denormalized counters, maintained incrementally by LibraryService
+    song_count = Column(Integer, nullable=False, default=0, server_default="0")
+    album_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_duration = Column(Float, nullable=False, default=0.0, server_default="0")  # in seconds
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    # Relationships
+    albums = relationship("Album", back_populates="artist")
+    songs = relationship("Song", back_populates="artist_entity")
+
+class Album(Base):
+    """An album by one artist in one user's library"""
+    __tablename__ = "albums"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "artist_id", "name_key", name="uq_albums_owner_artist_name_key"),
+    )
+    
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    owner_id = Column(GUID, ForeignKey("users.id"))
+    artist_id = Column(GUID, ForeignKey("artists.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    name_key = Column(String, nullable=False)
+    album_art_path = Column(String)  # Artwork of the first song that had some
+    year = Column(Integer)
+    # Denormalized counters, maintained incrementally by LibraryService
+    song_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_duration = Column(Float, nullable=False, default=0.0, server_default="0")  # in seconds
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+    # Relationships
+    artist = relationship("Artist", back_populates="albums")
+    songs = relationship("Song", back_populates="album_entity")
@@ -1,17 +1,22 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Table
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Float, Table, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..utils.sql import GUID
 import datetime
 import uuid
 
 class Playlist(Base):
     __tablename__ = "playlists"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False)
     description = Column(String)
     cover_image = Column(String)
-    owner_id = Column(String, ForeignKey("users.id"))
+    owner_id = Column(GUID, ForeignKey("users.id"), index=True)
+    # Denormalized counters, maintained incrementally by PlaylistService
+    song_count = Column(Integer, nullable=False, default=0, server_default="0")
+    total_duration = Column(Float, nullable=False, default=0.0, server_default="0")  # in seconds
+    total_play_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
@@ -27,10 +32,17 @@ class Playlist(Base):
 
 class PlaylistSong(Base):
     __tablename__ = "playlist_songs"
+    __table_args__ = (
+        # Serves ordered and keyset-paginated reads of a playlist's tracks
+        Index("ix_playlist_songs_playlist_id_position", "playlist_id", "position"),
+        # Playlists containing a song (play count and delete bookkeeping)
+        Index("ix_playlist_songs_song_id", "song_id"),
+        UniqueConstraint("playlist_id", "song_id", name="uq_playlist_songs_playlist_song"),
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    playlist_id = Column(String, ForeignKey("playlists.id"))
-    song_id = Column(String, ForeignKey("songs.id"))
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    playlist_id = Column(GUID, ForeignKey("playlists.id"))
+    song_id = Column(GUID, ForeignKey("songs.id"))
     position = Column(Integer, nullable=False)
     added_at = Column(DateTime, default=datetime.datetime.utcnow)
     
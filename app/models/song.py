@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Text, Table
+from sqlalchemy import Column, String, Float, Date, DateTime, Integer, ForeignKey, Text, Table, Index, DDL, event, func
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..utils.sql import GUID
 import datetime
 import uuid
 
@@ -8,14 +9,31 @@ import uuid
 liked_songs_table = Table(
     "liked_songs",
     Base.metadata,
-    Column("user_id", String, ForeignKey("users.id"), primary_key=True),
-    Column("song_id", String, ForeignKey("songs.id"), primary_key=True)
+    Column("user_id", GUID, ForeignKey("users.id"), primary_key=True),
+    Column("song_id", GUID, ForeignKey("songs.id"), primary_key=True),
+    Column("liked_at", DateTime, nullable=False, default=datetime.datetime.utcnow, server_default=func.now()),
+    # Liked songs newest first, with keyset pagination (see GET /api/songs/liked/page/)
+    Index("ix_liked_songs_user_liked_at", "user_id", "liked_at", "song_id"),
+    # Removing a deleted song's likes
+    Index("ix_liked_songs_song_id", "song_id")
 )
 
 class Song(Base):
     __tablename__ = "songs"
+    __table_args__ = (
+        # Keyset pagination for each library sort order (see GET /api/songs/page/)
+        Index("ix_songs_uploaded_by_created_at", "uploaded_by", "created_at", "id"),
+        Index("ix_songs_uploaded_by_title", "uploaded_by", "title", "id"),
+        Index("ix_songs_uploaded_by_artist", "uploaded_by", "artist", "id"),
+        Index("ix_songs_uploaded_by_play_count", "uploaded_by", "play_count", "id"),
+        # Genre filter within a library, and across all libraries for admins
+        Index("ix_songs_uploaded_by_genre", "uploaded_by", "genre", "created_at", "id"),
+        Index("ix_songs_genre", "genre"),
+        # Artist pages and duplicate detection
+        Index("ix_songs_artist_album_title", "artist_id", "album_id", "title"),
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
     artist = Column(String, nullable=False)
     album = Column(String)
@@ -28,29 +46,115 @@ class Song(Base):
     genre = Column(String)
     year = Column(Integer)
     album_art_path = Column(String)
-    play_count = Column(Integer, default=0)  # Track number of times song has been played
-    uploaded_by = Column(String, ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    play_count = Column(Integer, nullable=False, default=0, server_default="0")  # Track number of times song has been played
+    uploaded_by = Column(GUID, ForeignKey("users.id"))
+    # Normalized artist and album, linked by LibraryService; artist/album above stay the display text
+    artist_id = Column(GUID, ForeignKey("artists.id"))
+    album_id = Column(GUID, ForeignKey("albums.id"), index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     # Relationships
     uploader = relationship("User", back_populates="uploaded_songs")
+    artist_entity = relationship("Artist", back_populates="songs")
+    album_entity = relationship("Album", back_populates="songs")
     playlist_songs = relationship("PlaylistSong", back_populates="song")
     liked_by = relationship("User", secondary=liked_songs_table, back_populates="liked_songs")
     listening_sessions = relationship("ListeningSession", back_populates="song")
 
+# Full-text search over title, artist and album (see SearchService).
+# PostgreSQL: a generated, weighted tsvector column with a GIN index.
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+SONG_SEARCH_DDL = {
+    "postgresql": [
+        "ALTER TABLE songs ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(artist, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(album, '')), 'C')) STORED",
+        "CREATE INDEX IF NOT EXISTS ix_songs_search_vector ON songs USING gin (search_vector)",
+    ],
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS songs_fts USING fts5("
+        "title, artist, album, content='songs', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS songs_fts_insert AFTER INSERT ON songs BEGIN "
+        "INSERT INTO songs_fts(rowid, title, artist, album) VALUES (new.rowid, new.title, new.artist, new.album); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS songs_fts_delete AFTER DELETE ON songs BEGIN "
+        "INSERT INTO songs_fts(songs_fts, rowid, title, artist, album) "
+        "VALUES ('delete', old.rowid, old.title, old.artist, old.album); "
+        "END",
+        "CREATE TRIGGER IF NOT EXISTS songs_fts_update AFTER UPDATE OF title, artist, album ON songs BEGIN "
+        "INSERT INTO songs_fts(songs_fts, rowid, title, artist, album) "
+        "VALUES ('delete', old.rowid, old.title, old.artist, old.album); "
+        "INSERT INTO songs_fts(rowid, title, artist, album) VALUES (new.rowid, new.title, new.artist, new.album); "
+        "END",
+    ],
+}
+
+for _dialect, _statements in SONG_SEARCH_DDL.items():
+    for _statement in _statements:
+        event.listen(Song.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+
 class ListeningSession(Base):
     __tablename__ = "listening_sessions"
+    __table_args__ = (
+        # Serves per-user, per-playlist and per-song listening stats with date ranges
+        Index("ix_listening_sessions_user_playlist_song_started", "user_id", "playlist_id", "song_id", "started_at"),
+        # Sessions of a song or playlist being deleted
+        Index("ix_listening_sessions_song_id", "song_id"),
+        Index("ix_listening_sessions_playlist_id", "playlist_id"),
+        # Monthly range partitions on PostgreSQL, managed by ListeningRetentionService
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    song_id = Column(String, ForeignKey("songs.id"), nullable=False)
-    playlist_id = Column(String, ForeignKey("playlists.id"))  # Optional, for tracking playlist listening
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(GUID, ForeignKey("users.id"), nullable=False)
+    song_id = Column(GUID, ForeignKey("songs.id"), nullable=False)
+    playlist_id = Column(GUID, ForeignKey("playlists.id"))  # Optional, for tracking playlist listening
     duration_seconds = Column(Float, nullable=False)  # How long the song was actually listened to
-    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Part of the primary key because partitioned tables require the partition key in it
+    started_at = Column(DateTime, primary_key=True, default=datetime.datetime.utcnow)
     ended_at = Column(DateTime, default=datetime.datetime.utcnow)
     
     # Relationships
     user = relationship("User", back_populates="listening_sessions")
     song = relationship("Song", back_populates="listening_sessions")
-    playlist = relationship("Playlist", back_populates="listening_sessions")
\ No newline at end of file
+    playlist = relationship("Playlist", back_populates="listening_sessions")
+
+# Rollup key used for listening that did not happen inside a playlist
+NO_PLAYLIST = "00000000-0000-0000-0000-000000000000"
+
+class ListeningDailyRollup(Base):
+    """
+    Listening time aggregated per user, song, playlist and day.
+    Maintained incrementally by ListeningService; derived data, so it carries no
+    foreign keys and outlives the raw listening_sessions rows it was built from.
+    """
+    __tablename__ = "listening_daily_rollups"
+    __table_args__ = (
+        # Rollups of a song being deleted
+        Index("ix_listening_daily_rollups_song_id", "song_id"),
+    )
+    
+    user_id = Column(GUID, primary_key=True)
+    playlist_id = Column(GUID, primary_key=True, default=NO_PLAYLIST)  # NO_PLAYLIST outside playlists
+    song_id = Column(GUID, primary_key=True)
+    day = Column(Date, primary_key=True)
+    total_seconds = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
+
+class ListeningEventSegment(Base):
+    """
+    Ledger of listening event log segments already loaded into listening_sessions.
+    Written in the same transaction as the segment's rows, so replaying a
+    segment after a crash never loads it twice. Segments that keep failing to
+    load are moved aside and recorded as quarantined, with the last error.
+    """
+    __tablename__ = "listening_event_segments"
+    
+    name = Column(String, primary_key=True)
+    event_count = Column(Integer, nullable=False, default=0)
+    loaded_at = Column(DateTime, default=datetime.datetime.utcnow)
+    status = Column(String, nullable=False, default="loaded", server_default="loaded")  # 'loaded' or 'quarantined'
+    error = Column(Text, nullable=True)
@@ -1,13 +1,14 @@
-from sqlalchemy import Column, String, DateTime, Boolean
+from sqlalchemy import Column, String, DateTime, Boolean, Integer
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..utils.sql import GUID
 import datetime
 import uuid
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(GUID, primary_key=True, default=lambda: str(uuid.uuid4()))
     username = Column(String, unique=True, nullable=False)
     email = Column(String, unique=True, nullable=False)
     hashed_password = Column(String, nullable=False)
@@ -16,6 +17,8 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     role = Column(String, default="user")  # 'user' or 'admin'
+    # Bumped by every change to the user's songs, likes or playlists (see LibraryVersionService)
+    library_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationships
     uploaded_songs = relationship("Song", back_populates="uploader")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from .song import SongResponse
 from .user import UserResponse
 
@@ -33,6 +33,40 @@ class PlaylistResponseWithOwner(PlaylistResponse):
     class Config:
         from_attributes = True
 
+class PlaylistSummary(BaseModel):
+    """Lightweight playlist listing backed by the denormalized counters"""
+    id: str
+    name: str
+    cover_image: Optional[str] = None
+    song_count: int = 0
+    total_duration: float = 0.0  # in seconds
+    total_play_count: int = 0
+    
+    class Config:
+        from_attributes = True
+
+class PlaylistSongsPage(BaseModel):
+    """One page of a playlist's tracks, ordered by position"""
+    items: List[Dict[str, Any]] = []
+    next_cursor: Optional[str] = None
+
 class PlaylistSongAdd(BaseModel):
     song_id: str
-    position: Optional[int] = None
\ No newline at end of file
+    position: Optional[int] = None  # 0-based index to insert at; appends when omitted
+
+class PlaylistSongsBatch(BaseModel):
+    """Song ids to add to or remove from a playlist in one request"""
+    song_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class PlaylistClone(BaseModel):
+    name: Optional[str] = None  # defaults to "<source name> (Copy)"
+
+class PlaylistMerge(BaseModel):
+    """Playlists whose songs are appended to the target playlist, in the order given"""
+    source_playlist_ids: List[str] = Field(..., min_length=1, max_length=50)
+    delete_sources: bool = False
+
+class PlaylistSongMove(BaseModel):
+    """Place a song immediately before or after another song in the same playlist"""
+    before: Optional[str] = None  # song id
+    after: Optional[str] = None  # song id
\ No newline at end of file
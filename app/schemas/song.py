@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class SongBase(BaseModel):
     title: str
@@ -19,6 +19,13 @@ class SongUpload(BaseModel):
     genre: Optional[str] = None
     year: Optional[int] = None
 
+class SongUpdate(BaseModel):
+    title: Optional[str] = Field(None, min_length=1)
+    artist: Optional[str] = Field(None, min_length=1)
+    album: Optional[str] = None
+    genre: Optional[str] = None
+    year: Optional[int] = None
+
 class SongResponse(SongBase):
     id: str
     duration: Optional[float] = None
@@ -31,4 +38,28 @@ class SongResponse(SongBase):
     created_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SongsPage(BaseModel):
+    items: List[SongResponse]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page; null on the last page
+
+class LikedSongResponse(SongResponse):
+    liked_at: datetime
+
+class LikedSongsPage(BaseModel):
+    items: List[LikedSongResponse]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to fetch the next page; null on the last page
+
+class LikedSongsBatch(BaseModel):
+    song_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class ListeningEvent(BaseModel):
+    """A completed play reported by the client"""
+    song_id: str
+    playlist_id: Optional[str] = None
+    started_at: datetime
+    duration_seconds: float = Field(..., ge=0)
+
+class ListeningEventBatch(BaseModel):
+    events: List[ListeningEvent] = Field(..., min_length=1, max_length=500)
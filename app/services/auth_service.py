@@ -1,21 +1,24 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
-from ..database import get_db
+from ..database import get_db, get_async_db
 from ..models.user import User
 from ..config import settings
 
 security = HTTPBearer()
 
 
-async def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+def get_token_username(token) -> str:
     try:
         payload = jwt.decode(token.credentials, settings.secret_key, algorithms=[settings.algorithm])
         username: str = payload.get("sub")
@@ -23,6 +26,11 @@ async def get_current_user(token: str = Depends(security), db: Session = Depends
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    return username
+
+
+async def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
+    username = get_token_username(token)
     
     user = db.query(User).filter(User.username == username).first()
     if user is None:
@@ -31,6 +39,18 @@ async def get_current_user(token: str = Depends(security), db: Session = Depends
     return user
 
 
+async def get_current_user_async(token: str = Depends(security), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for handlers on the async session; never blocks the event loop"""
+    username = get_token_username(token)
+    
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalar_one_or_none()
+    if user is None:
+        raise credentials_exception
+    
+    return user
+
+
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -0,0 +1,187 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.song import Song
+from ..models.user import User
+from .invalidation_bus import invalidation_bus, SongSaved, SongDeleted, UserUpdated
+
+# Library key used for admins, who search the whole catalogue
+ALL_SONGS = "*"
+# Upper bound on index entries inspected per lookup, so very short prefixes stay fast
+MAX_SCAN = 2000
+
+# (normalized suffix starting at a word, kind, display value, song id)
+Entry = Tuple[str, str, str, str]
+
+
+def normalize(text: str) -> str:
+    """Case-fold, strip accents and collapse whitespace for prefix matching"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+class LibraryIndex:
+    """
+    Sorted array of normalized titles, artists and albums for one library.
+
+    Every value is indexed at each word start, so "road" finds "Abbey Road".
+    Lookups bisect to the first entry with the prefix and walk forward.
+    """
+
+    def __init__(self):
+        self.entries: List[Entry] = []
+        self.by_song: Dict[str, List[Entry]] = {}
+        self.built_at = time.monotonic()
+
+    @staticmethod
+    def _entries_for(song_id: str, title: str, artist: str, album: Optional[str]) -> List[Entry]:
+        entries = []
+        for kind, value in (("title", title), ("artist", artist), ("album", album)):
+            if not value:
+                continue
+            key = normalize(value)
+            for match in re.finditer(r"\w+", key):
+                entries.append((key[match.start():], kind, value, song_id))
+        return entries
+
+    def add(self, song_id: str, title: str, artist: str, album: Optional[str]) -> None:
+        self.remove(song_id)
+        entries = self._entries_for(song_id, title, artist, album)
+        for entry in entries:
+            bisect.insort(self.entries, entry)
+        self.by_song[song_id] = entries
+
+    def remove(self, song_id: str) -> None:
+        for entry in self.by_song.pop(song_id, []):
+            position = bisect.bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    @classmethod
+    def build(cls, rows) -> "LibraryIndex":
+        index = cls()
+        for song_id, title, artist, album in rows:
+            entries = cls._entries_for(song_id, title, artist, album)
+            index.by_song[song_id] = entries
+            index.entries.extend(entries)
+        index.entries.sort()
+        return index
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """Distinct titles, artists and albums starting with a word matching `prefix`"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        suggestions: Dict[Tuple[str, str], dict] = {}
+        position = bisect.bisect_left(self.entries, (prefix,))
+        end = min(len(self.entries), position + MAX_SCAN)
+        while position < end:
+            key, kind, value, song_id = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            suggestion = suggestions.get((kind, value))
+            if suggestion is None:
+                suggestion = {"type": kind, "value": value, "song_ids": set(), "exact": key == normalize(value)}
+                suggestions[(kind, value)] = suggestion
+            suggestion["song_ids"].add(song_id)
+            position += 1
+
+        # Values that start with the prefix first, then by how many songs they cover
+        ranked = sorted(
+            suggestions.values(),
+            key=lambda s: (not s["exact"], -len(s["song_ids"]), s["value"].casefold())
+        )
+        results = []
+        for suggestion in ranked[:limit]:
+            result = {"type": suggestion["type"], "value": suggestion["value"], "song_count": len(suggestion["song_ids"])}
+            if suggestion["type"] == "title" and len(suggestion["song_ids"]) == 1:
+                result["song_id"] = next(iter(suggestion["song_ids"]))
+            results.append(result)
+        return results
+
+
+class AutocompleteService:
+    """
+    Per-library prefix indexes kept in memory for typeahead suggestions.
+
+    Indexes are built on first use, updated incrementally from song events
+    on the invalidation bus (including other workers' uploads, edits and
+    deletes), rebuilt after AUTOCOMPLETE_TTL_SECONDS in case an event was
+    missed and evicted least recently used beyond AUTOCOMPLETE_MAX_LIBRARIES.
+    """
+
+    def __init__(self):
+        self._indexes: "OrderedDict[str, LibraryIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def library_key(user: User) -> str:
+        return ALL_SONGS if user.role == "admin" else user.id
+
+    def _get(self, key: str) -> Optional[LibraryIndex]:
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                return None
+            if time.monotonic() - index.built_at > settings.autocomplete_ttl_seconds:
+                del self._indexes[key]
+                return None
+            self._indexes.move_to_end(key)
+            return index
+
+    def index_for(self, db: Session, user: User) -> LibraryIndex:
+        key = self.library_key(user)
+        index = self._get(key)
+        if index is not None:
+            return index
+
+        query = db.query(Song.id, Song.title, Song.artist, Song.album)
+        if key != ALL_SONGS:
+            query = query.filter(Song.uploaded_by == user.id)
+        index = LibraryIndex.build(query.all())
+
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > settings.autocomplete_max_libraries:
+                self._indexes.popitem(last=False)
+        return index
+
+    def suggest(self, db: Session, user: User, prefix: str, limit: int = 10) -> List[dict]:
+        index = self.index_for(db, user)
+        with self._lock:
+            return index.suggest(prefix, limit)
+
+    def song_saved(self, event: SongSaved, remote: bool = False) -> None:
+        """Add an uploaded or edited song to the loaded indexes that can see it"""
+        with self._lock:
+            for key in (event.owner_id, ALL_SONGS):
+                index = self._indexes.get(key)
+                if index is not None:
+                    index.add(event.song_id, event.title, event.artist, event.album)
+
+    def song_deleted(self, event: SongDeleted, remote: bool = False) -> None:
+        """Remove a deleted song from the loaded indexes that contain it"""
+        with self._lock:
+            for key in (event.owner_id, ALL_SONGS):
+                index = self._indexes.get(key)
+                if index is not None:
+                    index.remove(event.song_id)
+
+    def user_updated(self, event: UserUpdated, remote: bool = False) -> None:
+        with self._lock:
+            self._indexes.pop(event.user_id, None)
+
+
+autocomplete_service = AutocompleteService()
+invalidation_bus.subscribe(SongSaved, autocomplete_service.song_saved)
+invalidation_bus.subscribe(SongDeleted, autocomplete_service.song_deleted)
+invalidation_bus.subscribe(UserUpdated, autocomplete_service.user_updated)
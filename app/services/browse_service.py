@@ -0,0 +1,175 @@
+from typing import List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.artist import Artist, Album
+from ..models.song import Song
+from ..models.user import User
+from .cache_service import cache_service
+from .invalidation_bus import invalidation_bus, SongSaved, SongDeleted, UserUpdated
+
+# Library key used for admins, who browse the whole catalogue
+ALL_SONGS = "*"
+
+
+class BrowseService:
+    """
+    Artist, album and genre facets of a library.
+
+    A user's artists and albums are read from the Artist and Album tables,
+    whose counters LibraryService maintains. The admins' catalogue-wide view
+    and genres take one GROUP BY over songs per facet.
+
+    Results are kept in the cache service per library and facet, tagged
+    with the library. Song events on the invalidation bus (uploads, deletes
+    and metadata edits, on any worker) invalidate the owner's library and the
+    admins' view of all songs; entries also expire after
+    BROWSE_CACHE_TTL_SECONDS in case an event was missed.
+    """
+
+    FACETS = ("artists", "albums", "genres")
+
+    @staticmethod
+    def library_key(user: User) -> str:
+        return ALL_SONGS if user.role == "admin" else user.id
+
+    @staticmethod
+    def _scoped(query, key: str):
+        return query if key == ALL_SONGS else query.filter(Song.uploaded_by == key)
+
+    @staticmethod
+    def _artists(db: Session, key: str) -> List[dict]:
+        if key != ALL_SONGS:
+            artwork = db.query(func.max(Album.album_art_path)).filter(
+                Album.artist_id == Artist.id
+            ).correlate(Artist).scalar_subquery()
+            rows = db.query(
+                Artist.id, Artist.name, Artist.song_count, Artist.album_count,
+                Artist.total_duration, artwork.label("artwork")
+            ).filter(
+                Artist.owner_id == key,
+                Artist.song_count > 0
+            ).order_by(func.lower(Artist.name)).all()
+            return [
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "song_count": row.song_count,
+                    "album_count": row.album_count,
+                    "total_duration": row.total_duration,
+                    "artwork": row.artwork,
+                }
+                for row in rows
+            ]
+
+        rows = BrowseService._scoped(db.query(
+            Song.artist,
+            func.count(Song.id).label("song_count"),
+            func.count(func.distinct(Song.album)).label("album_count"),
+            func.coalesce(func.sum(Song.duration), 0).label("total_duration"),
+            func.max(Song.album_art_path).label("artwork")
+        ), key).group_by(Song.artist).order_by(func.lower(Song.artist)).all()
+        return [
+            {
+                "name": row.artist,
+                "song_count": row.song_count,
+                "album_count": row.album_count,
+                "total_duration": row.total_duration,
+                "artwork": row.artwork,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _albums(db: Session, key: str) -> List[dict]:
+        if key != ALL_SONGS:
+            rows = db.query(
+                Album.id, Album.name, Album.artist_id, Artist.name.label("artist"), Album.song_count,
+                Album.total_duration, Album.year, Album.album_art_path
+            ).join(Artist, Artist.id == Album.artist_id).filter(
+                Album.owner_id == key,
+                Album.song_count > 0
+            ).order_by(func.lower(Album.name), func.lower(Artist.name)).all()
+            return [
+                {
+                    "id": row.id,
+                    "name": row.name,
+                    "artist": row.artist,
+                    "artist_id": row.artist_id,
+                    "song_count": row.song_count,
+                    "total_duration": row.total_duration,
+                    "year": row.year,
+                    "artwork": row.album_art_path,
+                }
+                for row in rows
+            ]
+
+        rows = BrowseService._scoped(db.query(
+            Song.album,
+            Song.artist,
+            func.count(Song.id).label("song_count"),
+            func.coalesce(func.sum(Song.duration), 0).label("total_duration"),
+            func.max(Song.year).label("year"),
+            func.max(Song.album_art_path).label("artwork")
+        ), key).filter(Song.album.isnot(None), Song.album != "").group_by(
+            Song.album, Song.artist
+        ).order_by(func.lower(Song.album), func.lower(Song.artist)).all()
+        return [
+            {
+                "name": row.album,
+                "artist": row.artist,
+                "song_count": row.song_count,
+                "total_duration": row.total_duration,
+                "year": row.year,
+                "artwork": row.artwork,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def _genres(db: Session, key: str) -> List[dict]:
+        rows = BrowseService._scoped(db.query(
+            Song.genre,
+            func.count(Song.id).label("song_count"),
+            func.count(func.distinct(Song.artist)).label("artist_count"),
+            func.coalesce(func.sum(Song.duration), 0).label("total_duration"),
+            func.max(Song.album_art_path).label("artwork")
+        ), key).filter(Song.genre.isnot(None), Song.genre != "").group_by(
+            Song.genre
+        ).order_by(func.lower(Song.genre)).all()
+        return [
+            {
+                "name": row.genre,
+                "song_count": row.song_count,
+                "artist_count": row.artist_count,
+                "total_duration": row.total_duration,
+                "artwork": row.artwork,
+            }
+            for row in rows
+        ]
+
+    def facet(self, db: Session, user: User, facet: str) -> List[dict]:
+        """Cached facet values for the user's library"""
+        key = self.library_key(user)
+        compute = {"artists": self._artists, "albums": self._albums, "genres": self._genres}[facet]
+        return cache_service.get_or_set(
+            f"browse:{facet}:{key}",
+            lambda: compute(db, key),
+            ttl=settings.browse_cache_ttl_seconds,
+            tags=[f"browse:{key}"]
+        )
+
+    def invalidate(self, owner_id: Optional[str]) -> None:
+        """Drop cached facets of a library whose songs changed"""
+        cache_service.invalidate_tags(f"browse:{owner_id}", f"browse:{ALL_SONGS}")
+
+    def library_changed(self, event, remote: bool = False) -> None:
+        if remote and cache_service.shared:
+            return  # The publisher already invalidated the shared entries
+        self.invalidate(event.user_id if isinstance(event, UserUpdated) else event.owner_id)
+
+
+browse_service = BrowseService()
+invalidation_bus.subscribe(SongSaved, browse_service.library_changed)
+invalidation_bus.subscribe(SongDeleted, browse_service.library_changed)
+invalidation_bus.subscribe(UserUpdated, browse_service.library_changed)
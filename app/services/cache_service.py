@@ -0,0 +1,325 @@
+import asyncio
+import functools
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+from ..config import settings
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-memory backend is always available
+    redis = None
+
+# Backend failures are cache misses, never request failures
+BACKEND_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+LOCK_POLL_SECONDS = 0.05
+
+
+class MemoryCacheBackend:
+    """Per-process LRU of serialized values; each worker keeps its own entries"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._tags: Dict[str, int] = {}
+        self._locks: Dict[str, Tuple[str, float]] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        max_entries = self._max_entries or settings.cache_max_entries
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def tag_versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._tags.get(tag, 0) for tag in tags]
+
+    def bump_tags(self, tags: List[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(key)
+            if held is not None and held[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, now + ttl)
+            return token
+
+    def release(self, key: str, token: str) -> None:
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == token:
+                del self._locks[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._locks.clear()
+
+
+class RedisCacheBackend:
+    """Entries shared by all workers, through a pooled Redis client"""
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            pool = redis.ConnectionPool.from_url(
+                url, max_connections=settings.cache_redis_max_connections, decode_responses=True
+            )
+            client = redis.Redis(connection_pool=pool)
+        self._client = client
+
+    def get(self, key: str) -> Optional[str]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def tag_versions(self, tags: List[str]) -> List[int]:
+        return [int(version or 0) for version in self._client.mget(tags)] if tags else []
+
+    def bump_tags(self, tags: List[str]) -> None:
+        # A counter may expire once every entry written under it has; it then restarts at 0
+        pipeline = self._client.pipeline()
+        for tag in tags:
+            pipeline.incr(tag)
+            pipeline.expire(tag, int(settings.cache_max_ttl_seconds) + 1)
+        pipeline.execute()
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        return token if self._client.set(key, token, nx=True, px=max(int(ttl * 1000), 1)) else None
+
+    def release(self, key: str, token: str) -> None:
+        # Not atomic, but a lock that expired in between only costs one extra recompute
+        if self._client.get(key) == token:
+            self._client.delete(key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(f"{settings.cache_key_prefix}:*"):
+            self._client.delete(key)
+
+
+class CacheService:
+    """
+    Cache for computed results (endpoint responses, facets, aggregates).
+
+    Values are stored JSON-serialized, in a per-process LRU or in Redis
+    shared by every worker (CACHE_BACKEND). Entries expire after their TTL
+    and can also be dropped by tag: each tag has a version counter that is
+    part of the entry's key, so invalidating a tag makes every entry written
+    under it unreachable, including one a concurrent request is computing
+    from data read before the change.
+
+    Only one caller computes a missing entry at a time; the others wait for
+    it (up to CACHE_LOCK_SECONDS) instead of all hitting the database.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = self._create_backend()
+        return self._backend
+
+    @staticmethod
+    def _create_backend():
+        if settings.cache_backend == "redis":
+            if redis is None:
+                print("⚠️ CACHE_BACKEND=redis but the redis package is not installed; using memory")
+            else:
+                try:
+                    backend = RedisCacheBackend(settings.redis_url)
+                    backend._client.ping()
+                    return backend
+                except redis.RedisError as e:
+                    print(f"⚠️ Redis unavailable for the cache ({e}); using memory")
+        return MemoryCacheBackend()
+
+    @property
+    def shared(self) -> bool:
+        """Whether every worker sees the same entries (and invalidations)"""
+        return isinstance(self.backend, RedisCacheBackend)
+
+    @staticmethod
+    def key(namespace: str, *parts: Any) -> str:
+        """Cache key for a namespace and the values the result depends on"""
+        digest = hashlib.sha1(json.dumps(jsonable_encoder(parts), sort_keys=True).encode("utf-8")).hexdigest()
+        return f"{namespace}:{digest[:24]}"
+
+    @staticmethod
+    def _ttl(ttl: Optional[float]) -> float:
+        return min(ttl or settings.cache_default_ttl_seconds, settings.cache_max_ttl_seconds)
+
+    def _prefixed(self, name: str) -> str:
+        return f"{settings.cache_key_prefix}:{name}"
+
+    def _entry_key(self, key: str, tags: Iterable[str]) -> str:
+        tags = sorted(set(tags))
+        if not tags:
+            return self._prefixed(key)
+        versions = self.backend.tag_versions([self._prefixed(f"tag:{tag}") for tag in tags])
+        return self._prefixed(f"{key}@{'.'.join(map(str, versions))}")
+
+    def _read(self, entry_key: str) -> Tuple[bool, Any]:
+        raw = self.backend.get(entry_key)
+        return (False, None) if raw is None else (True, json.loads(raw))
+
+    def _lookup(self, key: str, tags: Iterable[str]) -> Tuple[Optional[str], bool, Any]:
+        """Entry key and cached value; no entry key when the backend is unreachable"""
+        try:
+            entry_key = self._entry_key(key, tags)
+            hit, value = self._read(entry_key)
+            return entry_key, hit, value
+        except BACKEND_ERRORS as e:
+            print(f"⚠️ Cache read failed for {key}: {e}")
+            return None, False, None
+
+    def _store(self, entry_key: str, value: Any, ttl: Optional[float]) -> Any:
+        """Serialize and store a computed value; returns it as a cache hit would"""
+        encoded = jsonable_encoder(value)
+        try:
+            self.backend.set(entry_key, json.dumps(encoded), self._ttl(ttl))
+        except BACKEND_ERRORS as e:
+            print(f"⚠️ Cache write failed for {entry_key}: {e}")
+        return encoded
+
+    def _acquire(self, entry_key: str) -> Optional[str]:
+        try:
+            return self.backend.acquire(f"{entry_key}:lock", settings.cache_lock_seconds)
+        except BACKEND_ERRORS:
+            return None
+
+    def _release(self, entry_key: str, token: str) -> None:
+        try:
+            self.backend.release(f"{entry_key}:lock", token)
+        except BACKEND_ERRORS:
+            pass
+
+    def get_or_set(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                   tags: Iterable[str] = ()) -> Any:
+        """Cached value for key, computing and storing it on a miss"""
+        entry_key, hit, value = self._lookup(key, tags)
+        if hit:
+            return value
+        if entry_key is None:
+            return jsonable_encoder(compute())
+
+        token = self._acquire(entry_key)
+        if token is None:
+            deadline = time.monotonic() + settings.cache_lock_seconds
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_SECONDS)
+                hit, value = self._lookup(key, tags)[1:]
+                if hit:
+                    return value
+        try:
+            return self._store(entry_key, compute(), ttl)
+        finally:
+            if token is not None:
+                self._release(entry_key, token)
+
+    async def _offload(self, method: Callable, *args) -> Any:
+        """Run a backend operation from async code; Redis round trips go to the threadpool"""
+        if self._backend is None or self.shared:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def aget_or_set(self, key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                          tags: Iterable[str] = ()) -> Any:
+        """get_or_set for coroutines; neither backend calls nor waiting block the event loop"""
+        tags = list(tags)
+        entry_key, hit, value = await self._offload(self._lookup, key, tags)
+        if hit:
+            return value
+        if entry_key is None:
+            return jsonable_encoder(await compute())
+
+        token = await self._offload(self._acquire, entry_key)
+        if token is None:
+            deadline = time.monotonic() + settings.cache_lock_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                hit, value = (await self._offload(self._lookup, key, tags))[1:]
+                if hit:
+                    return value
+        try:
+            return await self._offload(self._store, entry_key, await compute(), ttl)
+        finally:
+            if token is not None:
+                await self._offload(self._release, entry_key, token)
+
+    def invalidate_tags(self, *tags: str) -> None:
+        """Drop every entry stored under any of the tags"""
+        tags = sorted({tag for tag in tags if tag})
+        if not tags:
+            return
+        try:
+            self.backend.bump_tags([self._prefixed(f"tag:{tag}") for tag in tags])
+        except BACKEND_ERRORS as e:
+            # Entries then live out their TTL
+            print(f"⚠️ Cache invalidation failed for {tags}: {e}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+cache_service = CacheService()
+
+# Endpoint arguments that become part of the cache key (not sessions, users, requests)
+KEY_ARGUMENT_TYPES = (str, int, float, bool, date, datetime, type(None))
+
+
+def cached(namespace: str, ttl: Optional[float] = None,
+           scope: Optional[Callable[..., Optional[str]]] = None,
+           tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Cache an async endpoint's serialized result.
+
+    The key covers the namespace, scope(**kwargs) and the endpoint's plain
+    arguments (path and query parameters). A scope of None skips the cache
+    for that call; tags(**kwargs) names the tags the entry is stored under.
+    Errors raised by the endpoint are not cached.
+    """
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            key_scope = scope(**kwargs) if scope is not None else ""
+            if key_scope is None:
+                return await endpoint(*args, **kwargs)
+            arguments = {name: value for name, value in kwargs.items() if isinstance(value, KEY_ARGUMENT_TYPES)}
+            return await cache_service.aget_or_set(
+                CacheService.key(namespace, key_scope, arguments),
+                lambda: endpoint(*args, **kwargs),
+                ttl=ttl,
+                tags=tags(**kwargs) if tags is not None else ()
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,277 @@
+import json
+import select
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy import text
+from ..config import settings
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-memory backend is always available
+    redis = None
+
+RECONNECT_SECONDS = 2.0
+
+
+class InvalidationEvent(BaseModel):
+    """Something changed that caches in other processes may hold"""
+
+
+class SongSaved(InvalidationEvent):
+    """A song was uploaded or its metadata edited"""
+    song_id: str
+    owner_id: str
+    title: str
+    artist: str
+    album: Optional[str] = None
+
+    @classmethod
+    def of(cls, song) -> "SongSaved":
+        return cls(song_id=str(song.id), owner_id=str(song.uploaded_by), title=song.title,
+                   artist=song.artist, album=song.album)
+
+
+class SongDeleted(InvalidationEvent):
+    song_id: str
+    owner_id: str
+
+    @classmethod
+    def of(cls, song) -> "SongDeleted":
+        return cls(song_id=str(song.id), owner_id=str(song.uploaded_by))
+
+
+class PlaylistChanged(InvalidationEvent):
+    """A playlist was created, edited, deleted or its songs changed"""
+    playlist_id: str
+    owner_id: str
+
+
+class UserUpdated(InvalidationEvent):
+    user_id: str
+
+
+class ListeningRecorded(InvalidationEvent):
+    """Listening time was added to the users' daily rollups"""
+    user_ids: List[str]
+
+
+EVENT_TYPES: Dict[str, Type[InvalidationEvent]] = {
+    event_type.__name__: event_type
+    for event_type in (SongSaved, SongDeleted, PlaylistChanged, UserUpdated, ListeningRecorded)
+}
+
+# handler(event, remote): remote is True for events published by another process
+Handler = Callable[[InvalidationEvent, bool], None]
+
+
+class MemoryBusBackend:
+    """
+    Delivers messages to the buses started on the same backend instance.
+    With one bus per process that is only the publisher itself; tests share
+    one backend between several buses to stand in for several workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            callbacks = list(self._callbacks[channel])
+        for callback in callbacks:
+            callback(message)
+
+    def start(self, channel: str, callback: Callable[[str], None]) -> None:
+        with self._lock:
+            self._callbacks[channel].append(callback)
+
+    def stop(self) -> None:
+        with self._lock:
+            self._callbacks.clear()
+
+
+class ListenerThread:
+    """Receives messages on a daemon thread, reconnecting after failures"""
+
+    def __init__(self, name: str, listen: Callable[[threading.Event], None]):
+        self._listen = listen
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen(self._stopping)
+            except Exception as e:
+                # Events published meanwhile are missed; caches catch up when their entries expire
+                print(f"⚠️ Invalidation bus listener failed ({e}); reconnecting")
+                self._stopping.wait(RECONNECT_SECONDS)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._thread.join(timeout=5)
+
+
+class RedisBusBackend:
+    """Redis pub/sub on REDIS_URL"""
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        self._client = client if client is not None else redis.Redis.from_url(url, decode_responses=True)
+        self._listener: Optional[ListenerThread] = None
+
+    def publish(self, channel: str, message: str) -> None:
+        self._client.publish(channel, message)
+
+    def start(self, channel: str, callback: Callable[[str], None]) -> None:
+        def listen(stopping: threading.Event) -> None:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(channel)
+                while not stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        callback(message["data"])
+            finally:
+                pubsub.close()
+
+        self._listener = ListenerThread("invalidation-bus-redis", listen)
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class PostgresBusBackend:
+    """PostgreSQL LISTEN/NOTIFY on the primary database"""
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._listener: Optional[ListenerThread] = None
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": channel, "message": message})
+
+    def start(self, channel: str, callback: Callable[[str], None]) -> None:
+        dialect = self._engine.dialect
+        connect_args, connect_kwargs = dialect.create_connect_args(self._engine.url)
+
+        def listen(stopping: threading.Event) -> None:
+            # A dedicated connection outside the pool, held for as long as we listen
+            connection = dialect.connect(*connect_args, **connect_kwargs)
+            try:
+                connection.autocommit = True
+                connection.cursor().execute(f'LISTEN "{channel}"')
+                while not stopping.is_set():
+                    if not select.select([connection], [], [], 1.0)[0]:
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        callback(connection.notifies.pop(0).payload)
+            finally:
+                connection.close()
+
+        self._listener = ListenerThread("invalidation-bus-postgres", listen)
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class InvalidationBus:
+    """
+    Broadcasts changes to every worker process so they can evict what they
+    cached locally.
+
+    Writers publish a typed event after committing. Subscribers run at once
+    in the publishing process (remote=False), and in every other process
+    when the event arrives over Redis pub/sub or PostgreSQL LISTEN/NOTIFY
+    (INVALIDATION_BUS_BACKEND). Delivery is best effort: an event published
+    while a listener is reconnecting is lost, so local caches keep a TTL.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._subscribers: Dict[Type[InvalidationEvent], List[Handler]] = defaultdict(list)
+        self._started = False
+        self.origin = uuid.uuid4().hex
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = self._create_backend()
+        return self._backend
+
+    @staticmethod
+    def _create_backend():
+        if settings.invalidation_bus_backend == "redis":
+            if redis is None:
+                print("⚠️ INVALIDATION_BUS_BACKEND=redis but the redis package is not installed; using memory")
+            else:
+                try:
+                    backend = RedisBusBackend(settings.redis_url)
+                    backend._client.ping()
+                    return backend
+                except redis.RedisError as e:
+                    print(f"⚠️ Redis unavailable for the invalidation bus ({e}); using memory")
+        elif settings.invalidation_bus_backend == "postgres":
+            from ..database import engine
+            if engine.dialect.name == "postgresql":
+                return PostgresBusBackend(engine)
+            print("⚠️ INVALIDATION_BUS_BACKEND=postgres needs a PostgreSQL database; using memory")
+        return MemoryBusBackend()
+
+    def subscribe(self, event_type: Type[InvalidationEvent], handler: Handler) -> None:
+        self._subscribers[event_type].append(handler)
+
+    def _deliver(self, event: InvalidationEvent, remote: bool) -> None:
+        for handler in self._subscribers[type(event)]:
+            try:
+                handler(event, remote)
+            except Exception as e:
+                print(f"⚠️ Invalidation handler {handler.__qualname__} failed for {type(event).__name__}: {e}")
+
+    def publish(self, *events: InvalidationEvent) -> None:
+        """Apply events locally, then broadcast them; call after committing the change"""
+        for event in events:
+            self._deliver(event, remote=False)
+            message = json.dumps({
+                "type": type(event).__name__,
+                "origin": self.origin,
+                "event": event.model_dump(mode="json"),
+            })
+            try:
+                self.backend.publish(settings.invalidation_bus_channel, message)
+            except Exception as e:
+                print(f"⚠️ Failed to broadcast {type(event).__name__}: {e}")
+
+    def _receive(self, message: str) -> None:
+        try:
+            envelope = json.loads(message)
+            if envelope.get("origin") == self.origin:
+                return  # Already applied when published
+            event = EVENT_TYPES[envelope["type"]].model_validate(envelope["event"])
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Ignoring malformed invalidation message: {e}")
+            return
+        self._deliver(event, remote=True)
+
+    def start(self) -> None:
+        """Start receiving other processes' events"""
+        if not self._started:
+            self.backend.start(settings.invalidation_bus_channel, self._receive)
+            self._started = True
+
+    def stop(self) -> None:
+        if self._started:
+            self.backend.stop()
+            self._started = False
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,109 @@
+from typing import Tuple
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models.artist import Artist, Album
+from ..models.song import Song
+
+
+def name_key(name: str) -> str:
+    """Normalized lookup key: case-folded with whitespace collapsed"""
+    return " ".join(name.casefold().split())
+
+
+class LibraryService:
+    """
+    Links songs to normalized Artist and Album rows of their owner's library
+    and keeps the entities' counters (song_count, album_count, total_duration)
+    in step.
+
+    Like PlaylistService, counters are adjusted with single relative UPDATE
+    statements. Entities are kept when they become empty, so browsing filters
+    on song_count > 0 and re-uploading an artist reuses its row. Callers are
+    responsible for committing the surrounding transaction.
+    """
+
+    @staticmethod
+    def _get_or_create(db: Session, model, keys: dict, values: dict) -> Tuple[object, bool]:
+        instance = db.query(model).filter_by(**keys).first()
+        if instance is not None:
+            return instance, False
+        try:
+            with db.begin_nested():
+                instance = model(**keys, **values)
+                db.add(instance)
+            return instance, True
+        except IntegrityError:
+            # Created concurrently by another request
+            return db.query(model).filter_by(**keys).one(), False
+
+    @staticmethod
+    def _adjust_artist(db: Session, artist_id: str, songs: int, duration: float) -> None:
+        db.query(Artist).filter(Artist.id == artist_id).update({
+            Artist.song_count: Artist.song_count + songs,
+            Artist.total_duration: Artist.total_duration + duration,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def _adjust_album(db: Session, album: Album, songs: int, duration: float) -> None:
+        db.query(Album).filter(Album.id == album.id).update({
+            Album.song_count: Album.song_count + songs,
+            Album.total_duration: Album.total_duration + duration,
+        }, synchronize_session=False)
+
+        # The artist's album_count covers non-empty albums: count an album when its
+        # first song arrives and drop it when its last song leaves
+        threshold = 1 if songs > 0 else 0
+        db.query(Artist).filter(
+            Artist.id == album.artist_id,
+            exists().where(Album.id == album.id, Album.song_count == threshold)
+        ).update({
+            Artist.album_count: Artist.album_count + (1 if songs > 0 else -1)
+        }, synchronize_session=False)
+
+    @staticmethod
+    def link_song(db: Session, song: Song) -> None:
+        """Attach a new or edited song to its artist and album, creating them as needed"""
+        duration = song.duration or 0
+
+        artist, _ = LibraryService._get_or_create(
+            db, Artist,
+            {"owner_id": song.uploaded_by, "name_key": name_key(song.artist)},
+            {"name": song.artist.strip()}
+        )
+        song.artist_id = artist.id
+        LibraryService._adjust_artist(db, artist.id, 1, duration)
+
+        song.album_id = None
+        if song.album and song.album.strip():
+            album, _ = LibraryService._get_or_create(
+                db, Album,
+                {"owner_id": song.uploaded_by, "artist_id": artist.id, "name_key": name_key(song.album)},
+                {"name": song.album.strip(), "year": song.year, "album_art_path": song.album_art_path}
+            )
+            song.album_id = album.id
+            LibraryService._adjust_album(db, album, 1, duration)
+            if song.album_art_path and not album.album_art_path:
+                db.query(Album).filter(Album.id == album.id, Album.album_art_path.is_(None)).update({
+                    Album.album_art_path: song.album_art_path
+                }, synchronize_session=False)
+
+    @staticmethod
+    def unlink_song(db: Session, song: Song) -> None:
+        """
+        Take a song out of its artist's and album's counters.
+        Call before deleting the song, or before relinking it after an edit.
+        """
+        duration = song.duration or 0
+        if song.album_id:
+            album = db.get(Album, song.album_id)
+            if album is not None:
+                LibraryService._adjust_album(db, album, -1, -duration)
+        if song.artist_id:
+            LibraryService._adjust_artist(db, song.artist_id, -1, -duration)
+
+    @staticmethod
+    def relink_song(db: Session, song: Song) -> None:
+        """Move an edited song to the artist and album its metadata now names"""
+        LibraryService.unlink_song(db, song)
+        LibraryService.link_song(db, song)
@@ -0,0 +1,100 @@
+import hashlib
+from typing import Iterable, Optional
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import select, update, or_
+from sqlalchemy.orm import Session
+from ..models.user import User
+from ..models.song import Song, liked_songs_table
+from ..models.playlist import Playlist, PlaylistSong
+from .auth_service import get_current_user
+
+users = User.__table__
+
+
+class LibraryVersionService:
+    """
+    Keeps User.library_version, a counter bumped in the same transaction as
+    every change to what the user's library endpoints return: their songs,
+    likes and playlists, and other users' changes that show up in them (a
+    song in their playlist deleted or played). Library GETs derive their
+    ETag from it, so a client revalidating an unchanged page costs no more
+    than authentication.
+
+    Callers are responsible for committing the surrounding transaction.
+    """
+
+    @staticmethod
+    def _bump_where(db: Session, condition) -> None:
+        db.execute(
+            update(users)
+            .where(condition)
+            # Not a profile change, so leave updated_at alone
+            .values(library_version=users.c.library_version + 1, updated_at=users.c.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def bump(db: Session, *user_ids: str) -> None:
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if user_ids:
+            LibraryVersionService._bump_where(db, users.c.id.in_(user_ids))
+
+    @staticmethod
+    def bump_playlist_owner(db: Session, playlist_id: str) -> None:
+        LibraryVersionService._bump_where(
+            db, users.c.id.in_(select(Playlist.owner_id).where(Playlist.id == playlist_id))
+        )
+
+    @staticmethod
+    def bump_song_audience(db: Session, song_ids: Iterable[str], likers: bool = True) -> None:
+        """Bump everyone who sees the songs: their uploaders, owners of playlists containing them and (optionally) users who liked them"""
+        song_ids = set(song_ids)
+        if not song_ids:
+            return
+        audiences = [
+            users.c.id.in_(select(Song.uploaded_by).where(Song.id.in_(song_ids))),
+            users.c.id.in_(
+                select(Playlist.owner_id).where(Playlist.id.in_(
+                    select(PlaylistSong.playlist_id).where(PlaylistSong.song_id.in_(song_ids))
+                ))
+            ),
+        ]
+        if likers:
+            audiences.append(users.c.id.in_(
+                select(liked_songs_table.c.user_id).where(liked_songs_table.c.song_id.in_(song_ids))
+            ))
+        LibraryVersionService._bump_where(db, or_(*audiences))
+
+
+def library_etag(request: Request, response: Response, current_user: User = Depends(get_current_user)) -> None:
+    """
+    Conditional GET for library endpoints: answers 304 when If-None-Match
+    holds the current ETag, before the endpoint runs its query. Admins see
+    every library, which no single version covers, so they get no ETag.
+    """
+    if current_user.role == "admin":
+        return
+
+    variant = hashlib.sha1(f"{current_user.id} {request.url.path}?{request.url.query}".encode("utf-8")).hexdigest()[:16]
+    etag = f'W/"{current_user.library_version}-{variant}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+        # Weak comparison: the W/ prefix is ignored
+        if "*" in candidates or etag[2:] in {candidate.removeprefix("W/") for candidate in candidates}:
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def library_scope(current_user: User, **_) -> Optional[str]:
+    """
+    Cache scope for library endpoints (see cache_service.cached): entries are
+    keyed by the library version, so any change to the library moves the
+    user to fresh entries. Admins aren't cached, like they get no ETag.
+    """
+    if current_user.role == "admin":
+        return None
+    return f"{current_user.id}:{current_user.library_version}"
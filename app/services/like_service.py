@@ -0,0 +1,75 @@
+import datetime
+from typing import Iterable, Set
+from sqlalchemy import exists, select, insert, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..models.song import liked_songs_table
+from .library_version_service import LibraryVersionService
+
+liked = liked_songs_table.c
+
+
+class LikeService:
+    """
+    Reads and writes liked_songs rows directly, so liking, unliking or
+    checking a song costs one indexed statement however many songs the user
+    has liked (User.liked_songs would load the whole collection). Changes
+    bump the user's library version.
+
+    Callers check access to the songs and commit the surrounding transaction.
+    """
+
+    @staticmethod
+    def is_liked(db: Session, user_id: str, song_id: str) -> bool:
+        return db.query(exists().where(liked.user_id == user_id, liked.song_id == song_id)).scalar()
+
+    @staticmethod
+    def liked_ids(db: Session, user_id: str, song_ids: Iterable[str]) -> Set[str]:
+        """The subset of song_ids the user has liked"""
+        song_ids = set(song_ids)
+        if not song_ids:
+            return set()
+        return set(db.execute(
+            select(liked.song_id).where(liked.user_id == user_id, liked.song_id.in_(song_ids))
+        ).scalars())
+
+    @staticmethod
+    def like_many(db: Session, user_id: str, song_ids: Iterable[str]) -> int:
+        """Like songs, skipping those already liked; returns how many were newly liked"""
+        song_ids = list(dict.fromkeys(song_ids))
+        if not song_ids:
+            return 0
+
+        now = datetime.datetime.utcnow()
+        dialect = db.get_bind().dialect.name
+        if dialect not in ("postgresql", "sqlite"):
+            # Portable fallback: skip the rows that exist, insert the rest
+            song_ids = [song_id for song_id in song_ids if song_id not in LikeService.liked_ids(db, user_id, song_ids)]
+            if song_ids:
+                db.execute(insert(liked_songs_table), [
+                    {"user_id": user_id, "song_id": song_id, "liked_at": now} for song_id in song_ids
+                ])
+            liked_count = len(song_ids)
+        else:
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = dialect_insert(liked_songs_table).values([
+                {"user_id": user_id, "song_id": song_id, "liked_at": now} for song_id in song_ids
+            ]).on_conflict_do_nothing(index_elements=["user_id", "song_id"])
+            liked_count = db.execute(statement).rowcount
+
+        if liked_count:
+            LibraryVersionService.bump(db, user_id)
+        return liked_count
+
+    @staticmethod
+    def unlike_many(db: Session, user_id: str, song_ids: Iterable[str]) -> int:
+        """Remove likes; returns how many songs were liked before"""
+        song_ids = set(song_ids)
+        if not song_ids:
+            return 0
+        unliked_count = db.execute(
+            delete(liked_songs_table).where(liked.user_id == user_id, liked.song_id.in_(song_ids))
+        ).rowcount
+        if unliked_count:
+            LibraryVersionService.bump(db, user_id)
+        return unliked_count
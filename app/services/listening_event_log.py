@@ -0,0 +1,442 @@
+import asyncio
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
+from ..config import settings
+from ..database import SessionLocal
+from ..models.song import Song, ListeningSession, ListeningEventSegment
+from ..models.user import User
+from ..models.playlist import Playlist
+from .listening_service import ListeningService
+from .play_count_buffer import play_count_buffer
+from ..utils.sql import is_uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".log"
+LOADER_LOCK = ".loader.lock"
+QUARANTINE_DIR = "quarantine"
+LOADED = "loaded"
+QUARANTINED = "quarantined"
+# A completion whose session has not been loaded yet (its start may sit in another
+# worker's open segment) is carried into a later segment this many times at most
+MAX_CARRY_ATTEMPTS = 10
+ID_FIELDS = ("id", "user_id", "song_id", "playlist_id")
+# Ids looked up per query when checking that a segment's users, songs and playlists still exist
+ID_LOOKUP_BATCH = 500
+
+
+def _lock(handle) -> bool:
+    """Take a non-blocking exclusive lock on an open file; True when acquired"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _fsync_directory(directory: Path) -> None:
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ListeningEventLog:
+    """
+    Local append-only log of listening events.
+
+    Request handlers append JSON lines to the current segment file and return
+    immediately; a writer thread fsyncs all appends made since its last pass in
+    one go (group commit) and seals segments once they grow too big or too old.
+    A loader copies sealed segments into listening_sessions and the daily
+    rollups, one transaction per segment, recording each loaded segment in the
+    listening_event_segments ledger so replays after a crash are harmless.
+
+    Sessions of users or songs deleted before their segment was loaded are
+    dropped, and a deleted playlist is cleared from its sessions. A segment
+    that still fails to load LISTENING_EVENT_LOG_MAX_LOAD_FAILURES times in a
+    row is moved to the quarantine/ subdirectory and recorded in the ledger
+    with its error, so the segments after it keep loading.
+
+    Event types:
+    - start: a session began (inserted with zero duration)
+    - complete: a started session finished with the given duration; counts a
+      play once it is matched with its start (same id, user and song)
+    - session: a finished play reported in one piece (batch ingestion)
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.listening_event_log_dir)
+        self._lock = threading.Lock()
+        self._file = None
+        self._path: Optional[Path] = None
+        self._opened_at = 0.0
+        self._dirty = False
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._loader: Optional[asyncio.Task] = None
+        self._failures: Dict[str, int] = defaultdict(int)
+
+    # Writing
+
+    def _open_segment(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.time_ns():020d}-{os.getpid()}"
+        self._path = self.directory / f"{name}{OPEN_SUFFIX}"
+        self._file = open(self._path, "a", encoding="utf-8")
+        _lock(self._file)  # Marks the segment as owned by a live process
+        self._opened_at = time.monotonic()
+
+    def _seal_locked(self) -> None:
+        """Close the current segment and rename it so the loader picks it up"""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        empty = self._file.tell() == 0
+        self._file.close()
+        if empty:
+            self._path.unlink(missing_ok=True)
+        else:
+            os.replace(self._path, self._path.with_suffix(SEALED_SUFFIX))
+            _fsync_directory(self.directory)
+        self._file = None
+        self._path = None
+        self._dirty = False
+
+    def append(self, event: dict) -> None:
+        """Append one event; durable after the next group commit"""
+        line = json.dumps(event, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(line)
+            self._dirty = True
+            if self._file.tell() >= settings.listening_event_log_segment_bytes:
+                self._seal_locked()
+
+    def sync(self) -> None:
+        """Group commit: fsync everything appended since the last sync"""
+        with self._lock:
+            if self._file is None or not self._dirty:
+                return
+            self._file.flush()
+            # fsync a duplicate descriptor outside the lock so appends never wait on the disk;
+            # it stays valid even if the segment is sealed meanwhile
+            fd = os.dup(self._file.fileno())
+            self._dirty = False
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def rotate(self) -> None:
+        """Seal the current segment if it has been open long enough"""
+        with self._lock:
+            if self._file is not None and \
+                    time.monotonic() - self._opened_at >= settings.listening_event_log_segment_seconds:
+                self._seal_locked()
+
+    def _write_loop(self) -> None:
+        interval = settings.listening_event_log_fsync_ms / 1000
+        while not self._stop.wait(interval):
+            try:
+                self.sync()
+                self.rotate()
+            except OSError as e:
+                print(f"❌ Listening event log write failed: {e}")
+
+    def recover(self) -> List[str]:
+        """Seal segments left open by processes that have exited"""
+        if not self.directory.exists():
+            return []
+        recovered = []
+        for path in sorted(self.directory.glob(f"*{OPEN_SUFFIX}")):
+            if path == self._path:
+                continue
+            if fcntl is None and path.name.endswith(f"-{os.getpid()}{OPEN_SUFFIX}"):
+                continue
+            with open(path, "a", encoding="utf-8") as handle:
+                if not _lock(handle):
+                    continue  # Still being written by a live worker
+                os.fsync(handle.fileno())
+            if path.stat().st_size:
+                os.replace(path, path.with_suffix(SEALED_SUFFIX))
+            else:
+                path.unlink()
+            recovered.append(path.name)
+        if recovered:
+            _fsync_directory(self.directory)
+        return recovered
+
+    # Loading
+
+    def sealed_segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"*{SEALED_SUFFIX}"))
+
+    @staticmethod
+    def _read_events(path: Path) -> List[dict]:
+        events = []
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write; everything before it is intact
+                    print(f"⚠️ Skipping unreadable event in {path.name}")
+                    continue
+                ids = [event.get(key) for key in ID_FIELDS if event.get(key) is not None]
+                if not all(is_uuid(value) for value in ids):
+                    # Would fail the whole segment's transaction on every retry
+                    print(f"⚠️ Skipping event with a malformed id in {path.name}")
+                    continue
+                events.append(event)
+        return events
+
+    @staticmethod
+    def _timestamp(value: str) -> datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+
+    @staticmethod
+    def _missing(db, column, ids: Iterable[str]) -> Set[str]:
+        """The ids (as they appear in events) with no row in the column's table"""
+        ids = list(set(ids))
+        found = set()
+        for start in range(0, len(ids), ID_LOOKUP_BATCH):
+            batch = ids[start:start + ID_LOOKUP_BATCH]
+            found.update(value for value, in db.query(column).filter(column.in_(batch)))
+        return {value for value in ids if str(uuid.UUID(value)) not in found}
+
+    def load_segment(self, path: Path) -> int:
+        """
+        Load one sealed segment in a single transaction and delete it.
+        Returns the number of events applied (0 when it was loaded before).
+        """
+        db = SessionLocal()
+        try:
+            ledger = db.get(ListeningEventSegment, path.name)
+            if ledger is not None and ledger.status == LOADED:
+                path.unlink(missing_ok=True)
+                return 0
+
+            events = self._read_events(path)
+            # Users, songs and playlists deleted since the events were logged
+            starts = [event for event in events if event.get("type") in ("start", "session")]
+            missing_users = self._missing(db, User.id, (event["user_id"] for event in starts))
+            missing_songs = self._missing(db, Song.id, (event["song_id"] for event in starts))
+            missing_playlists = self._missing(
+                db, Playlist.id, (event["playlist_id"] for event in starts if event.get("playlist_id"))
+            )
+            dropped: Set[str] = set()
+            new_rows: Dict[str, dict] = {}
+            completions = []
+            plays = []
+            rollups = defaultdict(lambda: (0.0, 0))
+
+            def add_rollup(row, seconds, sessions):
+                key = ListeningService.rollup_key(row["user_id"], row["song_id"], row["playlist_id"], row["started_at"])
+                total, count = rollups[key]
+                rollups[key] = (total + seconds, count + sessions)
+
+            for event in events:
+                kind = event.get("type")
+                if kind in ("start", "session"):
+                    if event["user_id"] in missing_users or event["song_id"] in missing_songs:
+                        dropped.add(event["id"])
+                        continue
+                    started_at = self._timestamp(event["started_at"])
+                    duration = float(event.get("duration_seconds") or 0.0)
+                    playlist_id = event.get("playlist_id")
+                    row = {
+                        "id": event["id"],
+                        "user_id": event["user_id"],
+                        "song_id": event["song_id"],
+                        "playlist_id": None if playlist_id in missing_playlists else playlist_id,
+                        "duration_seconds": duration,
+                        "started_at": started_at,
+                        "ended_at": self._timestamp(event["ended_at"]) if event.get("ended_at") else started_at,
+                    }
+                    new_rows[row["id"]] = row
+                    if duration > 0:
+                        add_rollup(row, duration, 1)
+                elif kind == "complete":
+                    if event["id"] in dropped:
+                        continue
+                    row = new_rows.get(event["id"])
+                    if row is not None and row["user_id"] == event["user_id"] and row["song_id"] == event["song_id"]:
+                        previous = row["duration_seconds"]
+                        row["duration_seconds"] = float(event["duration_seconds"])
+                        row["ended_at"] = self._timestamp(event["ended_at"])
+                        add_rollup(row, row["duration_seconds"] - previous,
+                                   ListeningService.session_delta(previous, row["duration_seconds"]))
+                        plays.append((row["user_id"], row["song_id"]))
+                    else:
+                        completions.append(event)
+
+            # Completions for sessions loaded from earlier segments
+            carried = []
+            if completions:
+                sessions = {
+                    session.id: session for session in db.query(ListeningSession).filter(
+                        ListeningSession.id.in_({event["id"] for event in completions})
+                    ).all()
+                }
+                for event in completions:
+                    session = sessions.get(event["id"])
+                    if session is None or session.user_id != event["user_id"] or session.song_id != event["song_id"]:
+                        carried.append(event)
+                        continue
+                    previous = session.duration_seconds or 0.0
+                    session.duration_seconds = float(event["duration_seconds"])
+                    session.ended_at = self._timestamp(event["ended_at"])
+                    add_rollup({
+                        "user_id": session.user_id,
+                        "song_id": session.song_id,
+                        "playlist_id": session.playlist_id,
+                        "started_at": session.started_at,
+                    }, session.duration_seconds - previous,
+                        ListeningService.session_delta(previous, session.duration_seconds))
+                    plays.append((session.user_id, session.song_id))
+
+            if new_rows:
+                db.execute(insert(ListeningSession), list(new_rows.values()))
+            ListeningService.record_many(db, dict(rollups))
+            if ledger is None:
+                db.add(ListeningEventSegment(name=path.name, event_count=len(events)))
+            else:
+                # A quarantined segment moved back to be loaded again
+                ledger.status, ledger.error = LOADED, None
+                ledger.event_count, ledger.loaded_at = len(events), datetime.datetime.utcnow()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        # Give completions whose start has not been loaded yet another chance later.
+        # Only once the segment is committed: a failed load is retried from the same
+        # file and would carry them again
+        for event in carried:
+            attempts = event.get("attempts", 0) + 1
+            if attempts < MAX_CARRY_ATTEMPTS:
+                self.append({**event, "attempts": attempts})
+            else:
+                print(f"⚠️ Dropping completion for unknown listening session {event['id']}")
+        if carried:
+            self.sync()
+
+        ListeningService.stats_changed(*{key[0] for key in rollups})
+        for user_id, song_id in plays:
+            play_count_buffer.record_play(user_id, song_id)
+        path.unlink(missing_ok=True)
+        if dropped:
+            print(f"⚠️ Dropped {len(dropped)} listening sessions of deleted users or songs from {path.name}")
+        return len(events) - len(carried)
+
+    def quarantine(self, path: Path, error: str) -> None:
+        """Move a segment that cannot be loaded aside and record it in the ledger"""
+        target = self.directory / QUARANTINE_DIR / path.name
+        target.parent.mkdir(exist_ok=True)
+        db = SessionLocal()
+        try:
+            ledger = db.get(ListeningEventSegment, path.name)
+            if ledger is None:
+                ledger = ListeningEventSegment(name=path.name)
+                db.add(ledger)
+            ledger.status, ledger.error, ledger.event_count = QUARANTINED, error, 0
+            ledger.loaded_at = datetime.datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+        os.replace(path, target)
+        _fsync_directory(self.directory)
+        print(f"❌ Quarantined listening event segment {path.name} after "
+              f"{settings.listening_event_log_max_load_failures} failed loads; moved to {target}")
+
+    def load_sealed(self) -> int:
+        """Load every sealed segment in order; one loader per directory at a time"""
+        if not self.directory.exists():
+            return 0
+        with open(self.directory / LOADER_LOCK, "a") as lock_handle:
+            if not _lock(lock_handle):
+                return 0  # Another worker is loading
+            loaded = 0
+            for path in self.sealed_segments():
+                try:
+                    loaded += self.load_segment(path)
+                    self._failures.pop(path.name, None)
+                except OperationalError as e:
+                    # The database is unreachable, not the segment's fault; retried on the next pass
+                    print(f"❌ Failed to load listening events from {path.name}: {e}")
+                    break
+                except Exception as e:
+                    self._failures[path.name] += 1
+                    print(f"❌ Failed to load listening events from {path.name} "
+                          f"(attempt {self._failures[path.name]}): {e}")
+                    if self._failures[path.name] < settings.listening_event_log_max_load_failures:
+                        break  # Leave the segment in place; it is retried on the next pass
+                    try:
+                        self.quarantine(path, f"{type(e).__name__}: {e}")
+                    except Exception as quarantine_error:
+                        print(f"❌ Failed to quarantine {path.name}: {quarantine_error}")
+                        break
+                    del self._failures[path.name]
+            return loaded
+
+    async def _load_loop(self):
+        while True:
+            await asyncio.sleep(settings.listening_event_log_load_seconds)
+            await asyncio.to_thread(self.load_sealed)
+
+    # Lifecycle
+
+    def start(self) -> None:
+        """Start the group-commit writer thread and the background loader"""
+        self.recover()
+        if self._writer is None or not self._writer.is_alive():
+            self._stop.clear()
+            self._writer = threading.Thread(target=self._write_loop, name="listening-event-log", daemon=True)
+            self._writer.start()
+        if self._loader is None or self._loader.done():
+            self._loader = asyncio.create_task(self._load_loop())
+
+    async def stop(self) -> None:
+        """Seal the current segment and load everything that is sealed"""
+        if self._loader is not None:
+            self._loader.cancel()
+            try:
+                await self._loader
+            except asyncio.CancelledError:
+                pass
+            self._loader = None
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            self._seal_locked()
+        await asyncio.to_thread(self.load_sealed)
+
+
+listening_event_log = ListeningEventLog()
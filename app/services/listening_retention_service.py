@@ -0,0 +1,317 @@
+import datetime
+import gzip
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.song import ListeningSession
+from ..utils.sql import GUID
+
+PARENT_TABLE = ListeningSession.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_PATTERN = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})(\d{{2}})$")
+EXPORT_COLUMNS = ["id", "user_id", "song_id", "playlist_id", "duration_seconds", "started_at", "ended_at"]
+# Exported as their string form whatever the column storage
+EXPORT_ID_COLUMNS = {"id": GUID, "user_id": GUID, "song_id": GUID, "playlist_id": GUID}
+EXPORT_BATCH_SIZE = 5000
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    """First day of the month `months` away from the month containing `day`"""
+    index = day.year * 12 + (day.month - 1) + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+class ListeningRetentionService:
+    """
+    Manages the lifetime of raw listening_sessions rows.
+
+    On PostgreSQL the table is range-partitioned by month on started_at:
+    partitions are created ahead of time, and partitions older than the
+    retention window are detached, exported to the archive directory and
+    dropped. Rows that landed in the default partition (months without a
+    partition of their own) are moved out month by month with a date-bounded
+    DELETE ... RETURNING. Other databases (SQLite in tests) get the same
+    behaviour by moving old rows out of the table the same way.
+
+    Daily rollups are left untouched, so stats keep covering archived months.
+    """
+
+    @staticmethod
+    def partition_name(month: datetime.date) -> str:
+        return f"{PARENT_TABLE}_p{month.year:04d}{month.month:02d}"
+
+    @staticmethod
+    def retention_cutoff(today: Optional[datetime.date] = None) -> datetime.date:
+        """Sessions that started before this day are archived"""
+        today = today or datetime.date.today()
+        return add_months(month_start(today), -settings.listening_retention_months)
+
+    @staticmethod
+    def is_partitioned(db: Session) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND pg_table_is_visible(c.oid)"
+        ), {"table": PARENT_TABLE}).first() is not None
+
+    @staticmethod
+    def ensure_partitions(db: Session, months_ahead: int = 3) -> List[str]:
+        """
+        Create monthly partitions from the current month up to `months_ahead`
+        months ahead, plus a default partition as a safety net.
+
+        Rows of a new partition's month that already landed in the default
+        partition (future-dated events, or a missed run) are moved into it;
+        PostgreSQL refuses to create the partition while they are there.
+        No-op when the table is not partitioned. Callers commit.
+        """
+        if not ListeningRetentionService.is_partitioned(db):
+            return []
+
+        created = []
+        current = month_start(datetime.date.today())
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            end = add_months(start, 1)
+            name = ListeningRetentionService.partition_name(start)
+            exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+            if exists:
+                continue
+            ListeningRetentionService._create_partition(db, name, start, end)
+            created.append(name)
+
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"
+        ))
+        return created
+
+    @staticmethod
+    def _create_partition(db: Session, name: str, start: datetime.date, end: datetime.date) -> None:
+        """
+        Create the partition for [start, end). When the default partition holds
+        rows of that range, detach it, create the partition, move the rows
+        across and attach the default again, all in the caller's transaction.
+        """
+        bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        params = {
+            "start": datetime.datetime.combine(start, datetime.time.min),
+            "end": datetime.datetime.combine(end, datetime.time.min),
+        }
+        stranded = db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar() and db.execute(
+            text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE started_at >= :start AND started_at < :end LIMIT 1"),
+            params
+        ).first()
+        if not stranded:
+            db.execute(text(f'CREATE TABLE "{name}" PARTITION OF {PARENT_TABLE} {bounds}'))
+            return
+
+        columns = ", ".join(column.name for column in ListeningSession.__table__.columns)
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        db.execute(text(f'CREATE TABLE "{name}" PARTITION OF {PARENT_TABLE} {bounds}'))
+        moved = db.execute(text(
+            f"WITH moved AS ("
+            f"  DELETE FROM {DEFAULT_PARTITION} WHERE started_at >= :start AND started_at < :end RETURNING {columns}"
+            f') INSERT INTO "{name}" ({columns}) SELECT {columns} FROM moved'
+        ), params).rowcount
+        db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        print(f"📦 Moved {moved} listening sessions from {DEFAULT_PARTITION} into {name}")
+
+    @staticmethod
+    def _monthly_tables(db: Session) -> List[tuple]:
+        """(month, table name, attached) for every monthly table, attached or left detached"""
+        rows = db.execute(text(
+            "SELECT c.relname, EXISTS ("
+            "  SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid"
+            ") FROM pg_class c "
+            "WHERE c.relkind IN ('r', 'p') AND c.relname LIKE :prefix AND pg_table_is_visible(c.oid)"
+        ), {"prefix": f"{PARENT_TABLE}_p%"}).all()
+
+        tables = []
+        for name, attached in rows:
+            match = PARTITION_PATTERN.match(name)
+            if match:
+                month = datetime.date(int(match.group(1)), int(match.group(2)), 1)
+                tables.append((month, name, attached))
+        return sorted(tables)
+
+    @staticmethod
+    def _archive_path(month: datetime.date, fmt: str) -> Path:
+        extension = "parquet" if fmt == "parquet" else "ndjson.gz"
+        return Path(settings.listening_archive_dir) / f"{PARENT_TABLE}_{month:%Y_%m}.{extension}"
+
+    @staticmethod
+    def _free_archive_path(month: datetime.date, fmt: str, label: str) -> Path:
+        """Archive path for rows moved out of a table; never replaces an earlier archive of the month"""
+        path = ListeningRetentionService._archive_path(month, fmt)
+        stem, extension = path.name.split(".", 1)
+        candidate, number = path.with_name(f"{stem}{label}.{extension}"), 1
+        while candidate.exists():
+            number += 1
+            candidate = path.with_name(f"{stem}{label}_{number}.{extension}")
+        return candidate
+
+    @staticmethod
+    def _export(db: Session, source_sql: str, params: dict, path: Path, fmt: str) -> int:
+        """Stream rows from source_sql into an archive file; returns the number of rows exported"""
+        result = db.execute(
+            text(source_sql).columns(**EXPORT_ID_COLUMNS).execution_options(
+                stream_results=True, yield_per=EXPORT_BATCH_SIZE
+            ),
+            params
+        )
+        return ListeningRetentionService._write_archive(result.partitions(EXPORT_BATCH_SIZE), path, fmt)
+
+    @staticmethod
+    def _write_archive(batches: Iterable[Sequence[tuple]], path: Path, fmt: str) -> int:
+        """
+        Write batches of EXPORT_COLUMNS rows to an archive file. Writes to a
+        temporary file and renames it into place once fsynced, so a crash never
+        leaves a truncated archive behind. Returns the number of rows written.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+
+        exported = 0
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet archives require pyarrow; install it or use the 'ndjson' format")
+
+            writer = None
+            try:
+                for batch in batches:
+                    records = [
+                        {column: (value.isoformat() if isinstance(value, datetime.datetime) else value)
+                         for column, value in zip(EXPORT_COLUMNS, row)}
+                        for row in batch
+                    ]
+                    table = pa.Table.from_pylist(records)
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+                    writer.write_table(table)
+                    exported += len(records)
+            finally:
+                if writer is not None:
+                    writer.close()
+            if writer is None:
+                # Empty month: still leave a marker file so the archive is complete
+                pq.write_table(pa.Table.from_pylist([], schema=pa.schema(
+                    [(column, pa.string()) for column in EXPORT_COLUMNS]
+                )), tmp_path)
+        else:
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as archive:
+                for batch in batches:
+                    for row in batch:
+                        archive.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n")
+                        exported += 1
+
+        with open(tmp_path, "rb") as handle:
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+        return exported
+
+    @staticmethod
+    def _move_out(db: Session, table: str, cutoff: datetime.date, fmt: str, label: str = "") -> List[dict]:
+        """
+        Archive and delete the rows of `table` that started before the cutoff,
+        one month per transaction. Each batch is removed with DELETE ... RETURNING
+        and written straight to the archive, so exactly the deleted rows are
+        archived even while late events keep arriving. The archive is renamed into
+        place before the deletes commit: a crash in between can archive a month's
+        rows twice, never lose them.
+        """
+        columns = ", ".join(EXPORT_COLUMNS)
+        oldest = db.execute(
+            text(f'SELECT MIN(started_at) FROM "{table}" WHERE started_at < :cutoff'),
+            {"cutoff": datetime.datetime.combine(cutoff, datetime.time.min)}
+        ).scalar()
+        if oldest is None:
+            return []
+        if isinstance(oldest, str):  # SQLite returns aggregates of DATETIME columns as text
+            oldest = datetime.datetime.fromisoformat(oldest)
+
+        delete_batch = text(
+            f'DELETE FROM "{table}" WHERE id IN ('
+            f'  SELECT id FROM "{table}" WHERE started_at >= :start AND started_at < :end LIMIT :batch'
+            f") RETURNING {columns}"
+        ).columns(**EXPORT_ID_COLUMNS)
+
+        archived = []
+        month = month_start(oldest.date())
+        while month < cutoff:
+            params = {
+                "start": datetime.datetime.combine(month, datetime.time.min),
+                "end": datetime.datetime.combine(add_months(month, 1), datetime.time.min),
+                "batch": EXPORT_BATCH_SIZE,
+            }
+
+            def batches():
+                while True:
+                    rows = db.execute(delete_batch, params).all()
+                    if not rows:
+                        return
+                    yield rows
+
+            path = ListeningRetentionService._free_archive_path(month, fmt, label)
+            rows = ListeningRetentionService._write_archive(batches(), path, fmt)
+            if rows:
+                db.commit()
+                print(f"📦 Archived {rows} listening sessions from {month:%Y-%m} of {table} to {path}")
+                archived.append({"month": month.isoformat(), "rows": rows, "path": str(path)})
+            else:
+                db.rollback()
+                path.unlink(missing_ok=True)
+            month = add_months(month, 1)
+        return archived
+
+    @staticmethod
+    def run_retention(db: Session, today: Optional[datetime.date] = None,
+                      fmt: Optional[str] = None) -> List[dict]:
+        """
+        Archive and remove listening sessions older than the retention window.
+        Commits after each month so progress survives interruptions; re-running
+        picks up partitions that were detached but not yet dropped.
+        """
+        fmt = fmt or settings.listening_archive_format
+        cutoff = ListeningRetentionService.retention_cutoff(today)
+        columns = ", ".join(EXPORT_COLUMNS)
+        archived = []
+
+        if ListeningRetentionService.is_partitioned(db):
+            for month, name, attached in ListeningRetentionService._monthly_tables(db):
+                if add_months(month, 1) > cutoff:
+                    continue
+                if attached:
+                    db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+                    db.commit()
+
+                path = ListeningRetentionService._archive_path(month, fmt)
+                rows = ListeningRetentionService._export(
+                    db, f'SELECT {columns} FROM "{name}" ORDER BY started_at', {}, path, fmt
+                )
+                db.execute(text(f'DROP TABLE "{name}"'))
+                db.commit()
+                print(f"📦 Archived {rows} listening sessions from {name} to {path}")
+                archived.append({"month": month.isoformat(), "rows": rows, "path": str(path)})
+
+            # Old months without a partition of their own (including sessions reported
+            # after their month's partition was archived) sit in the default partition
+            if db.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar():
+                archived += ListeningRetentionService._move_out(db, DEFAULT_PARTITION, cutoff, fmt, "_default")
+            return archived
+
+        # Portable fallback: move old rows out of the table one month at a time
+        return ListeningRetentionService._move_out(db, PARENT_TABLE, cutoff, fmt)
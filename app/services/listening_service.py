@@ -0,0 +1,236 @@
+import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+from sqlalchemy import func, select, insert, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..models.song import Song, ListeningSession, ListeningDailyRollup, NO_PLAYLIST
+from .playlist_service import PlaylistService
+from .library_version_service import LibraryVersionService
+from .listening_retention_service import ListeningRetentionService
+from .cache_service import cache_service
+from .invalidation_bus import invalidation_bus, ListeningRecorded, PlaylistChanged
+from ..utils.sql import nil_uuid
+
+# (user_id, playlist_id, song_id, day) -> (total_seconds, session_count)
+RollupDeltas = Dict[Tuple[str, str, str, datetime.date], Tuple[float, int]]
+
+# PostgreSQL advisory lock serializing compaction against incremental rollup writes
+ROLLUP_LOCK_KEY = 0x726F6C6C7570  # "rollup"
+
+
+class ListeningService:
+    """
+    Maintains the listening_daily_rollups table so that stats queries read a
+    handful of pre-aggregated rows instead of scanning raw listening_sessions.
+
+    A session counts towards session_count once it has listening time
+    (duration_seconds > 0), both incrementally and when compacting.
+
+    Incremental writers hold a shared rollup lock until they commit and
+    compaction an exclusive one, so a rebuild never misses a session that
+    is being recorded nor counts it twice.
+    """
+
+    @staticmethod
+    def lock_rollups(db: Session, exclusive: bool = False) -> None:
+        """
+        Take the rollup lock for the rest of the transaction. Only needed on
+        PostgreSQL: SQLite already runs one write transaction at a time.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+        db.execute(select(lock(ROLLUP_LOCK_KEY)))
+
+    @staticmethod
+    def rollup_key(user_id: str, song_id: str, playlist_id: Optional[str],
+                   started_at: datetime.datetime) -> Tuple[str, str, str, datetime.date]:
+        return user_id, playlist_id or NO_PLAYLIST, song_id, started_at.date()
+
+    @staticmethod
+    def session_delta(previous_seconds: float, seconds: float) -> int:
+        """Change in session_count when a session's duration goes from previous_seconds to seconds"""
+        return int(seconds > 0) - int((previous_seconds or 0) > 0)
+
+    @staticmethod
+    def cache_tag(user_id: str) -> str:
+        """Cache tag of results computed from a user's rollups"""
+        return f"listening:{user_id}"
+
+    @staticmethod
+    def stats_changed(*user_ids: str) -> None:
+        """Drop cached stats of users whose rollups changed, on every worker; call after committing"""
+        if user_ids:
+            invalidation_bus.publish(ListeningRecorded(user_ids=list(user_ids)))
+
+    @staticmethod
+    def evict_stats(event, remote: bool = False) -> None:
+        if remote and cache_service.shared:
+            return  # The publisher already invalidated the shared entries
+        # Stats also list the playlist's songs, so membership changes count
+        user_ids = [event.owner_id] if isinstance(event, PlaylistChanged) else event.user_ids
+        cache_service.invalidate_tags(*(ListeningService.cache_tag(user_id) for user_id in user_ids))
+
+    @staticmethod
+    def record(db: Session, user_id: str, song_id: str, playlist_id: Optional[str],
+               started_at: datetime.datetime, seconds: float, sessions: int = 1) -> None:
+        """Add listening time for one session to its daily rollup row"""
+        key = ListeningService.rollup_key(user_id, song_id, playlist_id, started_at)
+        ListeningService.record_many(db, {key: (seconds, sessions)})
+
+    @staticmethod
+    def record_many(db: Session, deltas: RollupDeltas) -> None:
+        """Upsert a batch of rollup increments; callers commit"""
+        # Zero-duration sessions add nothing, and a rebuild would not create their rows either
+        deltas = {key: delta for key, delta in deltas.items() if delta != (0, 0)}
+        if not deltas:
+            return
+        ListeningService.lock_rollups(db)
+
+        rows = [
+            {
+                "user_id": user_id,
+                "playlist_id": playlist_id,
+                "song_id": song_id,
+                "day": day,
+                "total_seconds": seconds,
+                "session_count": sessions,
+            }
+            for (user_id, playlist_id, song_id, day), (seconds, sessions) in deltas.items()
+        ]
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = dialect_insert(ListeningDailyRollup)
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id", "playlist_id", "song_id", "day"],
+                set_={
+                    "total_seconds": ListeningDailyRollup.total_seconds + statement.excluded.total_seconds,
+                    "session_count": ListeningDailyRollup.session_count + statement.excluded.session_count,
+                }
+            )
+            db.execute(statement, rows)
+            return
+
+        # Portable fallback: update in place, insert when the row does not exist yet
+        for row in rows:
+            updated = db.query(ListeningDailyRollup).filter(
+                ListeningDailyRollup.user_id == row["user_id"],
+                ListeningDailyRollup.playlist_id == row["playlist_id"],
+                ListeningDailyRollup.song_id == row["song_id"],
+                ListeningDailyRollup.day == row["day"]
+            ).update({
+                ListeningDailyRollup.total_seconds: ListeningDailyRollup.total_seconds + row["total_seconds"],
+                ListeningDailyRollup.session_count: ListeningDailyRollup.session_count + row["session_count"],
+            }, synchronize_session=False)
+            if not updated:
+                db.execute(insert(ListeningDailyRollup), [row])
+
+    @staticmethod
+    def delete_song_history(db: Session, song_ids: Iterable[str]) -> None:
+        """
+        Delete the listening sessions and rollups of songs about to be deleted,
+        which would otherwise block the delete (sessions reference the song).
+        Callers commit.
+        """
+        song_ids = set(song_ids)
+        if not song_ids:
+            return
+        ListeningService.lock_rollups(db)
+        db.query(ListeningSession).filter(
+            ListeningSession.song_id.in_(song_ids)
+        ).delete(synchronize_session=False)
+        db.query(ListeningDailyRollup).filter(
+            ListeningDailyRollup.song_id.in_(song_ids)
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def apply_play_counts(db: Session, counts: Dict[str, int]) -> None:
+        """
+        Add aggregated play-count increments (song id -> plays) with one
+        relative UPDATE per song, and keep playlist counters in step. Callers commit.
+        """
+        counts = {song_id: plays for song_id, plays in counts.items() if plays}
+        if not counts:
+            return
+
+        songs = Song.__table__
+        db.execute(
+            update(songs)
+            .where(songs.c.id == bindparam("song_id"))
+            .values(play_count=func.coalesce(songs.c.play_count, 0) + bindparam("plays")),
+            [{"song_id": song_id, "plays": plays} for song_id, plays in counts.items()]
+        )
+        for song_id, plays in counts.items():
+            PlaylistService.apply_play_count_delta(db, song_id, plays)
+        # Play counts change library sort order and playlist totals
+        LibraryVersionService.bump_song_audience(db, counts.keys(), likers=False)
+
+    @staticmethod
+    def rollup_users(db: Session, since: datetime.date, until: Optional[datetime.date] = None) -> Set[str]:
+        """Users with rollup rows for days in [since, until)"""
+        query = db.query(ListeningDailyRollup.user_id).filter(ListeningDailyRollup.day >= since)
+        if until is not None:
+            query = query.filter(ListeningDailyRollup.day < until)
+        return {user_id for user_id, in query.distinct()}
+
+    @staticmethod
+    def compact(db: Session, since: datetime.date, until: Optional[datetime.date] = None) -> int:
+        """
+        Rebuild rollups for days in [since, until) from raw listening_sessions.
+        Repairs drift from missed incremental updates; safe to run repeatedly.
+        Days whose raw sessions have been archived are never rebuilt.
+        Blocks incremental rollup writes until the caller commits.
+        Returns the number of rollup rows written.
+        """
+        ListeningService.lock_rollups(db, exclusive=True)
+        since = max(since, ListeningRetentionService.retention_cutoff())
+        until = until or (datetime.date.today() + datetime.timedelta(days=1))
+        since_ts = datetime.datetime.combine(since, datetime.time.min)
+        until_ts = datetime.datetime.combine(until, datetime.time.min)
+
+        db.query(ListeningDailyRollup).filter(
+            ListeningDailyRollup.day >= since,
+            ListeningDailyRollup.day < until
+        ).delete(synchronize_session=False)
+
+        day = func.date(ListeningSession.started_at)
+        # nil_uuid() renders as an inline constant, so the GROUP BY expression matches the selected one exactly
+        playlist_key = func.coalesce(ListeningSession.playlist_id, nil_uuid())
+        grouped = select(
+            ListeningSession.user_id,
+            playlist_key,
+            ListeningSession.song_id,
+            day,
+            func.sum(ListeningSession.duration_seconds),
+            func.count(ListeningSession.id)
+        ).where(
+            ListeningSession.started_at >= since_ts,
+            ListeningSession.started_at < until_ts,
+            ListeningSession.duration_seconds > 0
+        ).group_by(
+            ListeningSession.user_id, playlist_key, ListeningSession.song_id, day
+        )
+
+        result = db.execute(
+            insert(ListeningDailyRollup).from_select(
+                ["user_id", "playlist_id", "song_id", "day", "total_seconds", "session_count"],
+                grouped
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def day_range_filters(start: Optional[datetime.date], end: Optional[datetime.date]) -> list:
+        """Rollup filters for an inclusive start day and exclusive end day"""
+        filters = []
+        if start is not None:
+            filters.append(ListeningDailyRollup.day >= start)
+        if end is not None:
+            filters.append(ListeningDailyRollup.day < end)
+        return filters
+
+
+invalidation_bus.subscribe(ListeningRecorded, ListeningService.evict_stats)
+invalidation_bus.subscribe(PlaylistChanged, ListeningService.evict_stats)
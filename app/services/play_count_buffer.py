@@ -0,0 +1,306 @@
+import asyncio
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from ..config import settings
+from ..database import SessionLocal
+from .listening_service import ListeningService
+from ..utils.sql import is_uuid
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-memory backend is always available
+    redis = None
+
+# Backend failures that make the buffer count in process memory instead
+BACKEND_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+REDIS_PENDING_KEY = "play_counts:pending"
+REDIS_FLUSHING_PREFIX = f"{REDIS_PENDING_KEY}:flushing"
+REDIS_LEASE_PREFIX = "play_counts:lease"
+REDIS_DEDUPE_PREFIX = "play_counts:seen"
+# A flush must commit within this long; after that any worker may flush its batch again
+FLUSH_LEASE_SECONDS = 120
+
+
+class MemoryCountBackend:
+    """Per-process pending counts; each worker flushes its own increments"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._seen: Dict[tuple, float] = {}
+
+    def mark_seen(self, user_id: str, song_id: str, window: float) -> bool:
+        """Return False when the user already played the song within the window"""
+        now = time.monotonic()
+        key = (user_id, song_id)
+        with self._lock:
+            last = self._seen.get(key)
+            if last is not None and now - last < window:
+                return False
+            self._seen[key] = now
+            return True
+
+    def add(self, counts: Dict[str, int]) -> None:
+        with self._lock:
+            self._counts.update(counts)
+
+    def pending(self, song_id: str) -> int:
+        with self._lock:
+            return self._counts.get(song_id, 0)
+
+    def drain(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Take the pending counts; returns them and a receipt for ack() or release()"""
+        with self._lock:
+            counts, self._counts = dict(self._counts), Counter()
+            return counts, counts
+
+    def ack(self, receipt: Dict[str, int]) -> None:
+        pass  # Drained counts are already gone
+
+    def release(self, receipt: Dict[str, int]) -> None:
+        """Queue the counts of a failed flush again"""
+        self.add(receipt)
+
+    def prune(self, window: float) -> None:
+        """Forget de-duplication entries that have aged out of the window"""
+        cutoff = time.monotonic() - window
+        with self._lock:
+            self._seen = {key: seen for key, seen in self._seen.items() if seen >= cutoff}
+
+
+class RedisCountBackend:
+    """
+    Pending counts shared by all workers through a Redis hash. A flush renames
+    the hash to a leased flushing key and deletes it only after committing.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        self._client = client if client is not None else redis.Redis.from_url(url, decode_responses=True)
+
+    def mark_seen(self, user_id: str, song_id: str, window: float) -> bool:
+        key = f"{REDIS_DEDUPE_PREFIX}:{user_id}:{song_id}"
+        return bool(self._client.set(key, 1, nx=True, px=max(int(window * 1000), 1)))
+
+    def add(self, counts: Dict[str, int]) -> None:
+        pipeline = self._client.pipeline()
+        for song_id, plays in counts.items():
+            pipeline.hincrby(REDIS_PENDING_KEY, song_id, plays)
+        pipeline.execute()
+
+    def pending(self, song_id: str) -> int:
+        return int(self._client.hget(REDIS_PENDING_KEY, song_id) or 0)
+
+    @staticmethod
+    def _lease(key: str) -> str:
+        return f"{REDIS_LEASE_PREFIX}:{key}"
+
+    def _claim(self, source: str) -> Optional[str]:
+        """Move `source` to a new flushing key under a lease; None when it no longer exists"""
+        key = f"{REDIS_FLUSHING_PREFIX}:{uuid.uuid4()}"
+        # Leased before it exists, so no other worker ever sees it unleased
+        self._client.set(self._lease(key), 1, px=FLUSH_LEASE_SECONDS * 1000)
+        try:
+            # RENAME is atomic: increments landing during the flush go to a fresh
+            # hash, and only one worker can claim an abandoned batch
+            self._client.rename(source, key)
+        except redis.ResponseError:
+            self._client.delete(self._lease(key))
+            return None
+        return key
+
+    def drain(self) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Take the pending counts, plus batches of flushes that crashed before
+        committing (their lease has expired). The batches stay in Redis until
+        ack(), so a crash between draining and committing loses nothing.
+        Returns the counts and the flushing keys they were read from.
+        """
+        keys = []
+        for abandoned in self._client.scan_iter(match=f"{REDIS_FLUSHING_PREFIX}:*"):
+            if not self._client.exists(self._lease(abandoned)):
+                claimed = self._claim(abandoned)
+                if claimed:
+                    keys.append(claimed)
+        fresh = self._claim(REDIS_PENDING_KEY)
+        if fresh:
+            keys.append(fresh)
+
+        counts = Counter()
+        for key in keys:
+            counts.update({song_id: int(plays) for song_id, plays in self._client.hgetall(key).items()})
+        return dict(counts), keys
+
+    def ack(self, keys: List[str]) -> None:
+        """Forget batches whose counts were committed"""
+        if keys:
+            self._client.delete(*keys, *(self._lease(key) for key in keys))
+
+    def release(self, keys: List[str]) -> None:
+        """
+        Return the batches of a failed flush to the pending hash. If Redis fails
+        here too, they are reclaimed by a later drain once their lease expires.
+        """
+        for key in keys:
+            counts = self._client.hgetall(key)
+            pipeline = self._client.pipeline(transaction=True)
+            for song_id, plays in counts.items():
+                pipeline.hincrby(REDIS_PENDING_KEY, song_id, int(plays))
+            pipeline.delete(key, self._lease(key))
+            pipeline.execute()
+
+    def prune(self, window: float) -> None:
+        pass  # De-duplication keys expire on their own
+
+
+class PlayCountBuffer:
+    """
+    Write-behind buffer for song play counts.
+
+    Plays are coalesced per song and flushed periodically as relative
+    `UPDATE songs SET play_count = play_count + n` statements, so request
+    handlers never take a row lock on hot songs. Repeat plays of the same
+    song by the same user within the de-duplication window are ignored.
+
+    When the shared backend (Redis) fails, plays are counted in process
+    memory instead and flushed alongside it, so /play/ keeps working.
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._fallback = MemoryCountBackend()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = self._create_backend()
+        return self._backend
+
+    @staticmethod
+    def _create_backend():
+        if settings.play_count_backend == "redis":
+            if redis is None:
+                print("⚠️ PLAY_COUNT_BACKEND=redis but the redis package is not installed; using memory")
+            else:
+                try:
+                    backend = RedisCountBackend(settings.redis_url)
+                    backend._client.ping()
+                    return backend
+                except redis.RedisError as e:
+                    print(f"⚠️ Redis unavailable for play counts ({e}); using memory")
+        return MemoryCountBackend()
+
+    def record_play(self, user_id: str, song_id: str) -> bool:
+        """Count a play unless it repeats one within the window; returns whether it counted"""
+        if not is_uuid(song_id):
+            return False  # A flush would fail on it and keep re-queueing the batch
+        window = settings.play_count_dedupe_seconds
+        try:
+            if not self.backend.mark_seen(user_id, song_id, window):
+                return False
+            self.backend.add({song_id: 1})
+        except BACKEND_ERRORS as e:
+            print(f"⚠️ Play count backend unavailable ({e}); counting in memory")
+            if not self._fallback.mark_seen(user_id, song_id, window):
+                return False
+            self._fallback.add({song_id: 1})
+        return True
+
+    def add(self, counts: Dict[str, int]) -> None:
+        """Queue pre-aggregated increments (song id -> plays) without de-duplication"""
+        counts = {song_id: plays for song_id, plays in counts.items() if plays and is_uuid(song_id)}
+        if not counts:
+            return
+        try:
+            self.backend.add(counts)
+        except BACKEND_ERRORS as e:
+            print(f"⚠️ Play count backend unavailable ({e}); counting in memory")
+            self._fallback.add(counts)
+
+    def pending(self, song_id: str) -> int:
+        """Plays recorded for a song that have not been flushed yet"""
+        try:
+            pending = self.backend.pending(song_id)
+        except BACKEND_ERRORS:
+            pending = 0
+        return pending + self._fallback.pending(song_id)
+
+    def flush(self) -> int:
+        """
+        Write pending increments to the database in one transaction.
+        Drained batches are acknowledged only once the transaction commits;
+        on failure they are queued again, so no plays are lost.
+        Returns the number of plays written.
+        """
+        with self._flush_lock:
+            counts = Counter()
+            batches = []
+            for backend in (self._fallback, self.backend):
+                try:
+                    drained, receipt = backend.drain()
+                    backend.prune(settings.play_count_dedupe_seconds)
+                except BACKEND_ERRORS as e:
+                    print(f"⚠️ Could not read buffered play counts ({e}); will retry")
+                    continue
+                counts.update(drained)
+                batches.append((backend, receipt))
+            counts = dict(counts)
+            if not counts:
+                return 0
+
+            db = SessionLocal()
+            try:
+                ListeningService.apply_play_counts(db, counts)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                for backend, receipt in batches:
+                    try:
+                        backend.release(receipt)
+                    except BACKEND_ERRORS as release_error:
+                        print(f"⚠️ Could not re-queue play counts ({release_error}); retried when their lease expires")
+                print(f"❌ Failed to flush play counts, will retry: {e}")
+                return 0
+            finally:
+                db.close()
+
+            for backend, receipt in batches:
+                try:
+                    backend.ack(receipt)
+                except BACKEND_ERRORS as e:
+                    print(f"⚠️ Could not clear flushed play counts ({e}); they may be counted again")
+            return sum(counts.values())
+
+    async def _run(self):
+        while True:
+            # Flush first, so batches abandoned by a previous process are picked up at startup
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                # Keep flushing: a stopped loop would strand every later play in the buffer
+                print(f"❌ Play count flush failed, will retry: {e}")
+            await asyncio.sleep(settings.play_count_flush_seconds)
+
+    def start(self) -> None:
+        """Start the periodic flush loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+
+play_count_buffer = PlayCountBuffer()
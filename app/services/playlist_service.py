@@ -0,0 +1,307 @@
+import datetime
+from typing import Callable, Iterable, Optional, Tuple
+from sqlalchemy import func, select, insert, update, and_, or_, literal
+from sqlalchemy.orm import Session, aliased
+from ..database import SessionLocal
+from ..models.playlist import Playlist, PlaylistSong
+from ..models.song import Song
+from ..utils.sql import GUID, new_uuid
+from .library_version_service import LibraryVersionService
+
+# Spacing between consecutive positions after a rebalance. Leaves room for
+# about ten midpoint inserts between any two neighbours before a rebalance.
+POSITION_GAP = 1024
+
+# Schedule a rebalance once the space next to a newly placed song drops below this
+REBALANCE_THRESHOLD = 4
+
+
+class PlaylistService:
+    """
+    Keeps the denormalized playlist counters (song_count, total_duration,
+    total_play_count) in step with playlist membership and song play counts,
+    and manages the sparse ordering keys stored in PlaylistSong.position.
+
+    Counter adjustments are issued as single UPDATE statements relative to the
+    stored value, so they never need to load the playlist's songs. Positions are
+    spaced POSITION_GAP apart so that inserting or moving a song only writes the
+    moved row. Callers are responsible for committing the surrounding transaction.
+    """
+
+    @staticmethod
+    def _containing_playlists(song_id: str):
+        """Subquery of playlist ids that contain the given song"""
+        return select(PlaylistSong.playlist_id).where(PlaylistSong.song_id == song_id)
+
+    @staticmethod
+    def adjust_counters(db: Session, playlist_id: str, songs: int = 0,
+                        duration: float = 0.0, play_count: int = 0) -> None:
+        """Apply relative changes to a playlist's counters in one UPDATE"""
+        db.query(Playlist).filter(Playlist.id == playlist_id).update({
+            Playlist.song_count: Playlist.song_count + songs,
+            Playlist.total_duration: Playlist.total_duration + duration,
+            Playlist.total_play_count: Playlist.total_play_count + play_count,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def apply_song_added(db: Session, playlist_id: str, song: Song) -> None:
+        """Account for a song that was just added to a playlist"""
+        PlaylistService.adjust_counters(
+            db, playlist_id, 1, song.duration or 0, song.play_count or 0
+        )
+
+    @staticmethod
+    def apply_song_removed(db: Session, playlist_id: str, song: Optional[Song]) -> None:
+        """Account for a song that was just removed from a playlist"""
+        if song is None:
+            # Membership rows left behind by a deleted song are not counted
+            return
+        PlaylistService.adjust_counters(
+            db, playlist_id, -1, -(song.duration or 0), -(song.play_count or 0)
+        )
+
+    @staticmethod
+    def apply_song_deleted(db: Session, song: Song) -> None:
+        """
+        Account for a song being deleted from the library.
+        Must run before the song row is deleted so its memberships can still be found.
+        """
+        db.query(Playlist).filter(
+            Playlist.id.in_(PlaylistService._containing_playlists(song.id))
+        ).update({
+            Playlist.song_count: Playlist.song_count - 1,
+            Playlist.total_duration: Playlist.total_duration - (song.duration or 0),
+            Playlist.total_play_count: Playlist.total_play_count - (song.play_count or 0),
+        }, synchronize_session=False)
+
+    @staticmethod
+    def apply_play_count_delta(db: Session, song_id: str, delta: int = 1) -> None:
+        """Account for a change in a song's play count"""
+        if not delta:
+            return
+        db.query(Playlist).filter(
+            Playlist.id.in_(PlaylistService._containing_playlists(song_id))
+        ).update({
+            Playlist.total_play_count: Playlist.total_play_count + delta,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def refresh_counters(db: Session, playlist_ids: Optional[Iterable[str]] = None) -> None:
+        """
+        Recompute counters from scratch for the given playlists (or all playlists).
+        Used after set-based membership changes and to repair drift.
+        """
+        song_count = (
+            select(func.count(PlaylistSong.id))
+            .join(Song, Song.id == PlaylistSong.song_id)
+            .where(PlaylistSong.playlist_id == Playlist.id)
+            .scalar_subquery()
+        )
+        total_duration = (
+            select(func.coalesce(func.sum(Song.duration), 0.0))
+            .join(PlaylistSong, PlaylistSong.song_id == Song.id)
+            .where(PlaylistSong.playlist_id == Playlist.id)
+            .scalar_subquery()
+        )
+        total_play_count = (
+            select(func.coalesce(func.sum(Song.play_count), 0))
+            .join(PlaylistSong, PlaylistSong.song_id == Song.id)
+            .where(PlaylistSong.playlist_id == Playlist.id)
+            .scalar_subquery()
+        )
+
+        query = db.query(Playlist)
+        if playlist_ids is not None:
+            query = query.filter(Playlist.id.in_(list(playlist_ids)))
+        query.update({
+            Playlist.song_count: song_count,
+            Playlist.total_duration: total_duration,
+            Playlist.total_play_count: total_play_count,
+        }, synchronize_session=False)
+
+    @staticmethod
+    def position_between(before: Optional[int], after: Optional[int]) -> Optional[int]:
+        """
+        Pick an ordering key strictly between two neighbouring positions.
+        Returns None when the neighbours are adjacent and the playlist needs a rebalance.
+        """
+        if before is None and after is None:
+            return 0
+        if before is None:
+            return after - POSITION_GAP
+        if after is None:
+            return before + POSITION_GAP
+        if after - before < 2:
+            return None
+        return (before + after) // 2
+
+    @staticmethod
+    def is_crowded(before: Optional[int], position: int, after: Optional[int]) -> bool:
+        """Whether a newly placed key left too little room on either side"""
+        return (
+            (before is not None and position - before < REBALANCE_THRESHOLD) or
+            (after is not None and after - position < REBALANCE_THRESHOLD)
+        )
+
+    @staticmethod
+    def next_position(db: Session, playlist_id: str) -> int:
+        """Ordering key for appending a song to the end of a playlist"""
+        last = db.query(func.max(PlaylistSong.position)).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).scalar()
+        return 0 if last is None else last + POSITION_GAP
+
+    @staticmethod
+    def neighbours_at_index(db: Session, playlist_id: str, index: int) -> tuple:
+        """Positions of the songs that would surround a song inserted at a 0-based index"""
+        index = max(index, 0)
+        rows = db.query(PlaylistSong.position).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).order_by(
+            PlaylistSong.position, PlaylistSong.id
+        ).offset(max(index - 1, 0)).limit(2).all()
+        positions = [row.position for row in rows]
+
+        if index == 0:
+            return None, (positions[0] if positions else None)
+        if not positions:
+            # Index past the end of the playlist: append
+            return db.query(func.max(PlaylistSong.position)).filter(
+                PlaylistSong.playlist_id == playlist_id
+            ).scalar(), None
+        return positions[0], (positions[1] if len(positions) > 1 else None)
+
+    @staticmethod
+    def neighbours_of(db: Session, entry: PlaylistSong, place: str, exclude_id: str) -> tuple:
+        """
+        Positions of the songs that would surround a song placed immediately
+        before or after an existing playlist entry, ignoring the song being moved.
+        """
+        query = db.query(PlaylistSong.position).filter(
+            PlaylistSong.playlist_id == entry.playlist_id,
+            PlaylistSong.id != exclude_id
+        )
+        if place == "before":
+            neighbour = query.filter(or_(
+                PlaylistSong.position < entry.position,
+                and_(PlaylistSong.position == entry.position, PlaylistSong.id < entry.id)
+            )).order_by(PlaylistSong.position.desc(), PlaylistSong.id.desc()).first()
+            return (neighbour.position if neighbour else None), entry.position
+
+        neighbour = query.filter(or_(
+            PlaylistSong.position > entry.position,
+            and_(PlaylistSong.position == entry.position, PlaylistSong.id > entry.id)
+        )).order_by(PlaylistSong.position, PlaylistSong.id).first()
+        return entry.position, (neighbour.position if neighbour else None)
+
+    @staticmethod
+    def resolve_position(db: Session, playlist_id: str, find_neighbours: Callable[[], tuple]) -> Tuple[int, bool]:
+        """
+        Pick the ordering key for a song placed between the neighbours returned by
+        find_neighbours, rebalancing first if they are adjacent.
+        Returns the key and whether a background rebalance should be scheduled.
+        """
+        before, after = find_neighbours()
+        position = PlaylistService.position_between(before, after)
+        if position is None:
+            PlaylistService.rebalance(db, playlist_id)
+            db.expire_all()
+            before, after = find_neighbours()
+            position = PlaylistService.position_between(before, after)
+        return position, PlaylistService.is_crowded(before, position, after)
+
+    @staticmethod
+    def rebalance(db: Session, playlist_id: str) -> None:
+        """Respace a playlist's positions POSITION_GAP apart, keeping the current order"""
+        ranked = select(
+            PlaylistSong.id.label("id"),
+            (func.row_number().over(
+                order_by=(PlaylistSong.position, PlaylistSong.id)
+            ) - 1).label("rank")
+        ).where(PlaylistSong.playlist_id == playlist_id).subquery()
+
+        db.execute(
+            update(PlaylistSong)
+            .where(PlaylistSong.id == ranked.c.id)
+            .values(position=ranked.c.rank * POSITION_GAP)
+            .execution_options(synchronize_session=False)
+        )
+        # Positions are part of the playlist's track listing
+        LibraryVersionService.bump_playlist_owner(db, playlist_id)
+
+    @staticmethod
+    def rebalance_in_background(playlist_id: str) -> None:
+        """Background task wrapper around rebalance using its own session"""
+        db = SessionLocal()
+        try:
+            PlaylistService.rebalance(db, playlist_id)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Playlist rebalance failed for {playlist_id}: {e}")
+        finally:
+            db.close()
+
+    @staticmethod
+    def copy_songs(db: Session, source_id: str, target_id: str) -> int:
+        """
+        Copy every song of source into an empty target playlist with one
+        INSERT ... SELECT, keeping positions. Returns the number of rows copied.
+        """
+        rows = select(
+            new_uuid(),
+            literal(target_id, GUID),
+            PlaylistSong.song_id,
+            PlaylistSong.position,
+            literal(datetime.datetime.utcnow())
+        ).where(
+            PlaylistSong.playlist_id == source_id,
+            PlaylistSong.song_id.isnot(None)
+        )
+        result = db.execute(
+            insert(PlaylistSong).from_select(
+                ["id", "playlist_id", "song_id", "position", "added_at"], rows
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def merge_songs(db: Session, source_id: str, target_id: str) -> int:
+        """
+        Append the songs of source that are not yet in target, in source order,
+        with one INSERT ... SELECT. Returns the number of rows added.
+        """
+        target = aliased(PlaylistSong)
+        source = (
+            select(
+                PlaylistSong.song_id.label("song_id"),
+                func.min(PlaylistSong.position).label("position")
+            ).where(
+                PlaylistSong.playlist_id == source_id,
+                PlaylistSong.song_id.isnot(None),
+                ~select(target.id).where(
+                    target.playlist_id == target_id,
+                    target.song_id == PlaylistSong.song_id
+                ).exists()
+            ).group_by(PlaylistSong.song_id)
+        ).subquery()
+
+        last_position = select(
+            func.coalesce(func.max(PlaylistSong.position), -POSITION_GAP)
+        ).where(PlaylistSong.playlist_id == target_id).scalar_subquery()
+
+        rows = select(
+            new_uuid(),
+            literal(target_id, GUID),
+            source.c.song_id,
+            last_position + func.row_number().over(
+                order_by=(source.c.position, source.c.song_id)
+            ) * POSITION_GAP,
+            literal(datetime.datetime.utcnow())
+        )
+        result = db.execute(
+            insert(PlaylistSong).from_select(
+                ["id", "playlist_id", "song_id", "position", "added_at"], rows
+            )
+        )
+        return result.rowcount
@@ -0,0 +1,52 @@
+import re
+from typing import List
+from sqlalchemy import func, literal_column, or_, table, column
+from sqlalchemy.orm import Query, Session
+from ..models.song import Song
+
+# Relative weight of title, artist and album matches in SQLite's bm25 ranking
+FTS5_WEIGHTS = (10.0, 5.0, 1.0)
+
+songs_fts = table("songs_fts", column("rowid"))
+
+
+class SearchService:
+    """
+    Ranked full-text search over song title, artist and album.
+
+    Every search term matches as a prefix, and all terms must match
+    ("beat abb" finds "The Beatles - Abbey Road"). PostgreSQL uses the
+    songs.search_vector GIN index, SQLite the songs_fts FTS5 table; other
+    databases fall back to unranked substring matching.
+    """
+
+    @staticmethod
+    def terms(search: str) -> List[str]:
+        """Split user input into bare word tokens, dropping query syntax characters"""
+        return re.findall(r"\w+", search.lower())
+
+    @staticmethod
+    def apply(db: Session, query: Query, search: str) -> Query:
+        """Filter a Song query to matches of `search`, best matches first"""
+        terms = SearchService.terms(search)
+        dialect = db.get_bind().dialect.name
+
+        if terms and dialect == "postgresql":
+            ts_query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+            search_vector = literal_column("songs.search_vector")
+            return query.filter(search_vector.op("@@")(ts_query)).order_by(
+                func.ts_rank_cd(search_vector, ts_query).desc(), Song.id
+            )
+
+        if terms and dialect == "sqlite":
+            match = " ".join(f'"{term}"*' for term in terms)
+            fts = literal_column("songs_fts")
+            return query.join(songs_fts, songs_fts.c.rowid == literal_column("songs.rowid")).filter(
+                fts.op("MATCH")(match)
+            ).order_by(func.bm25(fts, *FTS5_WEIGHTS), Song.id)
+
+        return query.filter(or_(
+            Song.title.ilike(f"%{search}%"),
+            Song.artist.ilike(f"%{search}%"),
+            Song.album.ilike(f"%{search}%")
+        ))
@@ -0,0 +1,154 @@
+import threading
+import time
+from typing import Dict, List, Tuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from ..config import settings
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Counters for one connection pool, updated on every checkout"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.overflow_opened = 0  # Connections opened beyond pool_size
+        self.timeouts = 0  # Checkouts that gave up after pool_timeout
+        self.pings = 0  # Liveness checks issued by the 'idle' pre-ping strategy
+        self.invalidated = 0
+
+    def observe_checkout(self, wait_ms: float, overflowed: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            bucket = next((i for i, bound in enumerate(WAIT_BUCKETS_MS) if wait_ms <= bound), len(WAIT_BUCKETS_MS))
+            self.wait_buckets[bucket] += 1
+            if overflowed:
+                self.overflow_opened += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: QueuePool) -> dict:
+        with self._lock:
+            buckets = {f"le_{bound}ms": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_buckets)}
+            buckets["gt_5000ms"] = self.wait_buckets[-1]
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_wait_ms": {
+                    "avg": self.wait_total_ms / self.checkouts if self.checkouts else 0.0,
+                    "max": self.wait_max_ms,
+                    "buckets": buckets,
+                },
+                "overflow_connections_opened": self.overflow_opened,
+                "checkout_timeouts": self.timeouts,
+                "pre_pings": self.pings,
+                "invalidated": self.invalidated,
+            }
+
+
+class InstrumentedPoolMixin:
+    """Times every checkout, including waiting for a free connection or opening a new one"""
+    metrics: PoolMetrics
+
+    def connect(self):
+        overflow_before = self.overflow()
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.increment("timeouts")
+            raise
+        self.metrics.observe_checkout(
+            (time.perf_counter() - started) * 1000,
+            overflowed=self.overflow() > max(overflow_before, 0)
+        )
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics  # Keep counting across engine.dispose()
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# (name, engine) of every instrumented engine, for the metrics endpoint
+_engines: List[Tuple[str, object]] = []
+
+
+def pool_options(url: str, asyncio: bool = False) -> dict:
+    """create_engine keyword arguments for the pool, from settings"""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}  # In-memory SQLite keeps its single-connection pool
+
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if asyncio else InstrumentedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping == "always",
+    }
+
+
+def instrument(name: str, engine) -> None:
+    """Attach metrics and the configured pre-ping strategy to an engine's pool"""
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedPoolMixin):
+        return
+    pool.metrics = PoolMetrics()
+    _engines.append((name, engine))
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        engine.pool.metrics.increment("invalidated")
+
+    if settings.db_pool_pre_ping != "idle":
+        return
+
+    # Ping only connections that sat idle long enough to have been dropped by the
+    # server or a proxy, instead of paying a round trip on every checkout
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["last_checkin"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        last_checkin = connection_record.info.get("last_checkin")
+        if last_checkin is None or time.monotonic() - last_checkin < settings.db_pool_ping_idle_seconds:
+            return
+        engine.pool.metrics.increment("pings")
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            # The pool discards this connection and retries with a fresh one
+            raise exc.DisconnectionError()
+
+
+def pool_metrics() -> Dict[str, dict]:
+    return {name: engine.pool.metrics.snapshot(engine.pool) for name, engine in _engines}
@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Dict, Optional
+from fastapi import Request
+from jose import JWTError, jwt
+from sqlalchemy import text
+from ..config import settings
+
+try:
+    import redis
+except ImportError:  # Redis is optional; stickiness is then tracked per process
+    redis = None
+
+# Methods that never write, and so may be served by the replica
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+REDIS_STICKY_PREFIX = "db_routing:wrote"
+
+# Seconds of replay lag on a PostgreSQL standby. A standby that has replayed
+# everything it received is current even if the primary has been idle for a while.
+PG_REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def writer_key(request: Request) -> Optional[str]:
+    """
+    The user a request acts for, from its bearer token's subject.
+    Only used to route reads, so the signature is checked later by the
+    auth dependencies, not here.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+class ReplicaRouter:
+    """
+    Decides whether a request's session may read from the replica.
+
+    Reads (GET/HEAD/OPTIONS) go to the replica unless:
+    - the same user wrote within DATABASE_REPLICA_STICKY_SECONDS, so they
+      read their own writes (tracked in Redis when REPLICA_STICKY_BACKEND
+      is 'redis', so it holds across workers);
+    - the replica is more than DATABASE_REPLICA_MAX_LAG_SECONDS behind, or
+      can't be reached. Lag is measured at most every
+      DATABASE_REPLICA_LAG_CHECK_SECONDS.
+    Everything else goes to the primary.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._recent_writes: Dict[str, float] = {}
+        self._lag: Optional[float] = None
+        self._lag_checked_at = 0.0
+        self._redis = None
+        if engine is not None and settings.replica_sticky_backend == "redis":
+            if redis is None:
+                raise RuntimeError("REPLICA_STICKY_BACKEND=redis requires the redis package")
+            self._redis = redis.Redis.from_url(settings.redis_url)
+
+    @property
+    def enabled(self) -> bool:
+        return self.engine is not None
+
+    def mark_write(self, key: Optional[str]) -> None:
+        """Send the user's reads to the primary for the stickiness window"""
+        if not self.enabled or not key:
+            return
+        window = settings.database_replica_sticky_seconds
+        if self._redis is not None:
+            self._redis.set(f"{REDIS_STICKY_PREFIX}:{key}", 1, px=int(window * 1000))
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[key] = now + window
+            if len(self._recent_writes) > 10_000:
+                self._recent_writes = {k: until for k, until in self._recent_writes.items() if until > now}
+
+    def wrote_recently(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        if self._redis is not None:
+            return bool(self._redis.exists(f"{REDIS_STICKY_PREFIX}:{key}"))
+        with self._lock:
+            until = self._recent_writes.get(key)
+        return until is not None and until > time.monotonic()
+
+    def lag_is_stale(self) -> bool:
+        return time.monotonic() - self._lag_checked_at >= settings.database_replica_lag_check_seconds
+
+    def refresh_lag(self) -> Optional[float]:
+        """Measure replica lag (blocking); None when the replica can't be reached"""
+        with self._lock:
+            if not self.lag_is_stale():
+                return self._lag
+            self._lag_checked_at = time.monotonic()
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == "postgresql":
+                    lag = float(connection.execute(PG_REPLICA_LAG).scalar())
+                else:
+                    connection.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as e:
+            print(f"Replica lag check failed, reading from the primary: {str(e)}")
+            lag = None
+        self._lag = lag
+        return lag
+
+    def replica_healthy(self) -> bool:
+        """From the last lag measurement; call refresh_lag first when it is stale"""
+        return self._lag is not None and self._lag <= settings.database_replica_max_lag_seconds
+
+    def use_replica(self, request: Request) -> bool:
+        if not self.enabled or request.method not in SAFE_METHODS:
+            return False
+        return not self.wrote_recently(writer_key(request))
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "lag_seconds": self._lag,
+            "healthy": self.replica_healthy(),
+            "sticky_users": len(self._recent_writes),
+        }
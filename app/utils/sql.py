@@ -0,0 +1,110 @@
+import uuid
+from sqlalchemy import LargeBinary, String
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TypeDecorator
+
+
+class InvalidIdentifier(ValueError):
+    """A value bound to a GUID column that is not a UUID; no row can have that id"""
+
+
+def is_uuid(value) -> bool:
+    """Whether a client-supplied id can be bound to a GUID column"""
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+class GUID(TypeDecorator):
+    """
+    A UUID key: native `uuid` on PostgreSQL, 16 raw bytes elsewhere.
+
+    Python-side values stay the canonical 36-character strings, so models,
+    schemas and API responses keep treating ids as str. Binding anything that
+    doesn't parse as a UUID raises InvalidIdentifier (answered as 404).
+    """
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=False))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            parsed = value
+        elif isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 16:
+            parsed = uuid.UUID(bytes=bytes(value))
+        else:
+            try:
+                parsed = uuid.UUID(str(value))
+            except ValueError:
+                raise InvalidIdentifier(f"Not a valid id: {value!r}")
+        return str(parsed) if dialect.name == "postgresql" else parsed.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return str(uuid.UUID(bytes=bytes(value)))
+        return str(value)
+
+
+class new_uuid(FunctionElement):
+    """
+    A random UUID generated by the database.
+
+    Lets set-based statements (INSERT ... SELECT) fill GUID primary keys
+    without round-tripping rows through Python.
+    """
+    type = GUID()
+    inherit_cache = True
+
+
+@compiles(new_uuid)
+def _compile_new_uuid(element, compiler, **kw):
+    raise CompileError(f"new_uuid() is not supported on {compiler.dialect.name}")
+
+
+@compiles(new_uuid, "postgresql")
+def _compile_new_uuid_postgresql(element, compiler, **kw):
+    return "gen_random_uuid()"
+
+
+@compiles(new_uuid, "sqlite")
+def _compile_new_uuid_sqlite(element, compiler, **kw):
+    # 128 random bits; SQLite can't set the version nibble on a blob, which
+    # nothing relies on
+    return "randomblob(16)"
+
+
+class nil_uuid(FunctionElement):
+    """
+    The all-zero UUID as an SQL literal, rendered identically every time so it
+    can appear in both the select list and GROUP BY of one statement.
+    """
+    type = GUID()
+    inherit_cache = True
+
+
+@compiles(nil_uuid)
+def _compile_nil_uuid(element, compiler, **kw):
+    raise CompileError(f"nil_uuid() is not supported on {compiler.dialect.name}")
+
+
+@compiles(nil_uuid, "sqlite")
+def _compile_nil_uuid_sqlite(element, compiler, **kw):
+    return "zeroblob(16)"
+
+
+@compiles(nil_uuid, "postgresql")
+def _compile_nil_uuid_postgresql(element, compiler, **kw):
+    return "'00000000-0000-0000-0000-000000000000'::uuid"
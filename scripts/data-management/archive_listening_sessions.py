@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Archive listening sessions older than the retention window.
+
+On PostgreSQL this creates upcoming monthly partitions, then detaches old
+partitions, exports them to LISTENING_ARCHIVE_DIR and drops them; old rows
+in the default partition are archived and deleted month by month. On other
+databases old rows are archived and deleted month by month.
+Daily listening rollups are kept, so stats still cover archived months.
+
+Run it periodically (e.g. daily from cron).
+
+Usage:
+    python scripts/data-management/archive_listening_sessions.py [ndjson|parquet]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database import SessionLocal
+from app.config import settings
+from app.services.listening_retention_service import ListeningRetentionService
+
+
+def archive_listening_sessions(fmt: str = None):
+    """Ensure future partitions exist and archive expired listening history."""
+    db = SessionLocal()
+    
+    try:
+        created = ListeningRetentionService.ensure_partitions(db)
+        db.commit()
+        if created:
+            print(f"✅ Created partitions: {', '.join(created)}")
+        
+        cutoff = ListeningRetentionService.retention_cutoff()
+        print(f"🔄 Archiving listening sessions started before {cutoff} "
+              f"(retention: {settings.listening_retention_months} months)...")
+        archived = ListeningRetentionService.run_retention(db, fmt=fmt)
+        
+        total = sum(entry["rows"] for entry in archived)
+        print(f"✅ Archived {total} sessions from {len(archived)} month(s)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Archiving failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    archive_listening_sessions(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rebuild daily listening rollups from raw listening sessions.
+
+Rollups are maintained incrementally when listening sessions complete; run this
+periodically (e.g. nightly from cron) to repair any drift.
+
+Usage:
+    python scripts/data-management/compact_listening_rollups.py [days]
+"""
+
+import sys
+import os
+from datetime import date, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.database import SessionLocal
+from app.services.listening_service import ListeningService
+
+
+def compact_rollups(days: int = 2):
+    """Recompute rollups for the last `days` days, including today."""
+    db = SessionLocal()
+    since = date.today() - timedelta(days=max(days - 1, 0))
+    
+    try:
+        print(f"🔄 Rebuilding listening rollups since {since}...")
+        rows = ListeningService.compact(db, since)
+        db.commit()
+        print(f"✅ Wrote {rows} rollup rows")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Compaction failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    compact_rollups(int(sys.argv[1]) if len(sys.argv) > 1 else 2)
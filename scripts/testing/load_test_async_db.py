@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Mixed-traffic load test for the API, reporting latency percentiles per endpoint.
+
+Simulates many concurrent listeners: range requests against the streaming
+endpoint (seeking/buffering), profile lookups, library pages and playlist
+summaries. Run it against a build before and after a change to compare tail
+latency (p95/p99) under the same load, e.g. sync vs async database handlers.
+
+Usage:
+    python testing/load_test_async_db.py --email test@streamflow.com --password testpass123
+    python testing/load_test_async_db.py --concurrency 100 --duration 60 --base-url http://localhost:8000
+
+Requires httpx (pip install httpx) and a running backend with at least one song
+in the test user's library.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+# (name, weight) of each request type in the traffic mix
+TRAFFIC_MIX = [
+    ("stream range", 50),
+    ("auth me", 25),
+    ("songs page", 15),
+    ("playlist summaries", 10),
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> Dict[str, str]:
+    response = await client.post("/api/auth/login/", json={"email": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def send(client: httpx.AsyncClient, kind: str, headers: Dict[str, str], song_id: str) -> httpx.Response:
+    if kind == "stream range":
+        start = random.randint(0, 1_000_000)
+        return await client.get(
+            f"/api/stream/song/{song_id}/",
+            headers={**headers, "Range": f"bytes={start}-{start + 65535}"}
+        )
+    if kind == "auth me":
+        return await client.get("/api/auth/me/", headers=headers)
+    if kind == "songs page":
+        return await client.get("/api/songs/", params={"limit": 20}, headers=headers)
+    return await client.get("/api/playlists/summaries/", headers=headers)
+
+
+async def worker(client, headers, song_id, deadline, latencies, errors):
+    kinds = [kind for kind, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+    while time.perf_counter() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await send(client, kind, headers, song_id)
+            if response.status_code >= 400:
+                errors[kind] += 1
+                continue
+        except httpx.HTTPError:
+            errors[kind] += 1
+            continue
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        headers = await login(client, args.email, args.password)
+
+        song_id = args.song_id
+        if not song_id:
+            songs = (await client.get("/api/songs/", params={"limit": 1}, headers=headers)).json()
+            if not songs:
+                print("❌ The test user has no songs; upload one or pass --song-id")
+                return
+            song_id = songs[0]["id"]
+
+        print(f"🚀 {args.concurrency} concurrent clients for {args.duration}s against {args.base_url}")
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*[
+            worker(client, headers, song_id, deadline, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+
+    print(f"\n{'endpoint':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    everything = []
+    for kind, _ in TRAFFIC_MIX:
+        values = latencies[kind]
+        everything.extend(values)
+        if not values:
+            print(f"{kind:<20}{0:>10}{errors[kind]:>8}")
+            continue
+        print(f"{kind:<20}{len(values):>10}{errors[kind]:>8}"
+              f"{statistics.median(values):>10.1f}{percentile(values, 95):>10.1f}"
+              f"{percentile(values, 99):>10.1f}{max(values):>10.1f}")
+    if everything:
+        print(f"\n📊 Overall: {len(everything) / args.duration:.0f} req/s, "
+              f"p50 {statistics.median(everything):.1f} ms, p99 {percentile(everything, 99):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic API load test")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="test@streamflow.com")
+    parser.add_argument("--password", default="testpass123")
+    parser.add_argument("--song-id", help="Song to stream (defaults to the first song in the library)")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=int, default=30, help="Seconds to run")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
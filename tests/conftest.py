@@ -235,4 +235,112 @@ def get_test_user_credentials() -> dict:
         "email": "test@streamflow.com",
         "password": "testpass123",
         "username": "testuser"
-    } 
\ No newline at end of file
+    } 
+
+class ApiHarness:
+    """
+    TestClient for the API on a throwaway SQLite database (foreign keys
+    enforced, like PostgreSQL), with helpers to seed users and songs
+    directly. Background services using SessionLocal see the same database.
+    """
+    
+    def __init__(self, engine):
+        from fastapi.testclient import TestClient
+        from app.main import app
+        
+        self.engine = engine
+        self.client = TestClient(app)
+    
+    def session(self):
+        return SessionLocal()
+    
+    def create_user(self, username: str, role: str = "user") -> tuple[str, dict]:
+        """Create a user; returns its id and Authorization headers"""
+        from app.utils.security import create_access_token
+        
+        db = SessionLocal()
+        try:
+            user = User(username=username, email=f"{username}@streamflow.test",
+                        hashed_password=get_password_hash("testpass123"), role=role)
+            db.add(user)
+            db.commit()
+            user_id = user.id
+        finally:
+            db.close()
+        token = create_access_token(data={"sub": username})
+        return user_id, {"Authorization": f"Bearer {token}"}
+    
+    def create_songs(self, owner_id: str, count: int, **overrides) -> list[str]:
+        """Create song records (no audio files); returns their ids in creation order"""
+        from app.services.library_service import LibraryService
+        
+        db = SessionLocal()
+        try:
+            songs = []
+            for i in range(count):
+                song = Song(**{
+                    "title": f"Song {i}",
+                    "artist": f"Artist {i % 3}",
+                    "album": f"Album {i % 2}",
+                    "genre": "Rock",
+                    "duration": 100.0 + i,
+                    "play_count": 0,
+                    "file_path": f"/nonexistent/song-{i}.mp3",
+                    "uploaded_by": owner_id,
+                    **overrides,
+                })
+                db.add(song)
+                db.flush()
+                LibraryService.link_song(db, song)
+                songs.append(song)
+            db.commit()
+            return [song.id for song in songs]
+        finally:
+            db.close()
+    
+    def create_playlist(self, headers: dict, song_ids: list = (), name: str = "Mix") -> str:
+        """Create a playlist through the API, with the songs in order; returns its id"""
+        response = self.client.post("/api/playlists/", json={"name": name}, headers=headers)
+        assert response.status_code == 200, response.text
+        playlist_id = response.json()["id"]
+        if song_ids:
+            response = self.client.post(f"/api/playlists/{playlist_id}/songs/batch/",
+                                        json={"song_ids": list(song_ids)}, headers=headers)
+            assert response.status_code == 200, response.text
+        return playlist_id
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch) -> Generator[ApiHarness, None, None]:
+    """API harness on a fresh database; in-process caches and buffers start empty"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import NullPool
+    from app import database
+    from app.services.autocomplete_service import autocomplete_service
+    from app.services.cache_service import cache_service, MemoryCacheBackend
+    from app.services.play_count_buffer import play_count_buffer, MemoryCountBackend
+    
+    test_engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}")
+    # Async handlers get their own engine on the same file; NullPool, because the
+    # TestClient runs each request on a new event loop
+    async_test_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}", poolclass=NullPool)
+    
+    def enforce_foreign_keys(connection, _):
+        cursor = connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+    
+    event.listen(test_engine, "connect", enforce_foreign_keys)
+    event.listen(async_test_engine.sync_engine, "connect", enforce_foreign_keys)
+    Base.metadata.create_all(bind=test_engine)
+    SessionLocal.configure(bind=test_engine)
+    monkeypatch.setattr(database, "_async_engines", {"async": async_test_engine})
+    monkeypatch.setattr(cache_service, "_backend", MemoryCacheBackend())
+    monkeypatch.setattr(play_count_buffer, "_backend", MemoryCountBackend())
+    monkeypatch.setattr(autocomplete_service, "_indexes", type(autocomplete_service._indexes)())
+    try:
+        yield ApiHarness(test_engine)
+    finally:
+        SessionLocal.configure(bind=engine)
+        test_engine.dispose()
@@ -0,0 +1,84 @@
+"""
+The async database layer: registration, login, /me and streaming run on the
+asyncio engine (aiosqlite here) and see the same data as the sync handlers.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal, async_database_url, get_async_engine
+from app.models.user import User
+
+
+def test_register_login_and_me_run_on_the_async_session(api):
+    response = api.client.post("/api/auth/register/", json={
+        "username": "alice", "email": "alice@streamflow.com", "password": "secret-pass"
+    })
+    assert response.status_code == 200, response.text
+    user_id = response.json()["id"]
+
+    login = api.client.post("/api/auth/login/", json={"email": "alice@streamflow.com", "password": "secret-pass"})
+    assert login.status_code == 200, login.text
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    me = api.client.get("/api/auth/me/", headers=headers)
+    assert me.status_code == 200
+    assert (me.json()["id"], me.json()["username"]) == (user_id, "alice")
+    # The sync handlers see the account the async session created
+    assert api.client.get("/api/songs/", headers=headers).status_code == 200
+
+
+def test_bad_credentials_are_refused(api):
+    api.client.post("/api/auth/register/", json={
+        "username": "alice", "email": "alice@streamflow.com", "password": "secret-pass"
+    })
+
+    assert api.client.post("/api/auth/register/", json={
+        "username": "other", "email": "alice@streamflow.com", "password": "secret-pass"
+    }).status_code == 400
+    assert api.client.post("/api/auth/register/", json={
+        "username": "alice", "email": "other@streamflow.com", "password": "secret-pass"
+    }).status_code == 400
+    assert api.client.post("/api/auth/login/", json={
+        "email": "alice@streamflow.com", "password": "wrong"
+    }).status_code == 401
+    assert api.client.get("/api/auth/me/", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+
+
+def test_streaming_serves_ranges_of_the_users_own_songs(api, tmp_path):
+    audio = tmp_path / "song.mp3"
+    audio.write_bytes(bytes(range(256)) * 4)
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    song_id, = api.create_songs(user_id, 1, file_path=str(audio))
+
+    full = api.client.get(f"/api/stream/song/{song_id}/", headers=headers)
+    assert full.status_code == 200
+    assert full.content == audio.read_bytes()
+
+    part = api.client.get(f"/api/stream/song/{song_id}/", headers={**headers, "Range": "bytes=10-19"})
+    assert part.status_code == 206
+    assert part.headers["Content-Range"] == "bytes 10-19/1024"
+    assert part.content == bytes(range(10, 20))
+
+    assert api.client.get(f"/api/stream/song/{song_id}/", headers=other_headers).status_code == 404
+
+
+def test_async_sessions_read_rows_written_through_the_sync_session(api):
+    user_id, _ = api.create_user("alice")
+
+    async def load():
+        async with AsyncSessionLocal(bind=get_async_engine()) as db:
+            return (await db.execute(select(User.username).where(User.id == user_id))).scalar_one()
+
+    assert asyncio.run(load()) == "alice"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("postgresql://u:p@db/app?sslmode=require", "postgresql+asyncpg://u:p@db/app?ssl=require"),
+    ("postgresql://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+    ("sqlite:///./streamflow.db", "sqlite+aiosqlite:///./streamflow.db"),
+])
+def test_async_urls_switch_to_asyncio_drivers(url, expected):
+    assert async_database_url(url).render_as_string(hide_password=False) == expected
@@ -0,0 +1,86 @@
+"""
+Typeahead suggestions (GET /api/songs/autocomplete/) from the in-memory
+prefix indexes: word-prefix matching, ranking, per-library visibility and
+keeping a loaded index in step with edits and deletes.
+"""
+from app.services.autocomplete_service import LibraryIndex, normalize
+
+
+def suggest(api, headers, q, **params):
+    response = api.client.get("/api/songs/autocomplete/", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["query"] == q
+    return response.json()["suggestions"]
+
+
+def values(suggestions):
+    return [(s["type"], s["value"]) for s in suggestions]
+
+
+def test_prefixes_match_any_word_ignoring_case_and_accents(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1, title="Café del Mar", artist="Energy 52", album="Ibiza Classics")
+
+    assert suggest(api, headers, "cafe") == [{"type": "title", "value": "Café del Mar", "song_count": 1, "song_id": song_id}]
+    assert values(suggest(api, headers, "MAR")) == [("title", "Café del Mar")]
+    assert values(suggest(api, headers, "ibiza cl")) == [("album", "Ibiza Classics")]
+    assert suggest(api, headers, "zzz") == []
+
+
+def test_values_starting_with_the_prefix_rank_first_then_by_song_count(api):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 1, title="Across the Universe", artist="The Beatles", album="Let It Be")
+    api.create_songs(user_id, 1, title="Help!", artist="The Beatles", album="Help!")
+    api.create_songs(user_id, 1, title="Beat It", artist="Michael Jackson", album="Thriller")
+
+    result = suggest(api, headers, "beat")
+
+    assert values(result) == [("title", "Beat It"), ("artist", "The Beatles")]
+    assert result[1]["song_count"] == 2 and "song_id" not in result[1]
+    assert len(suggest(api, headers, "beat", limit=1)) == 1
+
+
+def test_suggestions_come_from_the_users_own_library(api):
+    user_id, headers = api.create_user("alice")
+    other_id, other_headers = api.create_user("bob")
+    _, admin_headers = api.create_user("root", role="admin")
+    api.create_songs(user_id, 1, title="Mine")
+    api.create_songs(other_id, 1, title="Mine Too")
+
+    assert values(suggest(api, headers, "mine")) == [("title", "Mine")]
+    assert values(suggest(api, other_headers, "mine")) == [("title", "Mine Too")]
+    assert len(suggest(api, admin_headers, "mine")) == 2
+
+
+def test_loaded_indexes_follow_edits_and_deletes(api):
+    user_id, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    song_id, = api.create_songs(user_id, 1, title="Old Name")
+    assert values(suggest(api, headers, "old")) == [("title", "Old Name")]
+    assert values(suggest(api, admin_headers, "old")) == [("title", "Old Name")]
+
+    api.client.put(f"/api/songs/{song_id}/", json={"title": "New Name"}, headers=headers)
+    assert suggest(api, headers, "old") == []
+    assert values(suggest(api, admin_headers, "new")) == [("title", "New Name")]
+
+    api.client.delete(f"/api/songs/{song_id}/", headers=headers)
+    assert suggest(api, headers, "new") == []
+    assert suggest(api, admin_headers, "new") == []
+
+
+def test_queries_are_validated(api):
+    _, headers = api.create_user("alice")
+
+    assert api.client.get("/api/songs/autocomplete/", params={"q": ""}, headers=headers).status_code == 422
+    assert api.client.get("/api/songs/autocomplete/", params={"q": "a", "limit": 51}, headers=headers).status_code == 422
+
+
+def test_index_add_replaces_and_remove_drops_entries():
+    index = LibraryIndex.build([("1", "Abbey Road", "The Beatles", None)])
+    index.add("1", "Let It Be", "The Beatles", None)
+    index.add("2", "Road Trip", "Band", "Roads")
+
+    assert [s["value"] for s in index.suggest("road", 10)] == ["Road Trip", "Roads"]
+    index.remove("2")
+    assert index.suggest("road", 10) == []
+    assert normalize("  Ünïcode   Spaces ") == "unicode spaces"
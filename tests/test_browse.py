@@ -0,0 +1,70 @@
+"""
+Browsing by artist, album and genre (GET /api/songs/browse/{facet}/): facet
+counts and durations per library, and cached facets dropped when songs change.
+"""
+
+
+def browse(api, headers, facet, **params):
+    response = api.client.get(f"/api/songs/browse/{facet}/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["facet"] == facet
+    return response.json()["items"]
+
+
+def summary(items, *fields):
+    return [tuple(item[field] for field in ("name", *fields)) for item in items]
+
+
+def test_facets_group_the_users_library(api):
+    user_id, headers = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    api.create_songs(user_id, 4)
+    api.create_songs(other_id, 1, artist="Stranger", genre="Jazz")
+
+    assert summary(browse(api, headers, "artists"), "song_count", "album_count", "total_duration") == [
+        ("Artist 0", 2, 2, 203.0), ("Artist 1", 1, 1, 101.0), ("Artist 2", 1, 1, 102.0)
+    ]
+    assert summary(browse(api, headers, "albums"), "artist", "song_count") == [
+        ("Album 0", "Artist 0", 1), ("Album 0", "Artist 2", 1), ("Album 1", "Artist 0", 1), ("Album 1", "Artist 1", 1)
+    ]
+    assert summary(browse(api, headers, "albums", artist="Artist 0"), "artist") == [
+        ("Album 0", "Artist 0"), ("Album 1", "Artist 0")
+    ]
+    assert summary(browse(api, headers, "genres"), "song_count", "artist_count", "total_duration") == [
+        ("Rock", 4, 3, 406.0)
+    ]
+
+
+def test_admins_browse_the_whole_catalogue(api):
+    user_id, _ = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    _, admin_headers = api.create_user("root", role="admin")
+    api.create_songs(user_id, 2)
+    api.create_songs(other_id, 1, genre="Jazz")
+
+    assert summary(browse(api, admin_headers, "artists"), "song_count") == [("Artist 0", 2), ("Artist 1", 1)]
+    assert summary(browse(api, admin_headers, "genres"), "song_count") == [("Jazz", 1), ("Rock", 2)]
+
+
+def test_cached_facets_are_dropped_when_songs_change(api):
+    user_id, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    song_id, = api.create_songs(user_id, 1)
+    assert summary(browse(api, admin_headers, "genres"), "song_count") == [("Rock", 1)]
+
+    api.create_songs(user_id, 1)  # Written behind the API's back: no event, still cached
+    assert summary(browse(api, admin_headers, "genres"), "song_count") == [("Rock", 1)]
+
+    api.client.put(f"/api/songs/{song_id}/", json={"genre": "Jazz", "artist": "Renamed"}, headers=headers)
+    assert summary(browse(api, admin_headers, "genres"), "song_count") == [("Jazz", 1), ("Rock", 1)]
+    assert summary(browse(api, headers, "artists")) == [("Artist 0",), ("Renamed",)]
+
+    api.client.delete(f"/api/songs/{song_id}/", headers=headers)
+    assert summary(browse(api, admin_headers, "genres"), "song_count") == [("Rock", 1)]
+    assert summary(browse(api, headers, "artists")) == [("Artist 0",)]
+
+
+def test_unknown_facets_are_rejected(api):
+    _, headers = api.create_user("alice")
+
+    assert api.client.get("/api/songs/browse/years/", headers=headers).status_code == 422
@@ -0,0 +1,173 @@
+"""
+Cache service against each backend: the in-process LRU always, fakeredis
+when installed, and a real Redis server when CACHE_TEST_REDIS_URL is set
+(e.g. redis://localhost:6379/15; keys use a per-test prefix and are removed).
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.config import settings
+from app.services import cache_service as cache_module
+from app.services.cache_service import CacheService, MemoryCacheBackend, RedisCacheBackend
+
+
+@pytest.fixture(params=["memory", "fakeredis", "redis"])
+def cache(request, monkeypatch):
+    monkeypatch.setattr(settings, "cache_key_prefix", f"cache-test-{uuid.uuid4().hex[:8]}")
+    monkeypatch.setattr(settings, "cache_lock_seconds", 2.0)
+
+    if request.param == "memory":
+        backend = MemoryCacheBackend()
+    elif request.param == "fakeredis":
+        fakeredis = pytest.importorskip("fakeredis")
+        backend = RedisCacheBackend(client=fakeredis.FakeRedis(decode_responses=True))
+    else:
+        url = os.getenv("CACHE_TEST_REDIS_URL")
+        if not url:
+            pytest.skip("CACHE_TEST_REDIS_URL not set")
+        pytest.importorskip("redis")
+        backend = RedisCacheBackend(url)
+
+    service = CacheService(backend)
+    yield service
+    service.clear()
+
+
+def counting(value):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return value
+    return compute, calls
+
+
+def test_values_are_computed_once_and_serialized(cache):
+    compute, calls = counting({"when": datetime(2024, 1, 2, 3, 4, 5), "items": [1, 2]})
+
+    first = cache.get_or_set("k", compute)
+    second = cache.get_or_set("k", compute)
+
+    assert first == second == {"when": "2024-01-02T03:04:05", "items": [1, 2]}
+    assert len(calls) == 1
+
+
+def test_entries_expire(cache):
+    compute, calls = counting([1])
+
+    cache.get_or_set("k", compute, ttl=0.05)
+    time.sleep(0.1)
+    cache.get_or_set("k", compute, ttl=0.05)
+
+    assert len(calls) == 2
+
+
+def test_invalidating_a_tag_drops_only_its_entries(cache):
+    compute_a, calls_a = counting("a")
+    compute_b, calls_b = counting("b")
+
+    cache.get_or_set("a", compute_a, tags=["library:1"])
+    cache.get_or_set("b", compute_b, tags=["library:2"])
+    cache.invalidate_tags("library:1")
+    cache.get_or_set("a", compute_a, tags=["library:1"])
+    cache.get_or_set("b", compute_b, tags=["library:2"])
+
+    assert (len(calls_a), len(calls_b)) == (2, 1)
+
+
+def test_value_computed_before_an_invalidation_is_not_served_after_it(cache):
+    def stale():
+        cache.invalidate_tags("library:1")  # A write commits while we compute
+        return "stale"
+
+    assert cache.get_or_set("k", stale, tags=["library:1"]) == "stale"
+    assert cache.get_or_set("k", lambda: "fresh", tags=["library:1"]) == "fresh"
+
+
+def test_concurrent_misses_compute_once(cache):
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("k", slow))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_failed_computation_is_not_cached_and_releases_the_lock(cache):
+    def fail():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_set("k", fail)
+
+    started = time.monotonic()
+    assert cache.get_or_set("k", lambda: "ok") == "ok"
+    assert time.monotonic() - started < settings.cache_lock_seconds
+
+
+def test_cached_decorator_keys_by_scope_and_arguments(cache, monkeypatch):
+    monkeypatch.setattr(cache_module, "cache_service", cache)
+    calls = []
+
+    @cache_module.cached("test:endpoint", scope=lambda user, **_: None if user == "admin" else user)
+    async def endpoint(playlist_id: str, user: str, db=None):
+        calls.append((playlist_id, user))
+        return {"playlist_id": playlist_id, "user": user}
+
+    async def run():
+        for playlist_id, user in [("p1", "u1"), ("p1", "u1"), ("p2", "u1"), ("p1", "u2"), ("p1", "admin"), ("p1", "admin")]:
+            assert await endpoint(playlist_id=playlist_id, user=user, db=object()) == {"playlist_id": playlist_id, "user": user}
+
+    asyncio.run(run())
+    assert calls == [("p1", "u1"), ("p2", "u1"), ("p1", "u2"), ("p1", "admin"), ("p1", "admin")]
+
+
+def test_async_lookups_do_not_block_the_event_loop(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(settings, "cache_key_prefix", f"cache-test-{uuid.uuid4().hex[:8]}")
+    backend = RedisCacheBackend(client=fakeredis.FakeRedis(decode_responses=True))
+    slow_get = backend.get
+    monkeypatch.setattr(backend, "get", lambda key: time.sleep(0.2) or slow_get(key))
+    cache = CacheService(backend)
+    ticks = []
+
+    async def compute():
+        return "value"
+
+    async def ticker():
+        for _ in range(10):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        return (await asyncio.gather(ticker(), cache.aget_or_set("k", compute, tags=["t"])))[1]
+
+    assert asyncio.run(run()) == "value"
+    # The ticker kept running while the Redis read was in flight
+    assert len(ticks) == 10 and ticks[-1] - ticks[0] < 0.2
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", "1", 60)
+    backend.set("b", "2", 60)
+    backend.get("a")
+    backend.set("c", "3", 60)
+
+    assert (backend.get("a"), backend.get("b"), backend.get("c")) == ("1", None, "3")
@@ -0,0 +1,82 @@
+"""
+Conditional GETs on library endpoints: an ETag from the user's library
+version, 304 Not Modified while it matches, and a new ETag after any change
+the endpoint would show.
+"""
+
+
+def get(api, headers, path, etag=None, **params):
+    request_headers = {**headers, "If-None-Match": etag} if etag else headers
+    return api.client.get(path, params=params, headers=request_headers)
+
+
+def test_unchanged_libraries_answer_304(api):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 2)
+
+    first = get(api, headers, "/api/songs/")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    repeat = get(api, headers, "/api/songs/", etag)
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == etag
+    assert repeat.content == b""
+
+    # Weak comparison, lists of tags and the wildcard
+    assert get(api, headers, "/api/songs/", etag.removeprefix("W/")).status_code == 304
+    assert get(api, headers, "/api/songs/", f'"other", {etag}').status_code == 304
+    assert get(api, headers, "/api/songs/", "*").status_code == 304
+    assert get(api, headers, "/api/songs/", '"other"').status_code == 200
+
+
+def test_etags_differ_per_user_and_query(api):
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    api.create_songs(user_id, 1)
+    etag = get(api, headers, "/api/songs/").headers["ETag"]
+
+    assert get(api, headers, "/api/songs/", etag, sort="title").status_code == 200
+    assert get(api, headers, "/api/playlists/", etag).status_code == 200
+    assert get(api, other_headers, "/api/songs/", etag).status_code == 200
+
+
+def test_changes_to_the_library_move_the_etag(api):
+    user_id, headers = api.create_user("alice")
+    song_id, other_song = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(headers, [song_id])
+
+    for path, change in [
+        ("/api/songs/", lambda: api.client.put(f"/api/songs/{song_id}/", json={"title": "Renamed"}, headers=headers)),
+        ("/api/songs/liked/", lambda: api.client.post(f"/api/songs/{song_id}/like/", headers=headers)),
+        ("/api/playlists/", lambda: api.client.post(f"/api/playlists/{playlist_id}/songs/batch/",
+                                                    json={"song_ids": [other_song]}, headers=headers)),
+    ]:
+        etag = get(api, headers, path).headers["ETag"]
+        assert change().status_code == 200
+        response = get(api, headers, path, etag)
+        assert response.status_code == 200, path
+        assert response.headers["ETag"] != etag
+
+
+def test_other_users_changes_that_show_up_move_the_etag(api):
+    user_id, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    song_id, = api.create_songs(user_id, 1)
+    playlist_id = api.create_playlist(headers, [song_id])
+    etag = get(api, headers, f"/api/playlists/{playlist_id}/").headers["ETag"]
+
+    assert api.client.delete(f"/api/songs/{song_id}/", headers=admin_headers).status_code == 200
+
+    assert get(api, headers, f"/api/playlists/{playlist_id}/", etag).status_code == 200
+
+
+def test_admins_get_no_etag(api):
+    _, admin_headers = api.create_user("root", role="admin")
+
+    response = get(api, admin_headers, "/api/songs/", "*")
+
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
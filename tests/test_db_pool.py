@@ -0,0 +1,84 @@
+"""
+Connection pool sizing and metrics: checkouts, overflow connections,
+timeouts and idle pre-pings are counted per engine and exposed to admins at
+GET /api/admin/db-pool/metrics/.
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.config import settings
+from app.utils import db_pool
+from app.utils.db_pool import instrument, pool_metrics, pool_options
+
+
+@pytest.fixture
+def small_pool(tmp_path, monkeypatch):
+    """An instrumented engine with one pooled and one overflow connection"""
+    monkeypatch.setattr(settings, "db_pool_size", 1)
+    monkeypatch.setattr(settings, "db_max_overflow", 1)
+    monkeypatch.setattr(settings, "db_pool_timeout", 0.1)
+    monkeypatch.setattr(settings, "db_pool_pre_ping", "idle")
+    monkeypatch.setattr(db_pool, "_engines", [])
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **pool_options(url))
+    instrument("test", engine)
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_overflow_and_timeouts_are_counted(small_pool):
+    first = small_pool.connect()
+    second = small_pool.connect()  # Beyond pool_size: an overflow connection
+    with pytest.raises(exc.TimeoutError):
+        small_pool.connect()
+    second.close()
+    first.close()
+
+    metrics = pool_metrics()["test"]
+    assert (metrics["pool_size"], metrics["max_overflow"], metrics["timeout_seconds"]) == (1, 1, 0.1)
+    assert metrics["checkouts"] == 2
+    assert metrics["overflow_connections_opened"] == 1
+    assert metrics["checkout_timeouts"] == 1
+    assert sum(metrics["checkout_wait_ms"]["buckets"].values()) == 2
+    assert (metrics["in_use"], metrics["idle"]) == (0, 1)
+
+
+def test_only_idle_connections_are_pinged(small_pool, monkeypatch):
+    with small_pool.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    with small_pool.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert pool_metrics()["test"]["pre_pings"] == 0
+
+    monkeypatch.setattr(settings, "db_pool_ping_idle_seconds", 0)
+    with small_pool.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert pool_metrics()["test"]["pre_pings"] == 1
+
+
+def test_metrics_survive_dispose(small_pool):
+    small_pool.connect().close()
+    small_pool.dispose()
+    small_pool.connect().close()
+
+    assert pool_metrics()["test"]["checkouts"] == 2
+
+
+def test_pool_options_follow_settings():
+    assert pool_options("sqlite:///:memory:") == {}
+    options = pool_options("postgresql://u:p@db/app")
+    assert options["poolclass"] is db_pool.InstrumentedQueuePool
+    assert (options["pool_size"], options["max_overflow"]) == (settings.db_pool_size, settings.db_max_overflow)
+    assert pool_options("postgresql://u:p@db/app", asyncio=True)["poolclass"] is db_pool.InstrumentedAsyncAdaptedQueuePool
+
+
+def test_metrics_endpoint_is_for_admins(api, small_pool):
+    _, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+
+    response = api.client.get("/api/admin/db-pool/metrics/", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json()["test"]["pool_size"] == 1
+    assert "replica_routing" in response.json()
+    assert api.client.get("/api/admin/db-pool/metrics/", headers=headers).status_code == 403
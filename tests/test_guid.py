@@ -0,0 +1,76 @@
+"""
+GUID id columns: 16 raw bytes on SQLite and native uuid on PostgreSQL, read
+back as canonical strings, with malformed ids answered as 404.
+"""
+import uuid
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import CompileError
+
+from app.models.song import Song
+from app.utils.sql import GUID, InvalidIdentifier, is_uuid, new_uuid, nil_uuid
+
+SONG_ID = "0b7a2e1c-4f5d-4c3b-9a8e-7d6c5b4a3f21"
+
+
+def test_ids_are_stored_as_16_bytes_and_read_back_as_strings(api):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    db = api.session()
+    try:
+        assert db.execute(text("SELECT typeof(id), length(id) FROM songs")).one() == ("blob", 16)
+        assert db.execute(text("SELECT id FROM songs")).scalar() == uuid.UUID(song_id).bytes
+        assert db.get(Song, song_id).uploaded_by == user_id
+        assert isinstance(song_id, str) and uuid.UUID(song_id).hex == song_id.replace("-", "")
+    finally:
+        db.close()
+
+
+def test_any_spelling_of_an_id_finds_the_row(api):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    db = api.session()
+    try:
+        for spelling in (song_id.upper(), f"{{{song_id}}}", uuid.UUID(song_id), song_id.replace("-", "")):
+            assert db.execute(select(Song.id).where(Song.id == spelling)).scalar() == song_id
+    finally:
+        db.close()
+
+
+def test_binding_converts_per_dialect():
+    guid = GUID()
+
+    assert guid.process_bind_param(SONG_ID.upper(), sqlite.dialect()) == uuid.UUID(SONG_ID).bytes
+    assert guid.process_bind_param(uuid.UUID(SONG_ID), postgresql.dialect()) == SONG_ID
+    assert guid.process_bind_param(None, sqlite.dialect()) is None
+    assert guid.process_result_value(uuid.UUID(SONG_ID).bytes, sqlite.dialect()) == SONG_ID
+    assert guid.process_result_value(uuid.UUID(SONG_ID), postgresql.dialect()) == SONG_ID
+    with pytest.raises(InvalidIdentifier):
+        guid.process_bind_param("not-a-uuid", sqlite.dialect())
+    assert is_uuid(SONG_ID) and not is_uuid("not-a-uuid")
+
+
+def test_malformed_ids_are_not_found(api):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 1)
+
+    for path in ("/api/songs/not-a-uuid/", "/api/playlists/not-a-uuid/", f"/api/songs/{uuid.uuid4()}/"):
+        assert api.client.get(path, headers=headers).status_code == 404
+    assert api.client.delete("/api/songs/12345/", headers=headers).status_code == 404
+
+
+@pytest.mark.parametrize("function, dialect, sql", [
+    (new_uuid(), sqlite.dialect(), "randomblob(16)"),
+    (new_uuid(), postgresql.dialect(), "gen_random_uuid()"),
+    (nil_uuid(), sqlite.dialect(), "zeroblob(16)"),
+    (nil_uuid(), postgresql.dialect(), "'00000000-0000-0000-0000-000000000000'::uuid"),
+])
+def test_database_side_uuids_compile_per_dialect(function, dialect, sql):
+    assert str(function.compile(dialect=dialect)) == sql
+
+
+def test_database_side_uuids_refuse_other_dialects():
+    with pytest.raises(CompileError):
+        new_uuid().compile(dialect=mysql.dialect())
@@ -0,0 +1,111 @@
+"""
+Invalidation bus: two buses on one backend stand in for two worker
+processes. Runs on the in-memory backend always, and on Redis pub/sub
+through fakeredis when it is installed.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.autocomplete_service import AutocompleteService, LibraryIndex
+from app.services.invalidation_bus import (
+    InvalidationBus, MemoryBusBackend, RedisBusBackend, PlaylistChanged, SongDeleted, SongSaved, UserUpdated
+)
+
+
+@pytest.fixture(params=["memory", "fakeredis"])
+def workers(request):
+    if request.param == "memory":
+        backend = MemoryBusBackend()
+        first, second = InvalidationBus(backend), InvalidationBus(backend)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        first = InvalidationBus(RedisBusBackend(client=fakeredis.FakeRedis(server=server, decode_responses=True)))
+        second = InvalidationBus(RedisBusBackend(client=fakeredis.FakeRedis(server=server, decode_responses=True)))
+    first.start()
+    second.start()
+    time.sleep(0.1)  # Let the listeners subscribe
+    yield first, second
+    first.stop()
+    second.stop()
+
+
+class Recorder:
+    def __init__(self):
+        self.received = []
+        self.arrived = threading.Event()
+
+    def __call__(self, event, remote):
+        self.received.append((event, remote))
+        self.arrived.set()
+
+
+def test_events_reach_the_publisher_at_once_and_other_workers_remotely(workers):
+    first, second = workers
+    local, remote = Recorder(), Recorder()
+    first.subscribe(PlaylistChanged, local)
+    second.subscribe(PlaylistChanged, remote)
+
+    event = PlaylistChanged(playlist_id="p1", owner_id="u1")
+    first.publish(event)
+
+    assert local.received == [(event, False)]
+    assert remote.arrived.wait(2)
+    assert remote.received == [(event, True)]
+
+
+def test_subscribers_only_see_their_event_type(workers):
+    first, second = workers
+    recorder = Recorder()
+    second.subscribe(SongDeleted, recorder)
+
+    first.publish(UserUpdated(user_id="u1"), SongDeleted(song_id="s1", owner_id="u1"))
+
+    assert recorder.arrived.wait(2)
+    time.sleep(0.1)
+    assert recorder.received == [(SongDeleted(song_id="s1", owner_id="u1"), True)]
+
+
+def test_failing_subscriber_does_not_stop_the_others():
+    bus = InvalidationBus(MemoryBusBackend())
+    recorder = Recorder()
+
+    def broken(event, remote):
+        raise RuntimeError("boom")
+
+    bus.subscribe(UserUpdated, broken)
+    bus.subscribe(UserUpdated, recorder)
+    bus.publish(UserUpdated(user_id="u1"))
+
+    assert recorder.received == [(UserUpdated(user_id="u1"), False)]
+
+
+def test_malformed_messages_are_ignored():
+    bus = InvalidationBus(MemoryBusBackend())
+    recorder = Recorder()
+    bus.subscribe(UserUpdated, recorder)
+
+    for message in ["not json", '{"type": "Unknown", "origin": "x", "event": {}}', '{"type": "UserUpdated", "origin": "x", "event": {}}']:
+        bus._receive(message)
+
+    assert recorder.received == []
+
+
+def test_other_workers_update_their_autocomplete_indexes(workers):
+    first, second = workers
+    autocomplete = AutocompleteService()
+    autocomplete._indexes["u1"] = LibraryIndex.build([("s1", "Night Drive", "Band", None)])
+    second.subscribe(SongSaved, autocomplete.song_saved)
+    second.subscribe(SongDeleted, autocomplete.song_deleted)
+    done = Recorder()
+    second.subscribe(SongDeleted, done)
+
+    first.publish(
+        SongSaved(song_id="s2", owner_id="u1", title="Nightfall", artist="Band"),
+        SongDeleted(song_id="s1", owner_id="u1"),
+    )
+
+    assert done.arrived.wait(2)
+    assert [suggestion["value"] for suggestion in autocomplete._indexes["u1"].suggest("night", 10)] == ["Nightfall"]
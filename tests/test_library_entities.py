@@ -0,0 +1,89 @@
+"""
+Normalized artists and albums: songs link to per-user Artist and Album rows
+whose counters follow uploads, edits and deletes, and the artist page reads
+them without grouping the library.
+"""
+from app.models.artist import Artist, Album
+from app.models.song import Song
+
+
+def artists(api, owner_id):
+    """name -> (song_count, album_count, total_duration)"""
+    db = api.session()
+    try:
+        return {artist.name: (artist.song_count, artist.album_count, artist.total_duration)
+                for artist in db.query(Artist).filter(Artist.owner_id == owner_id)}
+    finally:
+        db.close()
+
+
+def albums(api, owner_id):
+    """name -> (song_count, total_duration)"""
+    db = api.session()
+    try:
+        return {album.name: (album.song_count, album.total_duration)
+                for album in db.query(Album).filter(Album.owner_id == owner_id)}
+    finally:
+        db.close()
+
+
+def test_names_differing_in_case_and_spacing_share_an_entity(api):
+    user_id, _ = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    api.create_songs(user_id, 1, artist="The Beatles", album="Abbey Road", duration=100.0)
+    api.create_songs(user_id, 1, artist="the  beatles", album="ABBEY ROAD", duration=50.0)
+    api.create_songs(user_id, 1, artist="The Beatles", album="Help!", duration=25.0)
+    api.create_songs(other_id, 1, artist="The Beatles", album="Abbey Road")
+
+    assert artists(api, user_id) == {"The Beatles": (3, 2, 175.0)}
+    assert albums(api, user_id) == {"Abbey Road": (2, 150.0), "Help!": (1, 25.0)}
+    assert artists(api, other_id) == {"The Beatles": (1, 1, 100.0)}
+
+
+def test_edits_move_songs_between_entities(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1, artist="Old", album="First", duration=60.0)
+    api.create_songs(user_id, 1, artist="Old", album="Second", duration=40.0)
+
+    response = api.client.put(f"/api/songs/{song_id}/", json={"artist": "New", "album": "Debut"}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert artists(api, user_id) == {"Old": (1, 1, 40.0), "New": (1, 1, 60.0)}
+    assert albums(api, user_id) == {"First": (0, 0.0), "Second": (1, 40.0), "Debut": (1, 60.0)}
+    db = api.session()
+    try:
+        song = db.get(Song, song_id)
+        assert (song.artist_entity.name, song.album_entity.name) == ("New", "Debut")
+    finally:
+        db.close()
+
+
+def test_emptied_entities_are_hidden_and_reused(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1, artist="Solo", album="Only", duration=30.0)
+
+    assert api.client.delete(f"/api/songs/{song_id}/", headers=headers).status_code == 200
+    assert artists(api, user_id) == {"Solo": (0, 0, 0.0)}
+    assert api.client.get("/api/songs/browse/artists/", headers=headers).json()["items"] == []
+
+    api.create_songs(user_id, 1, artist="solo", album="only", duration=10.0)
+    assert artists(api, user_id) == {"Solo": (1, 1, 10.0)}
+
+
+def test_artist_page_lists_albums_and_songs(api):
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    _, admin_headers = api.create_user("root", role="admin")
+    api.create_songs(user_id, 4)
+    artist_id = next(item["id"] for item in api.client.get("/api/songs/browse/artists/", headers=headers).json()["items"]
+                     if item["name"] == "Artist 0")
+
+    response = api.client.get(f"/api/songs/browse/artists/{artist_id}/", headers=headers)
+
+    assert response.status_code == 200, response.text
+    page = response.json()
+    assert (page["name"], page["song_count"], page["album_count"], page["total_duration"]) == ("Artist 0", 2, 2, 203.0)
+    assert [album["name"] for album in page["albums"]] == ["Album 0", "Album 1"]
+    assert sorted(song["title"] for song in page["songs"]) == ["Song 0", "Song 3"]
+    assert api.client.get(f"/api/songs/browse/artists/{artist_id}/", headers=other_headers).status_code == 404
+    assert api.client.get(f"/api/songs/browse/artists/{artist_id}/", headers=admin_headers).status_code == 200
@@ -0,0 +1,96 @@
+"""
+Liked songs: timestamped likes, keyset pages newest first, checking which
+songs are liked without loading the collection, and batch like/unlike.
+"""
+import datetime
+
+from sqlalchemy import update
+
+from app.models.song import liked_songs_table
+from app.utils.pagination import encode_cursor
+
+
+def like(api, headers, *song_ids):
+    return api.client.post("/api/songs/liked/batch/", json={"song_ids": list(song_ids)}, headers=headers)
+
+
+def set_liked_at(api, song_id, liked_at):
+    db = api.session()
+    try:
+        db.execute(update(liked_songs_table).where(liked_songs_table.c.song_id == song_id).values(liked_at=liked_at))
+        db.commit()
+    finally:
+        db.close()
+
+
+def page(api, headers, **params):
+    response = api.client.get("/api/songs/liked/page/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_pages_run_newest_like_first_without_gaps(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 5)
+    like(api, headers, *songs)
+    base = datetime.datetime(2024, 3, 1, 12, 0)
+    for index, song_id in enumerate(songs[:3]):
+        set_liked_at(api, song_id, base + datetime.timedelta(minutes=index))
+    # The last two share a timestamp; the song id breaks the tie
+    tied = sorted(songs[3:], reverse=True)
+    expected = tied + [songs[2], songs[1], songs[0]]
+    for song_id in tied:
+        set_liked_at(api, song_id, base + datetime.timedelta(hours=1))
+
+    seen, cursor = [], None
+    while True:
+        result = page(api, headers, limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [item["id"] for item in result["items"]]
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+    first = page(api, headers, limit=1)["items"][0]
+    assert datetime.datetime.fromisoformat(first["liked_at"]) == base + datetime.timedelta(hours=1)
+    assert [song["id"] for song in api.client.get("/api/songs/liked/", headers=headers).json()] == expected
+
+
+def test_invalid_cursors_are_rejected(api):
+    _, headers = api.create_user("alice")
+
+    for cursor in ("not-base64!", encode_cursor(["2024-03-01T12:00:00"]),
+                   encode_cursor(["yesterday", "0b7a2e1c-4f5d-4c3b-9a8e-7d6c5b4a3f21"]),
+                   encode_cursor(["2024-03-01T12:00:00", "not-a-uuid"])):
+        response = api.client.get("/api/songs/liked/page/", params={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400, cursor
+
+
+def test_check_returns_the_liked_subset_in_request_order(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c = api.create_songs(user_id, 3)
+    like(api, headers, c, a)
+
+    response = api.client.get("/api/songs/liked/check/", params={"song_ids": [a, b, c, a, "not-a-uuid"]}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.json() == {"liked": [a, c]}
+    assert api.client.get("/api/songs/liked/check/", headers=headers).status_code == 422
+
+
+def test_batch_likes_skip_duplicates_and_reject_inaccessible_songs(api):
+    user_id, headers = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    a, b = api.create_songs(user_id, 2)
+    theirs, = api.create_songs(other_id, 1)
+    assert api.client.post(f"/api/songs/{a}/like/", headers=headers).json()["message"] == "Song liked successfully"
+    assert api.client.post(f"/api/songs/{a}/like/", headers=headers).json()["message"] == "Song already liked"
+
+    result = like(api, headers, a, b, b, theirs, "not-a-uuid").json()
+
+    assert (result["liked"], result["already_liked"], result["rejected"]) == (1, 1, [theirs, "not-a-uuid"])
+    removed = api.client.post("/api/songs/liked/batch-remove/", json={"song_ids": [a, theirs, "not-a-uuid"]}, headers=headers)
+    assert removed.json()["unliked"] == 1
+    assert [item["id"] for item in page(api, headers)["items"]] == [b]
+    assert api.client.post(f"/api/songs/{b}/unlike/", headers=headers).json()["message"] == "Song unliked successfully"
+    assert page(api, headers) == {"items": [], "next_cursor": None}
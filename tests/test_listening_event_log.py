@@ -0,0 +1,191 @@
+"""
+Listening event log: sessions started and completed through the API are
+appended locally, made durable by group commit and loaded into
+listening_sessions and the daily rollups one segment per transaction.
+"""
+import asyncio
+import shutil
+
+import pytest
+
+import app.api.songs as songs_api
+from app.config import settings
+from app.models.song import ListeningSession, ListeningDailyRollup, ListeningEventSegment, NO_PLAYLIST
+from app.services import listening_event_log as event_log_module
+from app.services.listening_event_log import ListeningEventLog
+from app.services.play_count_buffer import play_count_buffer
+
+
+@pytest.fixture
+def event_log(api, tmp_path, monkeypatch):
+    log = ListeningEventLog(str(tmp_path / "events"))
+    monkeypatch.setattr(settings, "listening_event_log_enabled", True)
+    monkeypatch.setattr(songs_api, "listening_event_log", log)
+    return log
+
+
+def seal_and_load(log):
+    """Seal the open segment and load everything sealed, as shutdown does"""
+    asyncio.run(log.stop())
+
+
+def listen(api, headers, song_id, seconds):
+    session_id = api.client.post(f"/api/songs/{song_id}/listen/", headers=headers).json()["session_id"]
+    response = api.client.put(f"/api/songs/{song_id}/listen/{session_id}/",
+                              json={"duration_seconds": seconds}, headers=headers)
+    assert response.status_code == 200, response.text
+    return session_id
+
+
+def stored(api, model):
+    db = api.session()
+    try:
+        return db.query(model).all()
+    finally:
+        db.close()
+
+
+def test_sessions_reach_the_database_when_their_segment_is_loaded(api, event_log):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+
+    session_id = listen(api, headers, song_id, 42.5)
+    assert stored(api, ListeningSession) == []
+    seal_and_load(event_log)
+
+    session, = stored(api, ListeningSession)
+    assert (session.id, session.duration_seconds) == (session_id, 42.5)
+    rollup, = stored(api, ListeningDailyRollup)
+    assert (rollup.total_seconds, rollup.session_count) == (42.5, 1)
+    assert play_count_buffer.pending(song_id) == 1
+    assert event_log.sealed_segments() == []
+
+
+def test_one_fsync_covers_every_append_since_the_last(event_log, monkeypatch):
+    fsyncs = []
+    real_fsync = event_log_module.os.fsync
+    monkeypatch.setattr(event_log_module.os, "fsync", lambda fd: fsyncs.append(fd) or real_fsync(fd))
+
+    for i in range(50):
+        event_log.append({"type": "marker", "n": i})
+    event_log.sync()
+    event_log.sync()  # Nothing new to make durable
+
+    assert len(fsyncs) == 1
+    assert len(event_log._path.read_text().splitlines()) == 50
+
+
+def test_replaying_a_loaded_segment_changes_nothing(api, event_log, tmp_path):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    listen(api, headers, song_id, 30)
+    with event_log._lock:
+        event_log._seal_locked()
+    segment, = event_log.sealed_segments()
+    copy = shutil.copy(segment, tmp_path / "copy")
+
+    assert event_log.load_sealed() == 2
+    shutil.copy(copy, segment)  # As if the process died before deleting the loaded file
+    assert event_log.load_sealed() == 0
+
+    assert len(stored(api, ListeningSession)) == 1
+    rollup, = stored(api, ListeningDailyRollup)
+    assert (rollup.total_seconds, rollup.session_count) == (30, 1)
+    assert [entry.name for entry in stored(api, ListeningEventSegment)] == [segment.name]
+    assert not segment.exists()
+
+
+def test_completions_only_count_plays_of_real_sessions(api, event_log):
+    owner_id, owner_headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    song_id, = api.create_songs(owner_id, 1)
+
+    # Another user's song is not found, and a made-up session is never matched
+    response = api.client.put(f"/api/songs/{song_id}/listen/{song_id}/",
+                              json={"duration_seconds": 10}, headers=other_headers)
+    assert response.status_code == 404
+    api.client.put(f"/api/songs/{song_id}/listen/{song_id}/", json={"duration_seconds": 10}, headers=owner_headers)
+    assert play_count_buffer.pending(song_id) == 0
+
+    seal_and_load(event_log)
+    assert play_count_buffer.pending(song_id) == 0
+    assert stored(api, ListeningSession) == []
+
+
+def test_sessions_of_deleted_songs_and_playlists_still_load(api, event_log):
+    user_id, headers = api.create_user("alice")
+    deleted_song, kept_song = api.create_songs(user_id, 2)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+    for song_id in (deleted_song, kept_song):
+        session_id = api.client.post(f"/api/songs/{song_id}/listen/?playlist_id={playlist_id}", headers=headers).json()["session_id"]
+        api.client.put(f"/api/songs/{song_id}/listen/{session_id}/", json={"duration_seconds": 20}, headers=headers)
+
+    assert api.client.delete(f"/api/songs/{deleted_song}/", headers=headers).status_code == 200
+    assert api.client.delete(f"/api/playlists/{playlist_id}/", headers=headers).status_code == 200
+    seal_and_load(event_log)
+
+    session, = stored(api, ListeningSession)
+    assert (session.song_id, session.playlist_id, session.duration_seconds) == (kept_song, None, 20)
+    rollup, = stored(api, ListeningDailyRollup)
+    assert (rollup.song_id, rollup.playlist_id, rollup.session_count) == (kept_song, NO_PLAYLIST, 1)
+    assert event_log.sealed_segments() == []
+
+
+def test_a_segment_that_keeps_failing_is_quarantined(api, event_log, monkeypatch):
+    monkeypatch.setattr(settings, "listening_event_log_max_load_failures", 2)
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    event_log.append({"type": "start", "id": song_id, "user_id": user_id, "song_id": song_id})  # No started_at
+    with event_log._lock:
+        event_log._seal_locked()
+    broken, = event_log.sealed_segments()
+    listen(api, headers, song_id, 15)
+    with event_log._lock:
+        event_log._seal_locked()
+
+    assert event_log.load_sealed() == 0  # Stops at the broken segment, keeping order
+    assert len(event_log.sealed_segments()) == 2
+    assert event_log.load_sealed() == 2
+
+    assert event_log.sealed_segments() == []
+    assert (event_log.directory / "quarantine" / broken.name).exists()
+    ledger = {entry.name: (entry.status, entry.error) for entry in stored(api, ListeningEventSegment)}
+    assert ledger[broken.name][0] == "quarantined"
+    assert "started_at" in ledger[broken.name][1]
+    assert [session.duration_seconds for session in stored(api, ListeningSession)] == [15]
+
+
+def test_completions_are_carried_once_even_when_a_load_is_retried(api, event_log, monkeypatch):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    # A completion whose start sits in a segment that has not been loaded yet
+    event_log.append({"type": "complete", "id": song_id, "user_id": user_id, "song_id": song_id,
+                      "duration_seconds": 10, "ended_at": "2026-01-01T00:00:00"})
+    with event_log._lock:
+        event_log._seal_locked()
+
+    session_factory = event_log_module.SessionLocal
+    commits = []
+
+    def failing_commit_once():
+        db = session_factory()
+        commit = db.commit
+
+        def fail_once():
+            commits.append(db)
+            if len(commits) == 1:
+                raise RuntimeError("database went away at commit")
+            commit()
+
+        db.commit = fail_once
+        return db
+
+    monkeypatch.setattr(event_log_module, "SessionLocal", failing_commit_once)
+    assert event_log.load_sealed() == 0
+    assert len(event_log.sealed_segments()) == 1
+    assert event_log._path is None  # Nothing carried while the segment is still unloaded
+
+    assert event_log.load_sealed() == 0
+    assert event_log.sealed_segments() == []
+    carried, = event_log._path.read_text().splitlines()
+    assert '"attempts":1' in carried
@@ -0,0 +1,121 @@
+"""
+Batched listening-event ingestion (POST /api/songs/listen-events/): one
+request records many finished plays, their rollups and their play counts.
+"""
+import datetime
+import uuid
+
+from app.config import settings
+from app.models.song import ListeningSession, ListeningDailyRollup
+from app.services.listening_retention_service import ListeningRetentionService
+from app.services.play_count_buffer import play_count_buffer
+
+# Plays must fall inside the retention window, so tests use recent days
+DAY = datetime.date.today() - datetime.timedelta(days=10)
+NEXT_DAY = DAY + datetime.timedelta(days=1)
+
+
+def ingest(api, headers, *events):
+    return api.client.post("/api/songs/listen-events/", json={"events": list(events)}, headers=headers)
+
+
+def event(song_id, started_at=f"{DAY}T12:00:00", seconds=60.0, **extra):
+    return {"song_id": song_id, "started_at": started_at, "duration_seconds": seconds, **extra}
+
+
+def sessions(api):
+    db = api.session()
+    try:
+        return db.query(ListeningSession).order_by(ListeningSession.started_at).all()
+    finally:
+        db.close()
+
+
+def test_a_batch_records_sessions_rollups_and_play_counts(api):
+    user_id, headers = api.create_user("alice")
+    a, b = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(headers, [a, b])
+
+    response = ingest(api, headers,
+                      event(a, playlist_id=playlist_id),
+                      event(a, f"{DAY}T13:00:00", 30.0, playlist_id=playlist_id),
+                      event(b, f"{NEXT_DAY}T08:00:00", 45.5))
+
+    assert response.status_code == 200
+    assert response.json() | {"message": None} == {"message": None, "accepted": 3, "rejected": []}
+    assert [(s.song_id, s.playlist_id, s.duration_seconds) for s in sessions(api)] == [
+        (a, playlist_id, 60.0), (a, playlist_id, 30.0), (b, None, 45.5)
+    ]
+    first = sessions(api)[0]
+    assert first.ended_at - first.started_at == datetime.timedelta(seconds=60)
+    db = api.session()
+    try:
+        assert sorted((row.song_id == a, row.total_seconds, row.session_count)
+                      for row in db.query(ListeningDailyRollup)) == [(False, 45.5, 1), (True, 90.0, 2)]
+    finally:
+        db.close()
+    assert (play_count_buffer.pending(a), play_count_buffer.pending(b)) == (2, 1)
+
+
+def test_inaccessible_songs_are_rejected_and_foreign_playlists_dropped(api):
+    user_id, headers = api.create_user("alice")
+    other_id, other_headers = api.create_user("bob")
+    mine, = api.create_songs(user_id, 1)
+    theirs, = api.create_songs(other_id, 1)
+    their_playlist = api.create_playlist(other_headers, [theirs])
+    unknown = str(uuid.uuid4())
+
+    response = ingest(api, headers, event(mine, playlist_id=their_playlist), event(theirs), event(unknown), event("not-a-uuid"))
+
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 1
+    assert response.json()["rejected"] == [theirs, unknown, "not-a-uuid"]
+    session, = sessions(api)
+    assert (session.song_id, session.playlist_id) == (mine, None)
+
+
+def test_timestamps_are_stored_as_naive_utc(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+
+    ingest(api, headers, event(song_id, f"{DAY}T12:00:00+02:00"))
+
+    assert sessions(api)[0].started_at == datetime.datetime.combine(DAY, datetime.time(10, 0))
+
+
+def test_malformed_batches_are_refused(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+
+    assert ingest(api, headers).status_code == 422
+    assert ingest(api, headers, *[event(song_id)] * 501).status_code == 422
+    assert ingest(api, headers, event(song_id, seconds=-1)).status_code == 422
+    assert sessions(api) == []
+
+
+def test_plays_outside_the_retention_window_or_in_the_future_are_refused(api, monkeypatch):
+    monkeypatch.setattr(settings, "listening_event_max_skew_seconds", 300)
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    now = datetime.datetime.utcnow()
+    cutoff = datetime.datetime.combine(ListeningRetentionService.retention_cutoff(), datetime.time.min)
+
+    future = ingest(api, headers, event(song_id), event(song_id, (now + datetime.timedelta(hours=1)).isoformat()))
+    archived = ingest(api, headers, event(song_id), event(song_id, (cutoff - datetime.timedelta(seconds=1)).isoformat()))
+
+    assert (future.status_code, archived.status_code) == (400, 400)
+    assert sessions(api) == []
+    assert play_count_buffer.pending(song_id) == 0
+
+
+def test_small_clock_skew_and_the_cutoff_itself_are_accepted(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    now = datetime.datetime.utcnow()
+    cutoff = datetime.datetime.combine(ListeningRetentionService.retention_cutoff(), datetime.time.min)
+
+    response = ingest(api, headers, event(song_id, (now + datetime.timedelta(seconds=30)).isoformat()),
+                      event(song_id, cutoff.isoformat()))
+
+    assert response.status_code == 200, response.text
+    assert len(sessions(api)) == 2
@@ -0,0 +1,177 @@
+"""
+Listening history retention on the portable path (SQLite): sessions older
+than the retention window are moved to monthly archives, month by month.
+Partition maintenance is PostgreSQL-only, so its statements are checked
+against a scripted session, and startup must survive it failing.
+"""
+import asyncio
+import datetime
+import gzip
+import json
+import uuid
+
+import pytest
+
+from app import main
+
+from app.config import settings
+from app.models.song import ListeningSession
+from app.services.listening_retention_service import DEFAULT_PARTITION, ListeningRetentionService, add_months, month_start
+
+TODAY = datetime.date(2024, 6, 15)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "listening_retention_months", 3)
+    monkeypatch.setattr(settings, "listening_archive_dir", str(tmp_path / "archive"))
+    return tmp_path / "archive"
+
+
+def add_sessions(api, user_id, song_id, *days):
+    db = api.session()
+    try:
+        ids = []
+        for day in days:
+            started_at = datetime.datetime.combine(day, datetime.time(12))
+            session = ListeningSession(id=str(uuid.uuid4()), user_id=user_id, song_id=song_id,
+                                       duration_seconds=30.0, started_at=started_at, ended_at=started_at)
+            db.add(session)
+            ids.append(session.id)
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def run_retention(api):
+    db = api.session()
+    try:
+        return ListeningRetentionService.run_retention(db, today=TODAY, fmt="ndjson")
+    finally:
+        db.close()
+
+
+def archived_ids(path):
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return {json.loads(line)["id"] for line in archive}
+
+
+def remaining_ids(api):
+    db = api.session()
+    try:
+        return {session.id for session in db.query(ListeningSession).all()}
+    finally:
+        db.close()
+
+
+def test_old_months_are_archived_and_deleted(api, archive_dir):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    assert ListeningRetentionService.retention_cutoff(TODAY) == datetime.date(2024, 3, 1)
+    january = add_sessions(api, user_id, song_id, datetime.date(2024, 1, 3), datetime.date(2024, 1, 31))
+    february = add_sessions(api, user_id, song_id, datetime.date(2024, 2, 29))
+    kept = add_sessions(api, user_id, song_id, datetime.date(2024, 3, 1), datetime.date(2024, 6, 14))
+
+    archived = run_retention(api)
+
+    assert [(entry["month"], entry["rows"]) for entry in archived] == [("2024-01-01", 2), ("2024-02-01", 1)]
+    assert archived_ids(archive_dir / "listening_sessions_2024_01.ndjson.gz") == set(january)
+    assert archived_ids(archive_dir / "listening_sessions_2024_02.ndjson.gz") == set(february)
+    assert remaining_ids(api) == set(kept)
+    assert run_retention(api) == []
+
+
+def test_late_sessions_get_their_own_archive(api, archive_dir):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    first = add_sessions(api, user_id, song_id, datetime.date(2024, 1, 10))
+    run_retention(api)
+    late = add_sessions(api, user_id, song_id, datetime.date(2024, 1, 20))  # Reported after January was archived
+
+    archived = run_retention(api)
+
+    assert [entry["rows"] for entry in archived] == [1]
+    assert archived_ids(archive_dir / "listening_sessions_2024_01.ndjson.gz") == set(first)
+    assert archived_ids(archive_dir / "listening_sessions_2024_01_2.ndjson.gz") == set(late)
+    assert remaining_ids(api) == set()
+    assert not list(archive_dir.glob("*.tmp"))
+
+
+def test_months_are_walked_from_the_oldest_session(api, archive_dir):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    add_sessions(api, user_id, song_id, datetime.date(2023, 10, 5), datetime.date(2024, 2, 5))
+
+    archived = run_retention(api)
+
+    assert [entry["month"] for entry in archived] == ["2023-10-01", "2024-02-01"]
+    assert sorted(path.name for path in archive_dir.iterdir()) == [
+        "listening_sessions_2023_10.ndjson.gz", "listening_sessions_2024_02.ndjson.gz"
+    ]
+    assert add_months(datetime.date(2023, 12, 1), 1) == datetime.date(2024, 1, 1)
+
+
+class PartitionedSession:
+    """Answers ensure_partitions' catalog queries; `stranded` months have rows in the default partition"""
+
+    def __init__(self, stranded):
+        self.stranded = stranded
+        self.statements = []
+
+    def get_bind(self):
+        return self
+
+    class dialect:
+        name = "postgresql"
+
+    def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append(sql)
+        answer = None
+        if sql.startswith("SELECT 1 FROM pg_partitioned_table"):
+            answer = 1
+        elif sql.startswith("SELECT to_regclass"):
+            answer = DEFAULT_PARTITION if params["name"] == DEFAULT_PARTITION else None
+        elif sql.startswith(f"SELECT 1 FROM {DEFAULT_PARTITION}"):
+            answer = 1 if params["start"].date() in self.stranded else None
+        return type("Result", (), {"scalar": lambda _: answer, "first": lambda _: answer, "rowcount": 2})()
+
+
+def test_new_partitions_take_over_rows_stranded_in_the_default_partition():
+    stranded = add_months(month_start(datetime.date.today()), 1)
+    name = ListeningRetentionService.partition_name(stranded)
+    db = PartitionedSession({stranded})
+
+    created = ListeningRetentionService.ensure_partitions(db, months_ahead=2)
+
+    assert len(created) == 3 and name in created
+    ddl = [sql for sql in db.statements if not sql.startswith("SELECT")]
+    moving = ddl.index(f"ALTER TABLE listening_sessions DETACH PARTITION {DEFAULT_PARTITION}")
+    assert ddl[moving + 1].startswith(f'CREATE TABLE "{name}" PARTITION OF listening_sessions')
+    assert ddl[moving + 2].startswith(f"WITH moved AS ( DELETE FROM {DEFAULT_PARTITION}")
+    assert ddl[moving + 2].endswith(f'INSERT INTO "{name}" (id, user_id, song_id, playlist_id, duration_seconds, '
+                                    f"started_at, ended_at) SELECT id, user_id, song_id, playlist_id, "
+                                    f"duration_seconds, started_at, ended_at FROM moved")
+    assert ddl[moving + 3] == f"ALTER TABLE listening_sessions ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+    assert sum("DETACH" in sql for sql in ddl) == 1  # Months without stranded rows are created directly
+
+
+def test_startup_starts_background_services_when_partition_maintenance_fails(monkeypatch):
+    started = []
+
+    def fail(db):
+        raise RuntimeError("updated partition constraint for default partition would be violated")
+
+    monkeypatch.delenv("RAILWAY_ENVIRONMENT", raising=False)
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(main.Base.metadata, "create_all", lambda bind: None)
+    monkeypatch.setattr(ListeningRetentionService, "ensure_partitions", staticmethod(fail))
+    monkeypatch.setattr(main.settings, "listening_event_log_enabled", True)
+    for service in (main.invalidation_bus, main.play_count_buffer, main.listening_event_log):
+        monkeypatch.setattr(service, "start", lambda service=service: started.append(service))
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: pytest.fail("startup retried"))
+
+    asyncio.run(main.startup_event())
+
+    assert started == [main.invalidation_bus, main.play_count_buffer, main.listening_event_log]
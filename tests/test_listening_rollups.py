@@ -0,0 +1,150 @@
+"""
+Daily listening rollups: the batched upsert, incremental updates agreeing
+with a rebuild from raw sessions, and compaction reaching cached stats.
+"""
+import datetime
+
+from app.models.song import ListeningSession, ListeningDailyRollup
+from app.services.listening_service import ListeningService
+
+
+def rollups(api):
+    db = api.session()
+    try:
+        return {
+            (row.user_id, row.playlist_id, row.song_id, row.day): (row.total_seconds, row.session_count)
+            for row in db.query(ListeningDailyRollup).all()
+        }
+    finally:
+        db.close()
+
+
+def compact(api, headers):
+    response = api.client.post("/api/admin/listening-rollups/compact/?days=2", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_upserts_add_to_existing_rows(api):
+    user_id, _ = api.create_user("alice")
+    song_id, other_song = api.create_songs(user_id, 2)
+    started_at = datetime.datetime(2024, 5, 1, 12)
+    key = ListeningService.rollup_key(user_id, song_id, None, started_at)
+    other = ListeningService.rollup_key(user_id, other_song, None, started_at)
+
+    db = api.session()
+    try:
+        ListeningService.record_many(db, {key: (30.0, 1), other: (5.0, 1)})
+        ListeningService.record_many(db, {key: (12.5, 1)})
+        ListeningService.record(db, user_id, song_id, None, started_at + datetime.timedelta(hours=3), 7.5, sessions=0)
+        db.commit()
+    finally:
+        db.close()
+
+    assert rollups(api) == {key: (50.0, 2), other: (5.0, 1)}
+
+
+def test_incremental_rollups_match_a_rebuild(api):
+    user_id, headers = api.create_user("alice")
+    admin_id, admin_headers = api.create_user("root", role="admin")
+    songs = api.create_songs(user_id, 3)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+
+    def start(song_id):
+        return api.client.post(f"/api/songs/{song_id}/listen/?playlist_id={playlist_id}", headers=headers).json()["session_id"]
+
+    def complete(song_id, session_id, seconds):
+        response = api.client.put(f"/api/songs/{song_id}/listen/{session_id}/", json={"duration_seconds": seconds}, headers=headers)
+        assert response.status_code == 200, response.text
+
+    complete(songs[0], start(songs[0]), 30)
+    session_id = start(songs[0])
+    complete(songs[0], session_id, 10)
+    complete(songs[0], session_id, 45)  # Completed again: one session, the latest duration
+    session_id = start(songs[1])
+    complete(songs[1], session_id, 0)  # No listening time: not a session
+    complete(songs[1], session_id, 0)
+    start(songs[2])  # Never completed
+    now = datetime.datetime.utcnow().isoformat()
+    api.client.post("/api/songs/listen-events/", json={"events": [
+        {"song_id": songs[2], "started_at": now, "duration_seconds": 0},
+        {"song_id": songs[2], "started_at": now, "duration_seconds": 20},
+    ]}, headers=headers)
+    assert api.client.put(f"/api/songs/{songs[2]}/listen/{session_id}/", json={"duration_seconds": -5}, headers=headers).status_code == 422
+
+    incremental = rollups(api)
+    compact(api, admin_headers)
+
+    assert rollups(api) == incremental
+    assert sorted(incremental.values()) == [(20.0, 1), (75.0, 2)]
+
+
+def test_compaction_drops_cached_stats(api):
+    user_id, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    song_id, = api.create_songs(user_id, 1)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+    api.client.post(f"/api/playlists/{playlist_id}/songs/", json={"song_id": song_id}, headers=headers)
+    session_id = api.client.post(f"/api/songs/{song_id}/listen/?playlist_id={playlist_id}", headers=headers).json()["session_id"]
+    api.client.put(f"/api/songs/{song_id}/listen/{session_id}/", json={"duration_seconds": 60}, headers=headers)
+
+    def listening_seconds():
+        response = api.client.get(f"/api/playlists/{playlist_id}/listening-stats/", headers=headers)
+        return response.json()["total_listening_seconds"]
+
+    assert listening_seconds() == 60
+    # Drift the raw session behind the rollups' back, then repair the rollups
+    db = api.session()
+    try:
+        db.query(ListeningSession).update({ListeningSession.duration_seconds: 90.0})
+        db.commit()
+    finally:
+        db.close()
+    assert listening_seconds() == 60  # Cached
+
+    compact(api, admin_headers)
+
+    assert listening_seconds() == 90
+
+
+def test_compaction_excludes_incremental_writers(api, monkeypatch):
+    user_id, headers = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    song_id, = api.create_songs(user_id, 1)
+    locks = []
+    monkeypatch.setattr(ListeningService, "lock_rollups", staticmethod(lambda db, exclusive=False: locks.append(exclusive)))
+
+    api.client.post("/api/songs/listen-events/", json={"events": [
+        {"song_id": song_id, "started_at": datetime.datetime.utcnow().isoformat(), "duration_seconds": 30}
+    ]}, headers=headers)
+    compact(api, admin_headers)
+
+    assert locks == [False, True]
+
+
+def test_rollup_locks_are_advisory_locks_on_postgresql():
+    from sqlalchemy.dialects import postgresql
+
+    class FakeSession:
+        def __init__(self, dialect):
+            self.dialect, self.statements = dialect, []
+
+        def get_bind(self):
+            return self
+
+        def execute(self, statement):
+            self.statements.append(str(statement.compile(dialect=self.dialect)))
+
+    db = FakeSession(postgresql.dialect())
+    ListeningService.lock_rollups(db)
+    ListeningService.lock_rollups(db, exclusive=True)
+    assert [statement.split("(")[0] for statement in db.statements] == [
+        "SELECT pg_advisory_xact_lock_shared", "SELECT pg_advisory_xact_lock"
+    ]
+
+    class SQLiteDialect:
+        name = "sqlite"
+
+    db = FakeSession(SQLiteDialect())
+    ListeningService.lock_rollups(db, exclusive=True)
+    assert db.statements == []
@@ -0,0 +1,209 @@
+"""
+Write-behind play counts: plays are de-duplicated per user and song, and
+flushed as relative increments that also reach the playlist counters. A
+failed flush re-queues its plays. Runs on the in-memory backend always, and
+on the Redis backend through fakeredis when it is installed.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.config import settings
+from app.models.playlist import Playlist
+from app.models.song import Song
+from app.services.listening_service import ListeningService
+from app.services.play_count_buffer import (
+    MemoryCountBackend, PlayCountBuffer, RedisCountBackend, REDIS_FLUSHING_PREFIX, play_count_buffer
+)
+
+
+@pytest.fixture(params=["memory", "fakeredis"])
+def buffer(request, api):
+    if request.param == "memory":
+        return PlayCountBuffer(MemoryCountBackend())
+    fakeredis = pytest.importorskip("fakeredis")
+    return PlayCountBuffer(RedisCountBackend(client=fakeredis.FakeRedis(decode_responses=True)))
+
+
+def stored(api, model, id_):
+    db = api.session()
+    try:
+        return db.get(model, id_)
+    finally:
+        db.close()
+
+
+def test_repeat_plays_within_the_window_count_once(buffer, api):
+    user_id, _ = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    song_id, = api.create_songs(user_id, 1)
+
+    assert buffer.record_play(user_id, song_id) is True
+    assert buffer.record_play(user_id, song_id) is False
+    assert buffer.record_play(other_id, song_id) is True
+    assert buffer.record_play(user_id, "not-a-uuid") is False
+
+    assert buffer.pending(song_id) == 2
+
+
+def test_plays_outside_the_window_count_again(buffer, api, monkeypatch):
+    monkeypatch.setattr(settings, "play_count_dedupe_seconds", 0.001)
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+
+    buffer.record_play(user_id, song_id)
+    time.sleep(0.01)
+    buffer.record_play(user_id, song_id)
+
+    assert buffer.pending(song_id) == 2
+
+
+def test_a_flush_adds_the_plays_to_songs_and_playlists(buffer, api):
+    user_id, headers = api.create_user("alice")
+    song_id, other_song = api.create_songs(user_id, 2, play_count=10)
+    playlist_id = api.create_playlist(headers, [song_id, other_song])
+    buffer.add({song_id: 3, other_song: 1})
+
+    assert buffer.flush() == 4
+
+    assert stored(api, Song, song_id).play_count == 13
+    assert stored(api, Song, other_song).play_count == 11
+    assert stored(api, Playlist, playlist_id).total_play_count == 24
+    assert buffer.pending(song_id) == 0
+    assert buffer.flush() == 0
+
+
+def test_a_failed_flush_requeues_its_plays(buffer, api, monkeypatch):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    buffer.add({song_id: 2})
+
+    def fail(db, counts):
+        raise RuntimeError("database down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ListeningService, "apply_play_counts", staticmethod(fail))
+        assert buffer.flush() == 0
+    assert buffer.pending(song_id) == 2
+    buffer.add({song_id: 1})  # Plays recorded while the database was down
+
+    assert buffer.flush() == 3
+    assert stored(api, Song, song_id).play_count == 3
+
+
+def test_the_play_endpoint_reports_pending_plays(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1, play_count=5)
+
+    first = api.client.post(f"/api/songs/{song_id}/play/", headers=headers).json()
+    repeat = api.client.post(f"/api/songs/{song_id}/play/", headers=headers).json()
+
+    assert first == {"message": "Play count incremented", "play_count": 6}
+    assert repeat == {"message": "Repeat play ignored", "play_count": 6}
+    assert stored(api, Song, song_id).play_count == 5  # Not flushed yet
+
+
+def broken_redis():
+    """A Redis backend whose server is down; every call raises ConnectionError"""
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    server.connected = False
+    return RedisCountBackend(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+
+
+def test_plays_are_counted_in_memory_while_redis_is_down(api):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    buffer = PlayCountBuffer(broken_redis())
+
+    assert buffer.record_play(user_id, song_id) is True
+    assert buffer.record_play(user_id, song_id) is False
+    buffer.add({song_id: 2})
+    assert buffer.pending(song_id) == 3
+
+    assert buffer.flush() == 3
+    assert stored(api, Song, song_id).play_count == 3
+
+
+def test_the_play_endpoint_works_while_redis_is_down(api, monkeypatch):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    monkeypatch.setattr(play_count_buffer, "_backend", broken_redis())
+    monkeypatch.setattr(play_count_buffer, "_fallback", MemoryCountBackend())
+
+    response = api.client.post(f"/api/songs/{song_id}/play/", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["play_count"] == 1
+
+
+def test_the_flush_loop_survives_failed_flushes(monkeypatch):
+    monkeypatch.setattr(settings, "play_count_flush_seconds", 0.001)
+    buffer = PlayCountBuffer(MemoryCountBackend())
+    calls = []
+
+    def flush():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ConnectionError("redis went away")
+        return 0
+
+    monkeypatch.setattr(buffer, "flush", flush)
+
+    async def run():
+        buffer.start()
+        while len(calls) < 3:
+            await asyncio.sleep(0.001)
+        assert not buffer._task.done()
+        await buffer.stop()
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert len(calls) >= 3
+
+
+@pytest.fixture
+def redis_backend():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCountBackend(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def flushing_keys(backend):
+    return list(backend._client.scan_iter(match=f"{REDIS_FLUSHING_PREFIX}:*"))
+
+
+def test_redis_batches_are_kept_until_the_flush_commits(api, redis_backend, monkeypatch):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    buffer = PlayCountBuffer(redis_backend)
+    buffer.add({song_id: 2})
+    kept = []
+
+    def apply(db, counts):
+        kept.append(len(flushing_keys(redis_backend)))
+        raise RuntimeError("database down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ListeningService, "apply_play_counts", staticmethod(apply))
+        assert buffer.flush() == 0
+
+    assert kept == [1]  # Still in Redis while the transaction ran
+    assert flushing_keys(redis_backend) == []  # Released back to the pending hash
+    assert buffer.pending(song_id) == 2
+    assert buffer.flush() == 2
+    assert flushing_keys(redis_backend) == []
+    assert stored(api, Song, song_id).play_count == 2
+
+
+def test_batches_of_crashed_flushes_are_flushed_once_their_lease_expires(api, redis_backend):
+    user_id, _ = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1)
+    redis_backend.add({song_id: 3})
+    _, (key,) = redis_backend.drain()  # A worker drained, then died before committing
+
+    assert PlayCountBuffer(redis_backend).flush() == 0  # Its lease still holds
+
+    redis_backend._client.delete(redis_backend._lease(key))  # The lease expires
+    assert PlayCountBuffer(redis_backend).flush() == 3
+    assert PlayCountBuffer(redis_backend).flush() == 0
+    assert stored(api, Song, song_id).play_count == 3
@@ -0,0 +1,76 @@
+"""
+Adding and removing many playlist songs in one request.
+"""
+import uuid
+
+from app.models.playlist import PlaylistSong
+
+
+def entries(api, playlist_id):
+    db = api.session()
+    try:
+        return [row.song_id for row in db.query(PlaylistSong.song_id).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).order_by(PlaylistSong.position)]
+    finally:
+        db.close()
+
+
+def batch(api, headers, playlist_id, action, song_ids):
+    return api.client.post(f"/api/playlists/{playlist_id}/songs/{action}/", json={"song_ids": song_ids}, headers=headers)
+
+
+def test_songs_are_appended_in_order_skipping_duplicates(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c, d = api.create_songs(user_id, 4)
+    playlist_id = api.create_playlist(headers, [b])
+
+    response = batch(api, headers, playlist_id, "batch", [c, b, a, c, d])
+
+    assert response.status_code == 200
+    assert response.json() | {"message": None} == {"message": None, "added": 3, "skipped": 2}
+    assert entries(api, playlist_id) == [b, c, a, d]
+
+
+def test_one_inaccessible_song_rejects_the_whole_batch(api):
+    user_id, headers = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    mine, = api.create_songs(user_id, 1)
+    theirs, = api.create_songs(other_id, 1)
+    playlist_id = api.create_playlist(headers)
+
+    for song_ids in ([mine, theirs], [mine, "not-a-uuid"], [mine, str(uuid.uuid4())]):
+        assert batch(api, headers, playlist_id, "batch", song_ids).status_code == 404
+    assert entries(api, playlist_id) == []
+
+
+def test_admins_can_add_any_song(api):
+    user_id, _ = api.create_user("alice")
+    _, admin_headers = api.create_user("root", role="admin")
+    songs = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(admin_headers)
+
+    assert batch(api, admin_headers, playlist_id, "batch", songs).json()["added"] == 2
+
+
+def test_removing_ignores_songs_not_in_the_playlist(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c, outsider = api.create_songs(user_id, 4)
+    playlist_id = api.create_playlist(headers, [a, b, c])
+
+    response = batch(api, headers, playlist_id, "batch-remove", [a, c, outsider, "not-a-uuid"])
+
+    assert response.status_code == 200
+    assert response.json()["removed"] == 2
+    assert entries(api, playlist_id) == [b]
+
+
+def test_batches_need_the_playlist_owner(api):
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    songs = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(headers, songs)
+
+    assert batch(api, other_headers, playlist_id, "batch", songs).status_code == 404
+    assert batch(api, other_headers, playlist_id, "batch-remove", songs).status_code == 404
+    assert entries(api, playlist_id) == songs
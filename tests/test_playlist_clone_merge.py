@@ -0,0 +1,99 @@
+"""
+Server-side playlist clone and merge: songs are copied with INSERT ... SELECT,
+keeping order, and the counters of the resulting playlist are right.
+"""
+from app.models.playlist import Playlist, PlaylistSong
+from app.models.song import ListeningSession
+
+
+def entries(api, playlist_id):
+    db = api.session()
+    try:
+        return [row.song_id for row in db.query(PlaylistSong.song_id).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).order_by(PlaylistSong.position, PlaylistSong.id)]
+    finally:
+        db.close()
+
+
+def test_clone_copies_songs_order_and_counters(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 3, play_count=4)
+    playlist_id = api.create_playlist(headers, [songs[2], songs[0], songs[1]], name="Road Trip")
+
+    response = api.client.post(f"/api/playlists/{playlist_id}/clone/", json={}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    clone = response.json()
+    assert clone["id"] != playlist_id
+    assert (clone["name"], clone["song_count"], clone["total_duration"], clone["total_play_count"]) == \
+        ("Road Trip (Copy)", 3, 303.0, 12)
+    assert entries(api, clone["id"]) == entries(api, playlist_id) == [songs[2], songs[0], songs[1]]
+
+    named = api.client.post(f"/api/playlists/{playlist_id}/clone/", json={"name": "Short"}, headers=headers).json()
+    assert named["name"] == "Short"
+
+
+def test_clone_is_independent_of_the_source(api):
+    user_id, headers = api.create_user("alice")
+    a, b = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(headers, [a, b])
+    clone_id = api.client.post(f"/api/playlists/{playlist_id}/clone/", json={}, headers=headers).json()["id"]
+
+    api.client.delete(f"/api/playlists/{playlist_id}/songs/{a}/", headers=headers)
+
+    assert entries(api, clone_id) == [a, b]
+
+
+def test_merge_appends_new_songs_in_source_order(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c, d, e = api.create_songs(user_id, 5)
+    target = api.create_playlist(headers, [a, b])
+    first = api.create_playlist(headers, [c, a, d])
+    second = api.create_playlist(headers, [d, e, b])
+
+    response = api.client.post(f"/api/playlists/{target}/merge/",
+                               json={"source_playlist_ids": [first, second]}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["added"] == 3
+    assert (body["playlist"]["song_count"], body["playlist"]["total_duration"]) == (5, 510.0)
+    assert entries(api, target) == [a, b, c, d, e]
+    assert entries(api, first) == [c, a, d]
+
+
+def test_merge_can_delete_its_sources(api):
+    user_id, headers = api.create_user("alice")
+    a, b = api.create_songs(user_id, 2)
+    target = api.create_playlist(headers, [a])
+    source = api.create_playlist(headers, [b])
+    session_id = api.client.post(f"/api/songs/{b}/listen/?playlist_id={source}", headers=headers).json()["session_id"]
+
+    response = api.client.post(f"/api/playlists/{target}/merge/",
+                               json={"source_playlist_ids": [source], "delete_sources": True}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert entries(api, target) == [a, b]
+    db = api.session()
+    try:
+        assert db.get(Playlist, source) is None
+        assert db.query(ListeningSession).filter(ListeningSession.id == session_id).one().playlist_id is None
+    finally:
+        db.close()
+
+
+def test_merge_checks_ownership_and_self_merges(api):
+    user_id, headers = api.create_user("alice")
+    other_id, other_headers = api.create_user("bob")
+    target = api.create_playlist(headers, api.create_songs(user_id, 1))
+    theirs = api.create_playlist(other_headers, api.create_songs(other_id, 1))
+
+    def merge(source_ids):
+        return api.client.post(f"/api/playlists/{target}/merge/", json={"source_playlist_ids": source_ids}, headers=headers)
+
+    assert merge([target]).status_code == 400
+    assert merge([theirs]).status_code == 404
+    assert merge(["not-a-uuid"]).status_code == 404
+    assert api.client.post(f"/api/playlists/{target}/clone/", json={}, headers=other_headers).status_code == 404
+    assert len(entries(api, target)) == 1
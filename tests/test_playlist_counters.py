@@ -0,0 +1,81 @@
+"""
+Denormalized playlist counters (song_count, total_duration, total_play_count)
+served by /api/playlists/summaries/, and the song delete path that keeps them
+in step.
+"""
+from app.models.playlist import Playlist
+from app.models.song import ListeningSession, ListeningDailyRollup, Song
+from app.services.playlist_service import PlaylistService
+
+
+def summary(api, headers, playlist_id):
+    summaries = api.client.get("/api/playlists/summaries/", headers=headers).json()
+    return next(item for item in summaries if item["id"] == playlist_id)
+
+
+def stored_counters(api, playlist_id):
+    db = api.session()
+    try:
+        playlist = db.get(Playlist, playlist_id)
+        return playlist.song_count, playlist.total_duration, playlist.total_play_count
+    finally:
+        db.close()
+
+
+def test_counters_follow_adds_removes_and_deletes(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 3, play_count=5)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+
+    for song_id in songs:
+        assert api.client.post(f"/api/playlists/{playlist_id}/songs/", json={"song_id": song_id}, headers=headers).status_code == 200
+    assert summary(api, headers, playlist_id) | {"id": None, "name": None} == {
+        "id": None, "name": None, "cover_image": None,
+        "song_count": 3, "total_duration": 303.0, "total_play_count": 15,
+    }
+
+    api.client.delete(f"/api/playlists/{playlist_id}/songs/{songs[0]}/", headers=headers)
+    assert stored_counters(api, playlist_id) == (2, 203.0, 10)
+
+    assert api.client.delete(f"/api/songs/{songs[1]}/", headers=headers).status_code == 200
+    assert stored_counters(api, playlist_id) == (1, 102.0, 5)
+
+
+def test_counters_match_a_full_recount(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 4, play_count=2)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+    api.client.post(f"/api/playlists/{playlist_id}/songs/batch/", json={"song_ids": songs}, headers=headers)
+    api.client.post(f"/api/playlists/{playlist_id}/songs/batch-remove/", json={"song_ids": songs[:1]}, headers=headers)
+    incremental = stored_counters(api, playlist_id)
+
+    db = api.session()
+    try:
+        PlaylistService.refresh_counters(db, [playlist_id])
+        db.commit()
+    finally:
+        db.close()
+
+    assert stored_counters(api, playlist_id) == incremental == (3, 306.0, 6)
+
+
+def test_deleting_a_played_song_removes_its_listening_history(api):
+    user_id, headers = api.create_user("alice")
+    played, other = api.create_songs(user_id, 2)
+    playlist_id = api.client.post("/api/playlists/", json={"name": "Mix"}, headers=headers).json()["id"]
+    api.client.post(f"/api/playlists/{playlist_id}/songs/batch/", json={"song_ids": [played, other]}, headers=headers)
+    for song_id in (played, other):
+        session_id = api.client.post(f"/api/songs/{song_id}/listen/?playlist_id={playlist_id}", headers=headers).json()["session_id"]
+        api.client.put(f"/api/songs/{song_id}/listen/{session_id}/", json={"duration_seconds": 60}, headers=headers)
+
+    response = api.client.delete(f"/api/songs/{played}/", headers=headers)
+
+    assert response.status_code == 200, response.text
+    db = api.session()
+    try:
+        assert db.get(Song, played) is None
+        assert {row.song_id for row in db.query(ListeningSession).all()} == {other}
+        assert {row.song_id for row in db.query(ListeningDailyRollup).all()} == {other}
+    finally:
+        db.close()
+    assert stored_counters(api, playlist_id)[0] == 1
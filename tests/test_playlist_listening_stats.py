@@ -0,0 +1,65 @@
+"""
+Playlist listening stats: per-song listening time for every song in the
+playlist (played or not), in playlist order, with date ranges and paging.
+"""
+import datetime
+
+# Plays must fall inside the retention window, so tests use recent days
+DAY = datetime.date.today() - datetime.timedelta(days=10)
+PREVIOUS_DAY, NEXT_DAY = DAY - datetime.timedelta(days=1), DAY + datetime.timedelta(days=1)
+
+
+def report(api, headers, playlist_id, events):
+    response = api.client.post("/api/songs/listen-events/", json={"events": [
+        {"song_id": song_id, "playlist_id": playlist_id, "started_at": started_at, "duration_seconds": seconds}
+        for song_id, started_at, seconds in events
+    ]}, headers=headers)
+    assert response.status_code == 200, response.text
+
+
+def stats(api, headers, playlist_id, **params):
+    response = api.client.get(f"/api/playlists/{playlist_id}/listening-stats/", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_every_song_is_listed_in_playlist_order(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c = api.create_songs(user_id, 3, play_count=2)
+    playlist_id = api.create_playlist(headers, [c, a, b])
+    other_playlist = api.create_playlist(headers, [a])
+    report(api, headers, playlist_id, [(a, f"{DAY}T10:00:00", 90), (a, f"{NEXT_DAY}T10:00:00", 30), (c, f"{DAY}T11:00:00", 60)])
+    report(api, headers, other_playlist, [(a, f"{DAY}T12:00:00", 600)])  # Not from this playlist
+
+    result = stats(api, headers, playlist_id)
+
+    assert result["total_listening_seconds"] == 180
+    assert result["total_listening_minutes"] == 3.0
+    assert [(song["song_id"], song["listening_minutes"], song["play_count"]) for song in result["song_stats"]] == [
+        (c, 1.0, 2), (a, 2.0, 2), (b, 0.0, 2)
+    ]
+
+
+def test_date_range_and_paging(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c = api.create_songs(user_id, 3)
+    playlist_id = api.create_playlist(headers, [a, b, c])
+    report(api, headers, playlist_id, [(a, f"{PREVIOUS_DAY}T23:00:00", 60), (b, f"{DAY}T00:30:00", 120), (c, f"{NEXT_DAY}T09:00:00", 30)])
+
+    in_range = stats(api, headers, playlist_id, start=DAY.isoformat(), end=NEXT_DAY.isoformat())
+    assert in_range["total_listening_seconds"] == 120
+    assert [song["listening_minutes"] for song in in_range["song_stats"]] == [0.0, 2.0, 0.0]
+
+    page = stats(api, headers, playlist_id, skip=1, limit=1)
+    assert [song["song_id"] for song in page["song_stats"]] == [b]
+    assert page["total_listening_seconds"] == 210  # Totals cover the whole playlist
+
+
+def test_only_the_owner_sees_the_stats(api):
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    playlist_id = api.create_playlist(headers, api.create_songs(user_id, 1))
+
+    response = api.client.get(f"/api/playlists/{playlist_id}/listening-stats/", headers=other_headers)
+
+    assert response.status_code == 404
@@ -0,0 +1,103 @@
+"""
+Sparse playlist positions: inserts and moves write only the placed row, and
+crowded or exhausted gaps are respaced while keeping the order.
+"""
+from app.models.playlist import PlaylistSong
+from app.services.playlist_service import POSITION_GAP
+
+
+def positions(api, playlist_id):
+    """Song id -> position, in playlist order"""
+    db = api.session()
+    try:
+        rows = db.query(PlaylistSong.song_id, PlaylistSong.position).filter(
+            PlaylistSong.playlist_id == playlist_id
+        ).order_by(PlaylistSong.position, PlaylistSong.id).all()
+        return dict(rows)
+    finally:
+        db.close()
+
+
+def move(api, headers, playlist_id, song_id, **anchor):
+    return api.client.put(f"/api/playlists/{playlist_id}/songs/{song_id}/move/", json=anchor, headers=headers)
+
+
+def test_moving_a_song_only_rewrites_its_own_position(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c, d = api.create_songs(user_id, 4)
+    playlist_id = api.create_playlist(headers, [a, b, c, d])
+    before = positions(api, playlist_id)
+
+    assert move(api, headers, playlist_id, d, before=b).status_code == 200
+    assert move(api, headers, playlist_id, a, after=c).status_code == 200
+
+    after = positions(api, playlist_id)
+    assert list(after) == [d, b, c, a]
+    assert {song: position for song, position in after.items() if before[song] != position}.keys() == {a, d}
+
+
+def test_inserting_at_an_index(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c, new = api.create_songs(user_id, 4)
+    playlist_id = api.create_playlist(headers, [a, b, c])
+
+    api.client.post(f"/api/playlists/{playlist_id}/songs/", json={"song_id": new, "position": 1}, headers=headers)
+
+    assert list(positions(api, playlist_id)) == [a, new, b, c]
+
+
+def test_crowded_gaps_are_respaced_in_the_background(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 11)
+    first, last, movers = songs[0], songs[1], songs[2:]
+    playlist_id = api.create_playlist(headers, [first, last, *movers])
+
+    # Each move halves the gap right after the first song; the ninth leaves it crowded
+    for song_id in movers:
+        assert move(api, headers, playlist_id, song_id, after=first).status_code == 200
+
+    result = positions(api, playlist_id)
+    assert list(result) == [first, *reversed(movers), last]
+    assert list(result.values()) == [index * POSITION_GAP for index in range(11)]
+
+
+def test_a_move_into_an_exhausted_gap_rebalances_first(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c = api.create_songs(user_id, 3)
+    playlist_id = api.create_playlist(headers, [a, b, c])
+    db = api.session()
+    try:
+        db.query(PlaylistSong).filter(PlaylistSong.song_id == b).update({PlaylistSong.position: 1})
+        db.query(PlaylistSong).filter(PlaylistSong.song_id == a).update({PlaylistSong.position: 0})
+        db.commit()
+    finally:
+        db.close()
+
+    response = move(api, headers, playlist_id, c, before=b)
+
+    assert response.status_code == 200
+    assert list(positions(api, playlist_id)) == [a, c, b]
+
+
+def test_invalid_moves_are_rejected(api):
+    user_id, headers = api.create_user("alice")
+    a, b, outsider = api.create_songs(user_id, 3)
+    playlist_id = api.create_playlist(headers, [a, b])
+
+    assert move(api, headers, playlist_id, a, before=b, after=b).status_code == 400
+    assert move(api, headers, playlist_id, a).status_code == 400
+    assert move(api, headers, playlist_id, a, before=a).status_code == 400
+    assert move(api, headers, playlist_id, a, before=outsider).status_code == 400
+    assert move(api, headers, playlist_id, outsider, before=a).status_code == 404
+    assert list(positions(api, playlist_id)) == [a, b]
+
+
+def test_reordering_respaces_the_whole_playlist(api):
+    user_id, headers = api.create_user("alice")
+    a, b, c = api.create_songs(user_id, 3)
+    playlist_id = api.create_playlist(headers, [a, b, c])
+
+    response = api.client.put(f"/api/playlists/{playlist_id}/songs/reorder/", json=[c, a, b], headers=headers)
+
+    assert response.status_code == 200
+    assert positions(api, playlist_id) == {c: 0, a: POSITION_GAP, b: 2 * POSITION_GAP}
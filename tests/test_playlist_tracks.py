@@ -0,0 +1,82 @@
+"""
+Playlist tracks paged with keyset cursors (GET /api/playlists/{id}/songs/),
+with optional field selection.
+"""
+import uuid
+
+from app.utils.pagination import encode_cursor
+
+
+def walk(api, headers, playlist_id, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = {**params, **({"cursor": cursor} if cursor else {})}
+        response = api.client.get(f"/api/playlists/{playlist_id}/songs/", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+def test_pages_list_every_track_in_playlist_order(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 7)
+    order = songs[3:] + songs[:3]
+    playlist_id = api.create_playlist(headers, order)
+
+    items, pages = walk(api, headers, playlist_id, limit=3)
+
+    assert pages == 3
+    assert [item["id"] for item in items] == order
+    positions = [item["position"] for item in items]
+    assert positions == sorted(positions)
+    assert items[0]["title"] == "Song 3" and items[0]["duration"] == 103.0
+
+
+def test_a_track_inserted_while_paging_is_neither_repeated_nor_shifts_the_rest(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 5)
+    playlist_id = api.create_playlist(headers, songs[:4])
+    first = api.client.get(f"/api/playlists/{playlist_id}/songs/", params={"limit": 2}, headers=headers).json()
+
+    # Inserted at the top, before the page already read
+    api.client.post(f"/api/playlists/{playlist_id}/songs/", json={"song_id": songs[4], "position": 0}, headers=headers)
+    rest, _ = walk(api, headers, playlist_id, limit=2, cursor=first["next_cursor"])
+
+    assert [item["id"] for item in first["items"] + rest] == songs[:4]
+
+
+def test_fields_select_the_returned_columns(api):
+    user_id, headers = api.create_user("alice")
+    songs = api.create_songs(user_id, 2)
+    playlist_id = api.create_playlist(headers, songs)
+
+    response = api.client.get(f"/api/playlists/{playlist_id}/songs/", params={"fields": "title, artist"}, headers=headers)
+    assert [set(item) for item in response.json()["items"]] == [{"id", "position", "title", "artist"}] * 2
+
+    response = api.client.get(f"/api/playlists/{playlist_id}/songs/", params={"fields": "title,file_path"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: file_path"
+
+
+def test_only_the_owner_can_read_the_tracks(api):
+    user_id, headers = api.create_user("alice")
+    _, other_headers = api.create_user("bob")
+    playlist_id = api.create_playlist(headers, api.create_songs(user_id, 1))
+
+    assert api.client.get(f"/api/playlists/{playlist_id}/songs/", headers=other_headers).status_code == 404
+
+
+def test_malformed_cursors_are_rejected(api):
+    user_id, headers = api.create_user("alice")
+    playlist_id = api.create_playlist(headers, api.create_songs(user_id, 2))
+    entry_id = str(uuid.uuid4())
+
+    for cursor in ("not-base64!", encode_cursor([0]), encode_cursor([{}, "x"]), encode_cursor(["a", entry_id]),
+                   encode_cursor([True, entry_id]), encode_cursor([1.5, entry_id]), encode_cursor([0, "not-a-uuid"])):
+        response = api.client.get(f"/api/playlists/{playlist_id}/songs/", params={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400, cursor
+        assert response.json()["detail"] == "Invalid cursor"
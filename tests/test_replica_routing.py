@@ -0,0 +1,110 @@
+"""
+Read replica routing: GET requests read from the replica, except for users
+who wrote within the stickiness window, and everyone falls back to the
+primary while the replica lags too far behind or can't be reached.
+"""
+import shutil
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import database
+from app.config import settings
+from app.utils.db_routing import ReplicaRouter
+from app.utils.security import create_access_token
+
+
+def request(method="GET", username=None):
+    headers = []
+    if username:
+        headers.append((b"authorization", f"Bearer {create_access_token(data={'sub': username})}".encode()))
+    return Request({"type": "http", "method": method, "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def router(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    yield ReplicaRouter(engine)
+    engine.dispose()
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(router):
+    assert router.use_replica(request("GET", "alice"))
+    assert router.use_replica(request("HEAD"))
+    assert not router.use_replica(request("POST", "alice"))
+    assert not ReplicaRouter(None).use_replica(request("GET"))
+
+
+def test_writers_read_their_own_writes_until_the_window_ends(router, monkeypatch):
+    monkeypatch.setattr(settings, "database_replica_sticky_seconds", 0.05)
+
+    router.mark_write("alice")
+
+    assert not router.use_replica(request("GET", "alice"))
+    assert router.use_replica(request("GET", "bob"))
+    assert router.use_replica(request("GET"))
+    time.sleep(0.06)
+    assert router.use_replica(request("GET", "alice"))
+
+
+def test_stickiness_is_shared_through_redis(router):
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    router._redis = fakeredis.FakeRedis(server=server)
+    other_worker = ReplicaRouter(router.engine)
+    other_worker._redis = fakeredis.FakeRedis(server=server)
+
+    router.mark_write("alice")
+
+    assert not other_worker.use_replica(request("GET", "alice"))
+    assert other_worker.use_replica(request("GET", "bob"))
+
+
+def test_lagging_or_unreachable_replicas_are_not_used(router, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "database_replica_lag_check_seconds", 60)
+    assert router.replica_healthy() is False  # Not measured yet
+    assert router.refresh_lag() == 0.0
+    assert router.replica_healthy()
+
+    router._lag = settings.database_replica_max_lag_seconds + 1
+    assert not router.replica_healthy()
+    assert not router.lag_is_stale()
+
+    unreachable = ReplicaRouter(create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"))
+    assert unreachable.refresh_lag() is None
+    assert not unreachable.replica_healthy()
+    assert unreachable.status() | {"sticky_users": 0} == {
+        "enabled": True, "lag_seconds": None, "healthy": False, "sticky_users": 0
+    }
+
+
+def test_get_db_routes_between_primary_and_replica(api, tmp_path, monkeypatch):
+    user_id, headers = api.create_user("alice")
+    monkeypatch.setattr(settings, "database_replica_lag_check_seconds", 60)
+    api.create_songs(user_id, 1, title="Everywhere")
+    shutil.copy(tmp_path / "api.db", tmp_path / "replica.db")  # A replica that stops here
+    api.create_songs(user_id, 1, title="Primary Only")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(replica)
+    monkeypatch.setattr(database, "replica_router", router)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=replica))
+
+    def titles():
+        return sorted(song["title"] for song in api.client.get("/api/songs/", headers=headers).json())
+
+    try:
+        assert titles() == ["Everywhere"]
+
+        api.create_playlist(headers)  # A write: alice now reads from the primary
+        assert titles() == ["Everywhere", "Primary Only"]
+
+        router._recent_writes.clear()
+        assert titles() == ["Everywhere"]
+
+        router._lag = settings.database_replica_max_lag_seconds + 1
+        assert titles() == ["Everywhere", "Primary Only"]
+    finally:
+        replica.dispose()
@@ -0,0 +1,83 @@
+"""
+Keyset pagination of the library (GET /api/songs/page/): every sort walks
+the whole library without gaps or repeats, and malformed cursors are 400s.
+"""
+import pytest
+
+from app.models.song import Song
+from app.utils.pagination import encode_cursor
+
+
+def walk(api, headers, sort, limit=3):
+    items, cursor = [], None
+    while True:
+        params = {"sort": sort, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = api.client.get("/api/songs/page/", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.parametrize("sort, key, descending", [
+    ("created_at", "created_at", True),
+    ("title", "title", False),
+    ("artist", "artist", False),
+    ("play_count", "play_count", True),
+])
+def test_pages_cover_the_library_in_order(api, sort, key, descending):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 10)
+    api.create_songs(user_id, 4, play_count=7)  # Ties, broken by song id
+    other_id, _ = api.create_user("bob")
+    api.create_songs(other_id, 3)
+
+    items = walk(api, headers, sort)
+
+    assert len(items) == len({item["id"] for item in items}) == 14
+    if key == "play_count":  # Not part of the response
+        db = api.session()
+        try:
+            play_counts = dict(db.query(Song.id, Song.play_count).all())
+        finally:
+            db.close()
+        items = [{**item, "play_count": play_counts[item["id"]]} for item in items]
+    keys = [(item[key], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=descending)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor(["title", "Song 1"]),
+    encode_cursor(["artist", "Artist 1", "00000000-0000-0000-0000-000000000001"]),  # Another sort
+    encode_cursor(["title", "Song 1", "not-a-uuid"]),
+    encode_cursor(["title", 5, "00000000-0000-0000-0000-000000000001"]),
+    encode_cursor(["title", None, "00000000-0000-0000-0000-000000000001"]),
+    encode_cursor(["title", ["Song 1"], "00000000-0000-0000-0000-000000000001"]),
+])
+def test_malformed_cursors_are_rejected(api, cursor):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 2)
+
+    response = api.client.get("/api/songs/page/", params={"sort": "title", "cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("sort, value", [
+    ("play_count", "7"),
+    ("play_count", True),
+    ("created_at", "yesterday"),
+    ("created_at", 1700000000),
+])
+def test_sort_keys_of_the_wrong_type_are_rejected(api, sort, value):
+    user_id, headers = api.create_user("alice")
+    api.create_songs(user_id, 2)
+    cursor = encode_cursor([sort, value, "00000000-0000-0000-0000-000000000001"])
+
+    response = api.client.get("/api/songs/page/", params={"sort": sort, "cursor": cursor}, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,71 @@
+"""
+Ranked song search (GET /api/songs/?search=): every word matches as a prefix,
+all words must match, and title matches rank above artist and album matches.
+Runs on SQLite's FTS5 table, which triggers keep in sync with the songs.
+"""
+from app.services.search_service import SearchService
+
+
+def search(api, headers, text, **params):
+    response = api.client.get("/api/songs/", params={"search": text, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [song["title"] for song in response.json()]
+
+
+def add_songs(api, user_id, *songs):
+    for title, artist, album in songs:
+        api.create_songs(user_id, 1, title=title, artist=artist, album=album)
+
+
+def test_words_match_as_prefixes_and_all_must_match(api):
+    user_id, headers = api.create_user("alice")
+    add_songs(api, user_id,
+              ("Come Together", "The Beatles", "Abbey Road"),
+              ("Help!", "The Beatles", "Help!"),
+              ("Abbey Lane", "Someone Else", "Elsewhere"))
+
+    assert search(api, headers, "beat abb") == ["Come Together"]
+    assert sorted(search(api, headers, "BEATLES")) == ["Come Together", "Help!"]
+    assert search(api, headers, "nothing") == []
+
+
+def test_title_matches_rank_above_artist_and_album_matches(api):
+    user_id, headers = api.create_user("alice")
+    add_songs(api, user_id,
+              ("Quiet Night", "Jazz Trio", "Evening"),
+              ("Intro", "Evening Jazz", "Live"),
+              ("Evening Song", "Someone", "Collection"))
+
+    assert search(api, headers, "evening") == ["Evening Song", "Intro", "Quiet Night"]
+
+
+def test_query_syntax_characters_are_ignored(api):
+    user_id, headers = api.create_user("alice")
+    add_songs(api, user_id, ("Don't Stop", "Band", "Album"))
+
+    assert search(api, headers, 'don"t* (stop') == ["Don't Stop"]
+    assert SearchService.terms('Don"t* (stop') == ["don", "t", "stop"]
+
+
+def test_search_follows_updates_and_deletes(api):
+    user_id, headers = api.create_user("alice")
+    song_id, = api.create_songs(user_id, 1, title="Old Name")
+
+    api.client.put(f"/api/songs/{song_id}/", json={"title": "New Name"}, headers=headers)
+    assert search(api, headers, "old") == []
+    assert search(api, headers, "new") == ["New Name"]
+
+    api.client.delete(f"/api/songs/{song_id}/", headers=headers)
+    assert search(api, headers, "new") == []
+
+
+def test_search_stays_within_the_users_library(api):
+    user_id, headers = api.create_user("alice")
+    other_id, _ = api.create_user("bob")
+    _, admin_headers = api.create_user("root", role="admin")
+    api.create_songs(user_id, 1, title="Mine", genre="Jazz")
+    api.create_songs(other_id, 1, title="Mine Too")
+
+    assert search(api, headers, "mine") == ["Mine"]
+    assert search(api, headers, "mine", genre="Rock") == []
+    assert sorted(search(api, admin_headers, "mine")) == ["Mine", "Mine Too"]